@@ -1,29 +1,117 @@
 # backend/agent_client.py
-import requests
 import os
+import json
+import contextvars
+import functools
+import hashlib
+import queue
+import threading
+import time
 import streamlit as st
-from typing import Dict
-from openai import OpenAI
-from crewai import Agent, Task, Crew
-from crewai_tools import ScrapeWebsiteTool, SerperDevTool
-from crewai import Crew, Process
-from langchain_openai import ChatOpenAI
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Optional
+from backend.compaction import summarize, track_run
+from backend.disk_cache import DiskCache
+from backend.indicators import format_indicators
+from backend.tracing import langchain_callbacks, record, span
 
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-OPENAI_MODEL_NAME = os.environ.get("OPENAI_MODEL_NAME")
-SERPER_API_KEY = os.environ.get("SERPER_API_KEY")
+# crewai, crewai_tools, langchain_openai and openai take seconds to import, so they are
+# imported on first use; importing this module (and rendering a page) stays cheap.
+if TYPE_CHECKING:
+    from crewai import Crew
+    from langchain_openai import ChatOpenAI
+    from openai import OpenAI
 
-OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
-OPENAI_MODEL_NAME = st.secrets["OPENAI_MODEL_NAME"]
-SERPER_API_KEY = st.secrets["SERPER_API_KEY"]
+def _secret(name: str):
+    """Reads a setting from Streamlit secrets, falling back to the environment (scripts, workers)."""
+    try:
+        return st.secrets[name]
+    except Exception:
+        return os.environ.get(name)
 
-search_tool = SerperDevTool()
-scrape_tool = ScrapeWebsiteTool()
+OPENAI_API_KEY = _secret("OPENAI_API_KEY")
+OPENAI_MODEL_NAME = _secret("OPENAI_MODEL_NAME")
+SERPER_API_KEY = _secret("SERPER_API_KEY")
+# Optional OpenAI-compatible endpoint (proxies, local stubs); None uses the official API.
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL")
 
-def get_nse_stock_overview(stock_symbol):
+# Number of idle pre-built crews kept for reuse, per execution mode.
+AGENT_CREW_POOL_SIZE = int(os.environ.get("AGENT_CREW_POOL_SIZE", "4"))
+# "hierarchical": a manager LLM delegates the five tasks. "dag": tasks declare their inputs,
+# company research and data analysis run concurrently, and no manager round-trips are made.
+CREW_MODES = ("hierarchical", "dag")
+AGENT_CREW_MODE = os.environ.get("AGENT_CREW_MODE", "hierarchical").strip().lower()
+if AGENT_CREW_MODE not in CREW_MODES:
+    print(f"Unknown AGENT_CREW_MODE {AGENT_CREW_MODE!r}; using 'hierarchical'.")
+    AGENT_CREW_MODE = "hierarchical"
+
+# Finished analyses are reused for identical inputs on the same (UTC) day.
+AGENT_CACHE_PATH = Path(os.environ.get("AGENT_CACHE_PATH", "data/cache/agent_results.sqlite3"))
+AGENT_CACHE_TTL = int(os.environ.get("AGENT_CACHE_TTL", str(6 * 3600)))
+AGENT_CACHE_MAX_ENTRIES = int(os.environ.get("AGENT_CACHE_MAX_ENTRIES", "200"))
+
+result_cache = DiskCache(AGENT_CACHE_PATH, ttl=AGENT_CACHE_TTL, max_entries=AGENT_CACHE_MAX_ENTRIES)
+
+# Set AGENT_PREWARM=0 to skip loading the agent stack in the background after the first page render.
+AGENT_PREWARM = os.environ.get("AGENT_PREWARM", "1") != "0"
+
+# ---------- Shared LLM clients ----------
+# Clients are thread-safe and keep their HTTP connection pools (and TLS sessions) alive,
+# so they are built once per process and shared by every analysis.
+
+_clients_lock = threading.Lock()
+_openai_client = None
+_chat_llms = {}
+_tools = {}
+
+def get_openai_client() -> "OpenAI":
+    """Returns the process-wide OpenAI client."""
+    global _openai_client
+    with _clients_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+            _openai_client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+        return _openai_client
+
+def get_chat_llm(temperature=None) -> "ChatOpenAI":
+    """Returns the process-wide chat model for a temperature (None keeps the model default)."""
+    with _clients_lock:
+        if temperature not in _chat_llms:
+            from langchain_openai import ChatOpenAI
+            kwargs = {"temperature": temperature} if temperature is not None else {}
+            # Every model call is traced; the temperature-0 model is the crew manager's.
+            callbacks = langchain_callbacks("manager" if temperature == 0 else "agent")
+            _chat_llms[temperature] = ChatOpenAI(api_key=OPENAI_API_KEY, model=OPENAI_MODEL_NAME, base_url=OPENAI_BASE_URL,
+                                                 callbacks=callbacks, **kwargs)
+        return _chat_llms[temperature]
+
+def _get_tool(name: str, factory: Callable):
+    with _clients_lock:
+        if name not in _tools:
+            _tools[name] = factory()
+        return _tools[name]
+
+def get_search_tool():
+    """Returns the process-wide web search tool, shared by all agents; results are cached on disk (see backend.cached_tools)."""
+    def build():
+        from backend.cached_tools import CachedSerperDevTool
+        return CachedSerperDevTool()
+    return _get_tool("search", build)
+
+def get_scrape_tool():
+    """Returns the process-wide website scraping tool, shared by all agents."""
+    def build():
+        from backend.cached_tools import CachedScrapeWebsiteTool
+        return CachedScrapeWebsiteTool()
+    return _get_tool("scrape", build)
+
+def get_nse_stock_overview(stock_symbol, on_delta: Optional[Callable[[str], None]] = None):
     
     # OpenAI model
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    client = get_openai_client()
     
     prompt = f"""
     You are a financial analyst with more than 15 years of experience. Given the NSE stock symbol "{stock_symbol}", 
@@ -41,15 +129,32 @@ def get_nse_stock_overview(stock_symbol):
     If you cannot find reliable data, mention it explicitly.
     """
 
-    response = client.responses.create(
+    if on_delta is None:
+        response = client.responses.create(
+            model=OPENAI_MODEL_NAME,
+            input=prompt,
+            temperature=0
+        )
+        return response.output_text
+
+    # Streaming: hand every text delta to the caller as soon as it arrives.
+    parts = []
+    stream = client.responses.create(
         model=OPENAI_MODEL_NAME,
         input=prompt,
-        temperature=0
+        temperature=0,
+        stream=True
     )
+    for event in stream:
+        if event.type == "response.output_text.delta":
+            parts.append(event.delta)
+            on_delta(event.delta)
+    return "".join(parts)
 
-    return response.output_text
-
-def create_agents():
+def create_agents(llm=None):
+    from crewai import Agent
+    llm = llm or get_chat_llm()
+    search_tool, scrape_tool = get_search_tool(), get_scrape_tool()
     company_researcher_agent = Agent(
         role="Company Researcher",
         goal="Gather and analyze comprehensive information about a specified company.",
@@ -59,7 +164,8 @@ def create_agents():
                   "to create a clear and concise company profile.",
         verbose=True,
         allow_delegation=False,
-        tools=[scrape_tool, search_tool]
+        tools=[scrape_tool, search_tool],
+        llm=llm
     )
 
     data_analyst_agent = Agent(
@@ -70,7 +176,8 @@ def create_agents():
                   "for informing trading decisions.",
         verbose=True,
         allow_delegation=True,
-        tools=[scrape_tool, search_tool]
+        tools=[scrape_tool, search_tool],
+        llm=llm
     )
     
     trading_strategy_agent = Agent(
@@ -81,7 +188,8 @@ def create_agents():
                   "to determine the most profitable and risk-averse options.",
         verbose=True,
         allow_delegation=True,
-        tools=[scrape_tool, search_tool]
+        tools=[scrape_tool, search_tool],
+        llm=llm
     )
     
     execution_agent = Agent(
@@ -92,7 +200,8 @@ def create_agents():
                   "executed to maximize efficiency and adherence to strategy.",
         verbose=True,
         allow_delegation=True,
-        tools=[scrape_tool, search_tool]
+        tools=[scrape_tool, search_tool],
+        llm=llm
     )
     
     risk_management_agent = Agent(
@@ -103,12 +212,46 @@ def create_agents():
                   "exposure and suggests safeguards to ensure that trading activities align with the firm’s risk tolerance.",
         verbose=True,
         allow_delegation=True,
-        tools=[scrape_tool, search_tool]
+        tools=[scrape_tool, search_tool],
+        llm=llm
     )
     
     return company_researcher_agent, data_analyst_agent, trading_strategy_agent, execution_agent, risk_management_agent
 
-def create_tasks(company_researcher_agent, data_analyst_agent, trading_strategy_agent, execution_agent, risk_management_agent):
+@functools.lru_cache(maxsize=None)
+def _task_class():
+    """
+    crewai's Task, except that async tasks run on a thread started in a copy of the caller's
+    context. crewai starts them on bare threads, which would lose the run's context variables
+    (the compaction ledger and the current trace span) for their tools and LLM calls.
+    """
+    from concurrent.futures import Future
+    from crewai import Task
+
+    class ContextTask(Task):
+        def execute_async(self, agent=None, context=None, tools=None) -> Future:
+            future = Future()
+
+            def run():
+                try:
+                    future.set_result(self.execute_sync(agent=agent, context=context, tools=tools))
+                except BaseException as e:
+                    future.set_exception(e)
+            threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True).start()
+            return future
+
+    return ContextTask
+
+def create_tasks(company_researcher_agent, data_analyst_agent, trading_strategy_agent, execution_agent, risk_management_agent,
+                 mode: str = "hierarchical"):
+    """
+    Builds the five analysis tasks. In "dag" mode the dependencies are explicit: company
+    analysis and data analysis run asynchronously side by side, strategy development takes
+    both as context, execution planning takes the strategy, and risk assessment takes the
+    strategy and the execution plan.
+    """
+    Task = _task_class()
+    dag = mode == "dag"
     company_analysis_task = Task(
         description=(
             "Provide a detailed overview of the company behind the stock ({stock_selection}). "
@@ -120,17 +263,21 @@ def create_tasks(company_researcher_agent, data_analyst_agent, trading_strategy_
             "market cap classification, and core business operations."
         ),
         agent=company_researcher_agent,
+        async_execution=dag,
     )
 
     data_analysis_task = Task(
         description=(
             "Continuously monitor and analyze market data for the selected stock ({stock_selection}). "
-            "Use statistical modeling and machine learning to identify trends and predict market movements."
+            "Use statistical modeling and machine learning to identify trends and predict market movements. "
+            "Technical indicators computed from the latest daily price history (use these rather than "
+            "searching the web for price data): {technical_indicators}."
         ),
         expected_output=(
             "Insights and alerts about significant market opportunities or threats for {stock_selection}."
         ),
         agent=data_analyst_agent,
+        async_execution=dag,
     )
     
     strategy_development_task = Task(
@@ -142,6 +289,7 @@ def create_tasks(company_researcher_agent, data_analyst_agent, trading_strategy_
             "A set of potential trading strategies for {stock_selection} that align with the user's risk tolerance."
         ),
         agent=trading_strategy_agent,
+        **({"context": [company_analysis_task, data_analysis_task]} if dag else {}),
     )
     
     execution_planning_task = Task(
@@ -153,6 +301,7 @@ def create_tasks(company_researcher_agent, data_analyst_agent, trading_strategy_
             "Detailed execution plans suggesting how and when to execute trades for {stock_selection}."
         ),
         agent=execution_agent,
+        **({"context": [strategy_development_task]} if dag else {}),
     )
     
     risk_assessment_task = Task(
@@ -164,24 +313,31 @@ def create_tasks(company_researcher_agent, data_analyst_agent, trading_strategy_
             "A comprehensive risk analysis report detailing potential risks and mitigation recommendations for {stock_selection}."
         ),
         agent=risk_management_agent,
+        **({"context": [strategy_development_task, execution_planning_task]} if dag else {}),
     )
     
     return company_analysis_task, data_analysis_task, strategy_development_task, execution_planning_task, risk_assessment_task
 
 
 
-def call_agent_api(payload: Dict, timeout=60) -> Dict:
-    """
-    POST the payload to your Agentic AI endpoint and return JSON.
-    Expected to return: {"markdown_report": "## ..."}
-    """
+def build_crew(mode: str = "hierarchical") -> "Crew":
+    """Builds the five-agent crew on the shared LLM clients, managed ("hierarchical") or as a task DAG ("dag")."""
+    from crewai import Crew, Process
+    if mode not in CREW_MODES:
+        raise ValueError(f"Unknown crew mode: {mode!r}")
     company_researcher_agent, data_analyst_agent, trading_strategy_agent, execution_agent, risk_management_agent = create_agents()
     company_analysis_task, data_analysis_task, strategy_development_task, execution_planning_task, risk_assessment_task = create_tasks(
-        company_researcher_agent, data_analyst_agent, trading_strategy_agent, execution_agent, risk_management_agent
+        company_researcher_agent, data_analyst_agent, trading_strategy_agent, execution_agent, risk_management_agent, mode=mode
     )
+    if mode == "dag":
+        # Sequential order with async research tasks: both start at once and the strategy
+        # task waits for them; later tasks read their declared context only.
+        manager = {"process": Process.sequential}
+    else:
+        manager = {"manager_llm": get_chat_llm(temperature=0), "process": Process.hierarchical}
     
     # Define the crew with agents and tasks
-    financial_trading_crew = Crew(
+    return Crew(
         agents=[
             company_researcher_agent,
             data_analyst_agent,
@@ -196,22 +352,301 @@ def call_agent_api(payload: Dict, timeout=60) -> Dict:
             execution_planning_task,
             risk_assessment_task
         ],
-        manager_llm=ChatOpenAI(api_key=OPENAI_API_KEY, model=OPENAI_MODEL_NAME, temperature=0),
-        process=Process.hierarchical,
-        verbose=True
+        verbose=True,
+        **manager
     )
-    
-    # Example data for kicking off the process
-    financial_trading_inputs = {
-        'stock_selection': payload.get("stock_symbol", "RELIANCE"),
-        'initial_capital': payload.get("capital", 10000),
-        'risk_tolerance': payload.get("risk_tolerance", "Medium"),
-        'trading_strategy_preference': payload.get("strategy", "Swing Trading"),
-        'news_impact_consideration': payload.get("news_impact", True)
+
+# Task attributes a kickoff fills in, with their initial values.
+_TASK_RUN_STATE = {"output": None, "callback": None, "used_tools": 0, "tools_errors": 0, "delegations": 0}
+
+class CrewPool:
+    """
+    A pool of pre-built crews. A crew carries per-run state (task outputs, agent memory), so
+    each one is checked out by a single analysis at a time and parameterised through
+    `kickoff(inputs=...)`. Up to `size` idle crews are kept; extra ones are built on demand.
+    """
+
+    def __init__(self, factory, size: int = AGENT_CREW_POOL_SIZE):
+        self.factory = factory
+        self.size = size
+        self._idle = queue.LifoQueue()
+
+    @contextmanager
+    def acquire(self):
+        """Checks a crew out for one run; crews whose run raised are discarded, not returned."""
+        try:
+            crew = self._idle.get_nowait()
+        except queue.Empty:
+            crew = self.factory()
+        yield crew
+        if self._idle.qsize() < self.size:
+            self.reset(crew)
+            self._idle.put(crew)
+
+    @staticmethod
+    def reset(crew) -> None:
+        """Clears the per-run state a kickoff leaves on the crew's tasks before the crew is reused."""
+        for task in crew.tasks:
+            for name, value in _TASK_RUN_STATE.items():
+                if hasattr(task, name):
+                    setattr(task, name, value)
+            if hasattr(task, "processed_by_agents"):
+                task.processed_by_agents = set()
+
+    def prewarm(self, count: int = 1) -> None:
+        """Builds crews ahead of the first request."""
+        for _ in range(min(count, self.size) - self._idle.qsize()):
+            self._idle.put(self.factory())
+
+crew_pools = {mode: CrewPool(functools.partial(build_crew, mode)) for mode in CREW_MODES}
+crew_pool = crew_pools["hierarchical"]
+
+def get_crew_pool(mode: str = AGENT_CREW_MODE) -> CrewPool:
+    """Returns the pool of pre-built crews for an execution mode."""
+    if mode not in crew_pools:
+        raise ValueError(f"Unknown crew mode: {mode!r}")
+    return crew_pools[mode]
+
+def crew_mode(payload: Dict) -> str:
+    """The execution mode requested by a payload, or AGENT_CREW_MODE."""
+    mode = str(payload.get("crew_mode") or AGENT_CREW_MODE).strip().lower()
+    return mode if mode in CREW_MODES else AGENT_CREW_MODE
+
+# Crew wall-clock seconds per execution mode, for comparing them (this process, most recent runs).
+_mode_timings = {mode: [] for mode in CREW_MODES}
+_mode_timings_lock = threading.Lock()
+_MODE_TIMINGS_KEPT = 200
+
+def _record_mode_timing(mode: str, seconds: float) -> None:
+    with _mode_timings_lock:
+        samples = _mode_timings[mode]
+        samples.append(seconds)
+        del samples[:-_MODE_TIMINGS_KEPT]
+
+def crew_mode_stats() -> Dict[str, Dict]:
+    """Returns run count and median/mean/min crew seconds per execution mode for this process."""
+    with _mode_timings_lock:
+        timings = {mode: list(samples) for mode, samples in _mode_timings.items()}
+    stats = {}
+    for mode, samples in timings.items():
+        if samples:
+            ordered = sorted(samples)
+            stats[mode] = {"runs": len(samples), "median_s": round(ordered[len(ordered) // 2], 3),
+                           "mean_s": round(sum(samples) / len(samples), 3), "min_s": round(ordered[0], 3)}
+        else:
+            stats[mode] = {"runs": 0}
+    return stats
+
+_prewarm_started = threading.Event()
+
+def prewarm_in_background() -> None:
+    """
+    Imports the agent stack and builds one crew on a daemon thread, once per process, so pages
+    render without waiting for it and the first analysis usually finds a warm crew. The PDF
+    render workers (see backend.pdf_renderer) are started too, so the first report download
+    does not pay for their start-up.
+    """
+    if not AGENT_PREWARM or _prewarm_started.is_set():
+        return
+    _prewarm_started.set()
+
+    def warm():
+        try:
+            from backend import pdf_renderer
+            pdf_renderer.prewarm()
+        except Exception as e:
+            print("PDF renderer prewarm failed:", e)
+        try:
+            get_crew_pool().prewarm(1)
+        except Exception as e:
+            print("Agent prewarm failed:", e)
+    threading.Thread(target=warm, name="agent-prewarm", daemon=True).start()
+
+def build_crew_inputs(payload: Dict) -> Dict:
+    """
+    Normalizes a payload into the inputs the crew is kicked off with.
+
+    Args:
+        payload (Dict): The analysis request from the Analysis page.
+
+    Returns:
+        Dict: Crew inputs with canonical casing and types, so equivalent requests compare equal.
+    """
+    return {
+        'stock_selection': str(payload.get("stock_symbol", "RELIANCE")).strip().upper(),
+        'initial_capital': int(payload.get("capital", 10000)),
+        'risk_tolerance': str(payload.get("risk_tolerance", "Medium")).strip().title(),
+        'trading_strategy_preference': str(payload.get("strategy", "Swing Trading")).strip().title(),
+        'news_impact_consideration': bool(payload.get("news_impact", True)),
+        'technical_indicators': format_indicators((payload.get("price_summary") or {}).get("indicators") or {}),
     }
+
+def result_cache_key(payload: Dict) -> str:
+    """
+    Returns the result-cache key for a payload: a hash of the normalized crew inputs,
+    the exchange, the crew mode, the model and the current UTC date, so cached analyses
+    never outlive the day.
+    """
+    inputs = build_crew_inputs(payload)
+    # Indicators move with every price tick; the analysis is keyed by the request, not the quote.
+    inputs.pop("technical_indicators")
+    key = {
+        "inputs": inputs,
+        "exchange": str(payload.get("exchange", "NSE")).strip().upper(),
+        "mode": crew_mode(payload),
+        "model": OPENAI_MODEL_NAME,
+        "date": datetime.utcnow().strftime("%Y-%m-%d"),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+def call_agent_api(payload: Dict, timeout=60, force_refresh: bool = False,
+                   on_event: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    POST the payload to your Agentic AI endpoint and return JSON.
+    Expected to return: {"markdown_report": "## ..."}
+
+    The crew and the stock overview run concurrently. If only one of them fails, the other's
+    output is still returned and the failure is reported under "errors" ("crew" or "overview");
+    "timings" holds the seconds spent in each branch and in total ("crew_mode" names the
+    execution mode used, see CREW_MODES; payload["crew_mode"] selects it), and "context_tokens" the
+    tokens of tool output before and after compaction (see backend.compaction), per tool.
+
+    Results are cached on disk (see AGENT_CACHE_* settings); a repeated request for the same
+    inputs on the same day returns the stored report with "cached": True. Pass
+    `force_refresh=True` to bypass the cache and run the crew again.
+
+    If `on_event` is given, partial output is pushed to it from worker threads as it is produced:
+    {"type": "task", "agent": ..., "output": ...} after each crew task,
+    {"type": "overview_delta", "text": ...} for every overview token chunk and
+    {"type": "error", "branch": ..., "error": ...} when a branch fails.
+
+    Every run is traced as an "analysis" span (see backend.tracing).
+    """
+    with span("analysis", symbol=str(payload.get("stock_symbol", "")), mode=crew_mode(payload)) as run:
+        response = _call_agent_api(payload, force_refresh, on_event)
+        run.set(cached=response["cached"], errors=",".join(response.get("errors", {})) or None)
+        return response
+
+def _call_agent_api(payload: Dict, force_refresh: bool, on_event: Optional[Callable[[Dict], None]]) -> Dict:
+    cache_key = result_cache_key(payload)
+    if not force_refresh:
+        cached = result_cache.get_json(cache_key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+    financial_trading_inputs = build_crew_inputs(payload)
+    mode = crew_mode(payload)
     
-    result = financial_trading_crew.kickoff(inputs=financial_trading_inputs)
-    
-    overview = get_nse_stock_overview(payload.get("stock_symbol", "RELIANCE"))
+    # The crew and the overview are independent, so run them side by side.
+    timings = {}
+
+    def timed(name, fn, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[name] = round(time.perf_counter() - started, 3)
+
+    task_clock = [time.time()]
+
+    def on_task(output):
+        # crewai reports finished tasks only; a task is timed from the previous one's end.
+        now = time.time()
+        agent = str(getattr(output, "agent", "") or "")
+        record("crew.task", task_clock[0], (now - task_clock[0]) * 1000, agent=agent)
+        task_clock[0] = now
+        if on_event:
+            on_event({"type": "task", "agent": agent, "output": str(output)})
+
+    def on_delta(text):
+        on_event({"type": "overview_delta", "text": text})
+
+    context_tokens = {}
+    tool_counters = {}
+
+    def run_crew():
+        from backend.cached_tools import track_run as track_tool_cache
+        with track_run() as ledger, track_tool_cache() as tool_calls, get_crew_pool(mode).acquire() as crew, \
+                span("crew.kickoff", mode=mode):
+            # crewai copies `crew.task_callback` onto a task only while `task.callback` is unset,
+            # so a pooled crew would keep calling its first run's callback; set this run's on every task.
+            for task in crew.tasks:
+                task.callback = on_task
+            task_clock[0] = time.time()
+            try:
+                return crew.kickoff(inputs=financial_trading_inputs)
+            finally:
+                for task in crew.tasks:
+                    task.callback = None
+                context_tokens.update(summarize(ledger))
+                tool_counters.update(tool_calls)
+
+    def run_overview():
+        with span("llm.overview", stream=on_event is not None):
+            return get_nse_stock_overview(financial_trading_inputs["stock_selection"],
+                                          on_delta=on_delta if on_event else None)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        # Each branch runs in a copy of this context, so its spans nest under the "analysis" span.
+        crew_future = pool.submit(contextvars.copy_context().run, timed, "crew_s", run_crew)
+        overview_future = pool.submit(contextvars.copy_context().run, timed, "overview_s", run_overview)
+    timings["total_s"] = round(time.perf_counter() - started, 3)
+    if crew_future.exception() is None:
+        _record_mode_timing(mode, timings["crew_s"])
+
+    # Report failures per branch so one failing call doesn't discard the other's result.
+    errors = {}
+    try:
+        result = str(crew_future.result())
+    except Exception as e:
+        result = ""
+        errors["crew"] = str(e)
+    try:
+        overview = overview_future.result()
+    except Exception as e:
+        overview = ""
+        errors["overview"] = str(e)
+    if on_event:
+        for branch, err in errors.items():
+            on_event({"type": "error", "branch": branch, "error": err})
+    if len(errors) == 2:
+        raise RuntimeError(f"Crew failed: {errors['crew']}; overview failed: {errors['overview']}")
     
-    return {"markdown_report": result, "stock_overview": overview}
\ No newline at end of file
+    response = {"markdown_report": result, "stock_overview": overview}
+    if not errors:
+        result_cache.set_json(cache_key, response)
+    from backend.cached_tools import tool_cache_stats
+    return {**response, "errors": errors, "timings": timings, "tool_cache": tool_cache_stats(tool_counters),
+            "context_tokens": context_tokens, "crew_mode": mode, "cached": False}
+
+def stream_agent_api(payload: Dict, timeout=60, force_refresh: bool = False) -> Iterator[Dict]:
+    """
+    Runs `call_agent_api` in a background thread and yields its events in the calling thread,
+    so a Streamlit script can render each section as soon as it is produced.
+
+    Yields the events documented on `call_agent_api`, followed by a final
+    {"type": "result", "result": <call_agent_api response>}. Exceptions raised by
+    `call_agent_api` are re-raised after the last event.
+    """
+    events = queue.Queue()
+    done = object()
+    outcome = {}
+
+    def worker():
+        try:
+            outcome["result"] = call_agent_api(payload, timeout, force_refresh=force_refresh, on_event=events.put)
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            events.put(done)
+
+    threading.Thread(target=worker, name="agent-stream", daemon=True).start()
+    while True:
+        event = events.get()
+        if event is done:
+            break
+        yield event
+    if "error" in outcome:
+        raise outcome["error"]
+    yield {"type": "result", "result": outcome["result"]}
@@ -0,0 +1,124 @@
+# backend/cached_tools.py
+import contextvars
+import hashlib
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from crewai_tools import ScrapeWebsiteTool, SerperDevTool
+
+from backend.compaction import compact
+from backend.disk_cache import DiskCache
+from backend.tracing import annotate, span
+
+# Search results and scraped pages are shared by all agents, runs and sessions.
+TOOL_CACHE_PATH = Path(os.environ.get("TOOL_CACHE_PATH", "data/cache/tools.sqlite3"))
+TOOL_CACHE_MAX_BYTES = int(os.environ.get("TOOL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", str(6 * 3600)))
+SCRAPE_CACHE_TTL = int(os.environ.get("SCRAPE_CACHE_TTL", str(24 * 3600)))
+
+tool_cache = DiskCache(TOOL_CACHE_PATH, max_bytes=TOOL_CACHE_MAX_BYTES)
+
+_counters = {"search": {"hits": 0, "misses": 0}, "scrape": {"hits": 0, "misses": 0}}
+_counters_lock = threading.Lock()
+# The counters of the analysis run this context belongs to (see `track_run`), if any.
+_run_counters: contextvars.ContextVar = contextvars.ContextVar("tool_cache_counters", default=None)
+
+# Tracking parameters that never change the content of a page.
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|gclid|fbclid|mc_cid|mc_eid|ref)$", re.IGNORECASE)
+
+def normalize_query(query: str) -> str:
+    """Lower-cases a search query and collapses whitespace, so trivially different queries share an entry."""
+    return " ".join(str(query).lower().split())
+
+def normalize_url(url: str) -> str:
+    """
+    Canonicalises a URL for caching: lower-cased scheme and host, no fragment, no trailing
+    slash, tracking parameters removed and the remaining query parameters sorted.
+    """
+    parts = urlsplit(str(url).strip())
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not _TRACKING_PARAMS.match(k)))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+def _cached_call(tool: str, key: str, ttl: int, fetch) -> str:
+    """Returns the cached result for `key`, or calls `fetch` and caches its (string) result."""
+    digest = f"{tool}:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+    hit = tool_cache.get(digest)
+    outcome = "hits" if hit is not None else "misses"
+    run = _run_counters.get()
+    with _counters_lock:
+        _counters[tool][outcome] += 1
+        if run is not None:
+            run[tool][outcome] += 1
+    annotate(cache="hit" if hit is not None else "miss")
+    if hit is not None:
+        return hit.decode("utf-8")
+    result = str(fetch())
+    tool_cache.set(digest, result.encode("utf-8"), ttl=ttl)
+    return result
+
+class CachedSerperDevTool(SerperDevTool):
+    """
+    SerperDevTool whose results are cached on disk by normalized query for SEARCH_CACHE_TTL seconds.
+    The raw result is cached; agents receive it compacted to SEARCH_TOKEN_BUDGET tokens.
+    """
+
+    def _fetch(self, **kwargs):
+        return super()._run(**kwargs)
+
+    def _run(self, **kwargs):
+        query = kwargs.get("search_query") or kwargs.get("query") or ""
+        with span("tool.search", query=query) as s:
+            raw = _cached_call("search", normalize_query(query), SEARCH_CACHE_TTL, lambda: self._fetch(**kwargs))
+            out, tokens = compact(raw, "search", query=query)
+            s.set(**tokens)
+            return out
+
+class CachedScrapeWebsiteTool(ScrapeWebsiteTool):
+    """
+    ScrapeWebsiteTool whose pages are cached on disk by normalized URL for SCRAPE_CACHE_TTL seconds.
+    Agents receive the page without boilerplate and duplicates, within SCRAPE_TOKEN_BUDGET tokens.
+    """
+
+    def _fetch(self, **kwargs):
+        return super()._run(**kwargs)
+
+    def _run(self, **kwargs):
+        url = kwargs.get("website_url") or getattr(self, "website_url", None) or ""
+        with span("tool.scrape", url=url) as s:
+            raw = _cached_call("scrape", normalize_url(url), SCRAPE_CACHE_TTL, lambda: self._fetch(**kwargs))
+            out, tokens = compact(raw, "scrape")
+            s.set(**tokens)
+            return out
+
+@contextmanager
+def track_run() -> Iterator[Dict[str, Dict[str, int]]]:
+    """
+    Counts the cache hits and misses of one analysis run, per tool. Like
+    `compaction.track_run`, it covers tools called from this context or a copy of it, so
+    runs that overlap in one process do not count each other's calls.
+    """
+    counters = {tool: {"hits": 0, "misses": 0} for tool in _counters}
+    token = _run_counters.set(counters)
+    try:
+        yield counters
+    finally:
+        _run_counters.reset(token)
+
+def tool_cache_stats(counters: Optional[Dict[str, Dict[str, int]]] = None) -> dict:
+    """
+    Returns hit/miss counters per tool, plus the size of the shared disk cache. The counters
+    are those of one run when given (from `track_run`), else the totals of this process.
+    """
+    with _counters_lock:
+        stats = {tool: dict(c) for tool, c in (counters if counters is not None else _counters).items()}
+    disk = tool_cache.stats()
+    stats["entries"] = disk["entries"]
+    stats["bytes"] = disk["bytes"]
+    return stats
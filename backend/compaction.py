@@ -0,0 +1,188 @@
+# backend/compaction.py
+import contextvars
+import hashlib
+import os
+import re
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Token budgets for a single tool result as seen by the agents; 0 disables compaction for that tool.
+SEARCH_TOKEN_BUDGET = int(os.environ.get("SEARCH_TOKEN_BUDGET", "1200"))
+SCRAPE_TOKEN_BUDGET = int(os.environ.get("SCRAPE_TOKEN_BUDGET", "2000"))
+TOKEN_ENCODING = os.environ.get("TOKEN_ENCODING", "cl100k_base")
+
+BUDGETS = {"search": SEARCH_TOKEN_BUDGET, "scrape": SCRAPE_TOKEN_BUDGET}
+
+# Lines made only of navigation, consent and sharing chrome.
+_BOILERPLATE = re.compile(
+    r"(cookie|privacy policy|terms (of use|and conditions|& conditions)|all rights reserved|©|copyright|"
+    r"sign in|sign up|log ?in|register|subscribe|newsletter|advertisement|sponsored|skip to (main )?content|"
+    r"follow us|share (on|this)|download (the )?app|read more|click here|back to top|menu)",
+    re.IGNORECASE,
+)
+_URL = re.compile(r"https?://\S+")
+_WORD = re.compile(r"\w+")
+# Numbers and financial vocabulary make a passage worth keeping for the analysts.
+_SALIENT = re.compile(
+    r"(\d[\d,.]*\s?(%|cr|crore|lakh|bn|billion|mn|million)?|₹|rs\.?|revenue|profit|loss|margin|ebitda|eps|"
+    r"guidance|dividend|debt|order book|market cap|share price|target|rating|quarter|q[1-4]|fy\d{2})",
+    re.IGNORECASE,
+)
+
+_process_totals = {"calls": 0, "tokens_in": 0, "tokens_out": 0}
+_process_lock = threading.Lock()
+_run_ledger: contextvars.ContextVar = contextvars.ContextVar("compaction_ledger", default=None)
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """The tiktoken encoding, loaded once; None if tiktoken is unavailable (token counts are then estimated)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        return None
+
+def count_tokens(text: str) -> int:
+    """Counts tokens with tiktoken, or estimates them at four characters per token without it."""
+    enc = _encoding()
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+def _truncate(text: str, max_tokens: int) -> str:
+    enc = _encoding()
+    if enc is None:
+        return text[:max_tokens * 4]
+    return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+
+def strip_boilerplate(lines: List[str]) -> List[str]:
+    """Drops navigation, consent and sharing lines, menu items, and lines that are little more than links."""
+    kept = []
+    for line in lines:
+        words = _WORD.findall(_URL.sub("", line))
+        if not words:
+            continue
+        if len(words) <= 8 and _BOILERPLATE.search(line):
+            continue
+        # Menu items and button labels; short lines carrying figures are kept.
+        if len(words) < 3 and not any(ch.isdigit() for ch in line):
+            continue
+        # Menus and link lists: a few words around one or more URLs.
+        if _URL.search(line) and len(words) < 4:
+            continue
+        kept.append(line)
+    return kept
+
+def dedupe(units: List[str]) -> List[str]:
+    """Removes repeated paragraphs (compared case- and whitespace-insensitively), keeping the first."""
+    seen = set()
+    kept = []
+    for unit in units:
+        key = hashlib.blake2b(" ".join(_WORD.findall(unit.lower())).encode("utf-8"), digest_size=12).digest()
+        if key not in seen:
+            seen.add(key)
+            kept.append(unit)
+    return kept
+
+def select_within_budget(units: List[str], budget: int, query: Optional[str] = None) -> List[str]:
+    """
+    Extractive summary: keeps the most informative paragraphs that fit in `budget` tokens,
+    in their original order. Paragraphs score for numbers and financial terms, for words
+    of `query`, and slightly for appearing early; the first paragraph is always kept.
+    """
+    costs = [count_tokens(u) for u in units]
+    if sum(costs) <= budget:
+        return units
+    query_words = set(_WORD.findall(query.lower())) if query else set()
+    scores = []
+    for i, unit in enumerate(units):
+        words = _WORD.findall(unit.lower())
+        density = (len(_SALIENT.findall(unit)) + 2 * sum(w in query_words for w in words)) / max(len(words), 1)
+        scores.append(density + 1.0 / (i + 2))
+
+    chosen, used = set(), 0
+    for i in [0] + sorted(range(1, len(units)), key=scores.__getitem__, reverse=True):
+        if used + costs[i] <= budget:
+            chosen.add(i)
+            used += costs[i]
+    result = [units[i] for i in sorted(chosen)]
+    if not result:
+        # Even the first paragraph is over budget.
+        result = [_truncate(units[0], budget)]
+    return result
+
+def _split(text: str, tool: str) -> List[str]:
+    if tool == "search":
+        # Serper results are blocks of Title/Link/Snippet lines separated by "---" or blank lines.
+        return [b.strip() for b in re.split(r"\n\s*-{3,}\s*\n|\n\s*\n", text) if b.strip()]
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    return strip_boilerplate([line for line in lines if line])
+
+def compact(text: str, tool: str, query: Optional[str] = None) -> Tuple[str, Dict[str, int]]:
+    """
+    Shrinks a tool result before it enters an agent's context: boilerplate lines are dropped
+    (scraped pages), repeated paragraphs removed, and what remains is cut to the tool's token
+    budget by keeping the most informative paragraphs.
+
+    Args:
+        text (str): The raw tool output.
+        tool (str): "search" or "scrape"; selects the splitting rules and the budget.
+        query (Optional[str], optional): The search query, used to favour relevant paragraphs. Defaults to None.
+
+    Returns:
+        Tuple[str, Dict[str, int]]: The compacted text and its token counts before and after.
+    """
+    tokens_in = count_tokens(text)
+    budget = BUDGETS.get(tool, 0)
+    if budget <= 0:
+        return text, {"tokens_in": tokens_in, "tokens_out": tokens_in}
+    units = select_within_budget(dedupe(_split(text, tool)), budget, query)
+    out = ("\n\n" if tool == "search" else "\n").join(units)
+    tokens_out = count_tokens(out)
+    _record(tool, tokens_in, tokens_out)
+    return out, {"tokens_in": tokens_in, "tokens_out": tokens_out}
+
+def _record(tool: str, tokens_in: int, tokens_out: int) -> None:
+    ledger = _run_ledger.get()
+    with _process_lock:
+        _process_totals["calls"] += 1
+        _process_totals["tokens_in"] += tokens_in
+        _process_totals["tokens_out"] += tokens_out
+        if ledger is not None:
+            entry = ledger.setdefault(tool, {"calls": 0, "tokens_in": 0, "tokens_out": 0})
+            entry["calls"] += 1
+            entry["tokens_in"] += tokens_in
+            entry["tokens_out"] += tokens_out
+
+@contextmanager
+def track_run() -> Iterator[Dict[str, Dict[str, int]]]:
+    """
+    Collects the compaction counts of one analysis run, per tool. Tools called from this
+    context (or a copy of it, e.g. `contextvars.copy_context().run`) are recorded; threads
+    that start without a copy of it, and so without the ledger, are counted only in the
+    process totals.
+    """
+    ledger: Dict[str, Dict[str, int]] = {}
+    token = _run_ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _run_ledger.reset(token)
+
+def summarize(ledger: Dict[str, Dict[str, int]]) -> Dict:
+    """Adds run totals and the saved fraction to a ledger from `track_run`."""
+    tokens_in = sum(e["tokens_in"] for e in ledger.values())
+    tokens_out = sum(e["tokens_out"] for e in ledger.values())
+    return {
+        **{tool: dict(e) for tool, e in ledger.items()},
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "saved": round(1 - tokens_out / tokens_in, 3) if tokens_in else 0.0,
+    }
+
+def compaction_stats() -> Dict[str, int]:
+    """Returns the compaction totals for this process."""
+    with _process_lock:
+        return dict(_process_totals)
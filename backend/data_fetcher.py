@@ -1,12 +1,19 @@
 # backend/data_fetcher.py
-import yfinance as yf
+import contextvars
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import BytesIO
-import matplotlib.pyplot as plt
+from typing import Dict, List, Tuple, Union
+from backend import price_cache
+from backend.downsample import downsample
+from backend.providers import get_provider
+from backend.tracing import annotate, span, traced
 
 def symbol_for_yahoo(symbol: str, exchange: str) -> str:
     """
-    Formats a stock symbol for Yahoo Finance API based on its exchange.
+    Formats a stock symbol for the configured market-data provider based on its exchange.
+    With the default providers this is the Yahoo Finance symbol:
     - NSE symbols are appended with '.NS'.
     - BSE symbols are appended with '.BO'.
 
@@ -17,33 +24,185 @@ def symbol_for_yahoo(symbol: str, exchange: str) -> str:
     Returns:
         str: The formatted symbol for Yahoo Finance (e.g., "RELIANCE.NS").
     """
-    if exchange.upper() == "NSE":
-        return f"{symbol}.NS"
-    if exchange.upper() == "BSE":
-        return f"{symbol}.BO"
-    return symbol
+    return get_provider().symbol(symbol, exchange)
 
-def fetch_history(symbol: str, exchange: str, period: str = "6mo", interval: str = "1d") -> pd.DataFrame:
+def _cached_history(ticker: str, period: str, interval: str) -> Tuple[pd.DataFrame, str]:
     """
-    Fetches historical price data for a given stock symbol from Yahoo Finance.
+    Serves bars from the local price store, topping it up from the provider when needed.
+
+    Returns the bars together with where they came from:
+    - "cache": the series was fetched recently, no network access at all.
+    - "incremental": only the bars after the last stored timestamp were downloaded.
+    - "network": the store did not cover the period, so it was downloaded in full.
+    """
+    start = price_cache.period_start(period)
+    info = price_cache.series_info(ticker, interval)
+
+    if info is None or info["covered_from"] > start:
+        df = get_provider().history(ticker, period=period, interval=interval)
+        if df.empty:
+            return df, "network"
+        price_cache.store_bars(ticker, interval, df, covered_from=start)
+        source = "network"
+    elif time.time() - info["fetched_at"] >= price_cache.PRICE_CACHE_MAX_AGE and info["last_ts"] is not None:
+        try:
+            # Re-fetch from the last stored bar so a partial (intraday) bar gets completed.
+            new = get_provider().history(ticker, interval=interval, start=info["last_ts"])
+            price_cache.store_bars(ticker, interval, new, covered_from=info["covered_from"])
+        except Exception as e:
+            print(f"Incremental fetch for {ticker} failed, serving cached bars:", e)
+        source = "incremental"
+    else:
+        source = "cache"
+
+    info = price_cache.series_info(ticker, interval)
+    return price_cache.load_view(ticker, interval, start=start, tz=info["tz"], last_ts=info["last_ts"]), source
+
+@traced("price.fetch")
+def fetch_history(symbol: str, exchange: str, period: str = "6mo", interval: str = "1d", use_cache: bool = True) -> pd.DataFrame:
+    """
+    Fetches historical price data for a given stock symbol from the configured
+    market-data provider (Yahoo Finance by default, see `backend.providers`).
+    Bars are kept in a local price store (see `backend.price_cache`), so repeated calls only
+    download the bars that appeared since the last fetch, or nothing at all while the store is fresh.
 
     Args:
         symbol (str): The stock symbol.
         exchange (str): The stock exchange ("NSE" or "BSE").
         period (str, optional): The time period for the data (e.g., "1y", "6mo"). Defaults to "6mo".
         interval (str, optional): The data interval (e.g., "1d", "1wk"). Defaults to "1d".
+        use_cache (bool, optional): Read from and write to the local price store. Defaults to True.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the historical price data.
+        pd.DataFrame: A DataFrame containing the historical price data. `df.attrs["fetch"]` records
+                      the provider symbol, the source ("cache", "incremental", "network", or the
+                      provider name for uncached providers) and the
+                      fetch latency in milliseconds.
     """
-    ticker = symbol_for_yahoo(symbol, exchange)
-    t = yf.Ticker(ticker)
-    df = t.history(period=period, interval=interval)
+    started = time.perf_counter()
+    provider = get_provider()
+    ticker = provider.symbol(symbol, exchange)
+    if use_cache and provider.cacheable:
+        df, source = _cached_history(ticker, period, interval)
+    else:
+        df, source = provider.history(ticker, period=period, interval=interval), provider.name
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    df.attrs["fetch"] = {"ticker": ticker, "source": source, "elapsed_ms": round(elapsed_ms, 1)}
+    annotate(ticker=ticker, period=period, interval=interval, source=source, bars=len(df))
     return df
 
+@traced("price.fetch_many")
+def fetch_histories(symbols: List[str],
+                    exchange: str,
+                    period: str = "6mo",
+                    interval: str = "1d",
+                    chunk_size: int = 50,
+                    max_workers: int = 4,
+                    use_cache: bool = True,
+                    as_frame: bool = False) -> Tuple[Union[Dict[str, pd.DataFrame], pd.DataFrame], Dict[str, str]]:
+    """
+    Fetches historical price data for many symbols at once, e.g. to pre-warm a watchlist.
+    Symbols are grouped into bulk provider downloads of `chunk_size` tickers which run on a
+    bounded thread pool. With `use_cache`, fresh series are read from the local price store and
+    stale ones only download the bars after their last stored timestamp.
+
+    Args:
+        symbols (List[str]): The stock symbols (e.g., ["RELIANCE", "TCS"]).
+        exchange (str): The stock exchange ("NSE" or "BSE").
+        period (str, optional): The time period for the data. Defaults to "6mo".
+        interval (str, optional): The data interval. Defaults to "1d".
+        chunk_size (int, optional): Maximum number of symbols per bulk download. Defaults to 50.
+        max_workers (int, optional): Maximum number of concurrent bulk downloads. Defaults to 4.
+        use_cache (bool, optional): Read from and write to the local price store. Defaults to True.
+        as_frame (bool, optional): Return one wide DataFrame with (symbol, field) MultiIndex
+                                   columns instead of a dict. Defaults to False.
+
+    Returns:
+        Tuple: The histories (a dict of symbol -> DataFrame, or a wide DataFrame when `as_frame`)
+               and a dict of symbol -> error message for every symbol that could not be fetched.
+    """
+    provider = get_provider()
+    use_cache = use_cache and provider.cacheable
+    tickers = {provider.symbol(s, exchange): s for s in dict.fromkeys(symbols)}
+    start = price_cache.period_start(period) if use_cache else None
+    now = time.time()
+
+    # Split into series that are fresh in the store, stale (top-up only) and cold (full download).
+    fresh, stale, cold = [], [], []
+    for ticker in tickers:
+        info = price_cache.series_info(ticker, interval) if use_cache else None
+        if info is None or info["covered_from"] > start:
+            cold.append(ticker)
+        elif now - info["fetched_at"] >= price_cache.PRICE_CACHE_MAX_AGE and info["last_ts"] is not None:
+            stale.append((ticker, info["last_ts"]))
+        else:
+            fresh.append(ticker)
+
+    jobs = []
+    for i in range(0, len(cold), chunk_size):
+        jobs.append((cold[i:i + chunk_size], None))
+    stale.sort(key=lambda item: item[1])
+    for i in range(0, len(stale), chunk_size):
+        chunk = stale[i:i + chunk_size]
+        jobs.append(([t for t, _ in chunk], chunk[0][1]))
+
+    errors = {}
+    frames = {}
+
+    def run(chunk, since):
+        with span("price.download", tickers=len(chunk), incremental=since is not None):
+            if since is None:
+                got = provider.history_many(chunk, period=period, interval=interval)
+            else:
+                got = provider.history_many(chunk, interval=interval, start=since)
+        if use_cache:
+            for ticker, df in got.items():
+                price_cache.store_bars(ticker, interval, df, covered_from=start)
+            if since is not None:
+                # A top-up with no new bars (e.g. a holiday) leaves the ticker out of `got`; still
+                # mark those series fetched, or every call would download them again.
+                for ticker in chunk:
+                    if ticker not in got:
+                        price_cache.store_bars(ticker, interval, pd.DataFrame(), covered_from=start)
+        return got
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        # Each download runs in a copy of the caller's context so its span nests under this call.
+        futures = {pool.submit(contextvars.copy_context().run, run, chunk, since): (chunk, since) for chunk, since in jobs}
+        for fut in as_completed(futures):
+            chunk, since = futures[fut]
+            try:
+                got = fut.result()
+            except Exception as e:
+                got = {}
+                for ticker in chunk:
+                    errors[tickers[ticker]] = f"Bulk download failed: {e}"
+            for ticker in chunk:
+                symbol = tickers[ticker]
+                if use_cache and (since is not None or ticker in got):
+                    # Served from the store below; stale series keep their bars even if the top-up failed.
+                    fresh.append(ticker)
+                elif ticker in got:
+                    frames[symbol] = got[ticker]
+                elif symbol not in errors:
+                    errors[symbol] = "No price data returned."
+
+    for ticker in fresh:
+        info = price_cache.series_info(ticker, interval)
+        frames[tickers[ticker]] = price_cache.load_view(ticker, interval, start=start, tz=info["tz"], last_ts=info["last_ts"])
+        errors.pop(tickers[ticker], None)
+    frames = {s: frames[s] for s in tickers.values() if s in frames}
+    annotate(symbols=len(tickers), fetched=len(frames), downloads=len(jobs), failed=len(errors))
+
+    if as_frame:
+        return (pd.concat(frames, axis=1) if frames else pd.DataFrame()), errors
+    return frames, errors
+
+@traced("chart.render")
 def plot_history_to_bytes(df: pd.DataFrame, title: str = "Price") -> BytesIO:
     """
     Generates a PNG plot of the closing price from a DataFrame and returns it as bytes.
+    Histories longer than CHART_MAX_POINTS bars are downsampled with LTTB first.
 
     Args:
         df (pd.DataFrame): DataFrame containing stock history with a 'Close' column.
@@ -52,8 +211,13 @@ def plot_history_to_bytes(df: pd.DataFrame, title: str = "Price") -> BytesIO:
     Returns:
         BytesIO: A bytes buffer containing the PNG image of the plot.
     """
-    plt.ioff()
-    fig, ax = plt.subplots(figsize=(8, 4))
+    # Rasterising tens of thousands of points is slow and invisible at this size.
+    df = downsample(df)
+    # Deferred: only needed for PDF charts. The object API (no pyplot) keeps no global figure
+    # state, so concurrent sessions can render charts from different threads safely.
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(8, 4))
+    ax = fig.subplots()
     df['Close'].plot(ax=ax)
     ax.set_title(title)
     ax.set_ylabel("Price (INR)")
@@ -61,6 +225,5 @@ def plot_history_to_bytes(df: pd.DataFrame, title: str = "Price") -> BytesIO:
     buf = BytesIO()
     fig.tight_layout()
     fig.savefig(buf, format="png", dpi=120)
-    plt.close(fig)
     buf.seek(0)
     return buf
@@ -0,0 +1,144 @@
+# backend/disk_cache.py
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+"""
+
+class DiskCache:
+    """
+    A small persistent key/value cache backed by SQLite, shared by every session and process
+    that opens the same file.
+
+    Entries expire after `ttl` seconds. When the cache holds more than `max_entries` entries
+    or `max_bytes` bytes of values, the least recently used entries are evicted. Hit and miss
+    counters are kept per process.
+
+    Args:
+        path (Path): The SQLite file to store entries in.
+        ttl (Optional[float], optional): Default time-to-live in seconds; None never expires. Defaults to None.
+        max_entries (Optional[int], optional): Maximum number of entries. Defaults to None (unbounded).
+        max_bytes (Optional[int], optional): Maximum total size of the stored values. Defaults to None (unbounded).
+    """
+
+    def __init__(self, path: Path, ttl: Optional[float] = None, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _session(self):
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            if not self._ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                self._ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the value stored under `key`, or None if it is missing or expired."""
+        now = time.time()
+        with self._session() as conn:
+            row = conn.execute("SELECT value, expires_at FROM entries WHERE key=?", (key,)).fetchone()
+            if row is not None and row[1] is not None and row[1] <= now:
+                conn.execute("DELETE FROM entries WHERE key=?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE entries SET accessed_at=? WHERE key=?", (now, key))
+        self._count(row is not None)
+        return None if row is None else bytes(row[0])
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Stores `value` under `key`, then evicts expired and least recently used entries."""
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl is not None else None
+        with self._session() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), len(value), now, expires_at, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at<=?", (now,))
+        if self.max_entries is None and self.max_bytes is None:
+            return
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if (self.max_entries is None or count <= self.max_entries) and (self.max_bytes is None or total <= self.max_bytes):
+            return
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            if (self.max_entries is None or count <= self.max_entries) and (self.max_bytes is None or total <= self.max_bytes):
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key=?", doomed)
+
+    def get_json(self, key: str) -> Optional[Any]:
+        """Like `get`, for values stored with `set_json`."""
+        raw = self.get(key)
+        return None if raw is None else json.loads(raw.decode("utf-8"))
+
+    def set_json(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores a JSON-serialisable value under `key`."""
+        self.set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"), ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        """Removes `key` from the cache if present."""
+        with self._session() as conn:
+            conn.execute("DELETE FROM entries WHERE key=?", (key,))
+
+    def clear(self) -> None:
+        """Removes every entry and resets the hit/miss counters."""
+        with self._session() as conn:
+            conn.execute("DELETE FROM entries")
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this process together with the current size of the cache."""
+        with self._session() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
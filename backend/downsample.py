@@ -0,0 +1,104 @@
+# backend/downsample.py
+import os
+
+import numpy as np
+import pandas as pd
+
+# Charts with more bars than this are downsampled before plotting.
+CHART_MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", "2000"))
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Selects `n_out` points with Largest-Triangle-Three-Buckets, which keeps the visual shape
+    of a line (peaks, troughs, trend changes) far better than taking every k-th point.
+
+    The series is split into `n_out - 2` buckets between the fixed first and last points.
+    For every bucket the point forming the largest triangle with the previously selected
+    point and the average of the next bucket is kept. Bucket averages and triangle areas
+    are computed with NumPy; only the walk over buckets is a Python loop.
+
+    Args:
+        x (np.ndarray): Monotonic x coordinates (e.g., timestamps as int64).
+        y (np.ndarray): The values to preserve.
+        n_out (int): Number of points to keep (at least 3).
+
+    Returns:
+        np.ndarray: Sorted indices of the selected points.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket edges over the interior points 1..n-2.
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    # Average of every bucket, plus the last point as the "next bucket" of the final one.
+    counts = ends - starts
+    avg_x = np.append(np.add.reduceat(x[:-1], starts) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], starts) / counts, y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = starts[i], ends[i]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Selects about `n_out` points as a min/max envelope: the lowest and highest point of each
+    of `n_out // 2` equal buckets, plus the first and last points. Fully vectorized.
+
+    Args:
+        y (np.ndarray): The values to preserve.
+        n_out (int): Approximate number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted, unique indices of the selected points.
+    """
+    n = len(y)
+    buckets = max(1, n_out // 2)
+    if n_out >= n:
+        return np.arange(n)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = np.asarray(y, dtype=np.float64)
+    grid = padded.reshape(buckets, size)
+    # Buckets made only of padding cannot occur (size is the ceiling), but guard all-NaN rows anyway.
+    valid = ~np.isnan(grid).all(axis=1)
+    offsets = np.arange(buckets)[valid] * size
+    lows = np.nanargmin(grid[valid], axis=1) + offsets
+    highs = np.nanargmax(grid[valid], axis=1) + offsets
+    return np.unique(np.concatenate(([0, n - 1], lows, highs)))
+
+def downsample(df: pd.DataFrame, max_points: int = CHART_MAX_POINTS, column: str = "Close", method: str = "lttb") -> pd.DataFrame:
+    """
+    Reduces a price DataFrame to at most about `max_points` rows for plotting, choosing the
+    rows that preserve the shape of `column`. Frames within budget are returned unchanged.
+
+    Args:
+        df (pd.DataFrame): Price history indexed by timestamp.
+        max_points (int, optional): The point budget. Defaults to CHART_MAX_POINTS.
+        column (str, optional): The column whose shape is preserved. Defaults to "Close".
+        method (str, optional): "lttb" or "minmax". Defaults to "lttb".
+
+    Returns:
+        pd.DataFrame: The selected rows, in their original order.
+    """
+    if max_points <= 0 or len(df) <= max_points:
+        return df
+    y = df[column].to_numpy(dtype=np.float64)
+    if method == "minmax":
+        idx = minmax_indices(y, max_points)
+    elif method == "lttb":
+        x = df.index.asi8 if isinstance(df.index, pd.DatetimeIndex) else np.arange(len(df))
+        idx = lttb_indices(x, y, max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method!r}")
+    return df.iloc[idx]
@@ -0,0 +1,128 @@
+# backend/indicators.py
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Daily bars per year, for annualising volatility.
+TRADING_DAYS = 252
+
+def compute_indicators(df: pd.DataFrame, periods_per_year: int = TRADING_DAYS) -> pd.DataFrame:
+    """
+    Computes technical indicators for a price history in one vectorized pass: every column
+    is a whole-array NumPy/pandas operation, with no per-bar Python loop.
+
+    Args:
+        df (pd.DataFrame): History from `fetch_history` with 'High', 'Low', 'Close' and 'Volume' columns.
+        periods_per_year (int, optional): Bars per year, for annualised volatility. Defaults to TRADING_DAYS.
+
+    Returns:
+        pd.DataFrame: One row per bar with sma_20/50/200, ema_12/26, rsi_14, macd, macd_signal,
+                      macd_hist, atr_14, volatility_20 (annualised), drawdown and volume_z_20.
+    """
+    close = df["Close"].astype(np.float64)
+    high = df["High"].astype(np.float64) if "High" in df else close
+    low = df["Low"].astype(np.float64) if "Low" in df else close
+    out = pd.DataFrame(index=df.index)
+
+    for window in (20, 50, 200):
+        out[f"sma_{window}"] = close.rolling(window).mean()
+    out["ema_12"] = close.ewm(span=12, adjust=False).mean()
+    out["ema_26"] = close.ewm(span=26, adjust=False).mean()
+
+    # RSI and ATR use Wilder's smoothing (an EMA with alpha = 1/14).
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["rsi_14"] = 100 - 100 / (1 + gain / loss)
+    out.loc[(loss == 0) & (gain > 0), "rsi_14"] = 100.0
+
+    out["macd"] = out["ema_12"] - out["ema_26"]
+    out["macd_signal"] = out["macd"].ewm(span=9, adjust=False).mean()
+    out["macd_hist"] = out["macd"] - out["macd_signal"]
+
+    prev_close = close.shift(1)
+    true_range = np.maximum.reduce([
+        (high - low).to_numpy(),
+        (high - prev_close).abs().to_numpy(),
+        (low - prev_close).abs().to_numpy(),
+    ])
+    out["atr_14"] = pd.Series(true_range, index=df.index).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+
+    log_returns = np.log(close / prev_close)
+    out["volatility_20"] = log_returns.rolling(20).std() * np.sqrt(periods_per_year)
+    out["drawdown"] = close / close.cummax() - 1
+
+    if "Volume" in df:
+        volume = df["Volume"].astype(np.float64)
+        mean, std = volume.rolling(20).mean(), volume.rolling(20).std()
+        out["volume_z_20"] = (volume - mean) / std.replace(0, np.nan)
+    else:
+        out["volume_z_20"] = np.nan
+    return out
+
+def _num(value, digits: int = 4) -> Optional[float]:
+    """A JSON-safe rounded float; None for NaN/inf."""
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
+
+def indicator_summary(df: pd.DataFrame, periods_per_year: int = TRADING_DAYS) -> Dict[str, Optional[float]]:
+    """
+    Returns the latest value of every indicator plus whole-period statistics (max drawdown,
+    period return), as a flat JSON-safe dict suitable for the analysis payload.
+
+    Args:
+        df (pd.DataFrame): History from `fetch_history`.
+        periods_per_year (int, optional): Bars per year, for annualised volatility. Defaults to TRADING_DAYS.
+
+    Returns:
+        Dict[str, Optional[float]]: Indicator values; None where the history is too short.
+    """
+    if df.empty:
+        return {}
+    ind = compute_indicators(df, periods_per_year)
+    close = df["Close"].astype(np.float64)
+    latest = ind.iloc[-1]
+    summary = {name: _num(latest[name]) for name in ind.columns}
+    summary["max_drawdown"] = _num(ind["drawdown"].min())
+    summary["period_return"] = _num(close.iloc[-1] / close.iloc[0] - 1)
+    summary["bars"] = len(df)
+    return summary
+
+def _fmt(value, spec: str, suffix: str = "") -> str:
+    return "n/a" if value is None else f"{value:{spec}}{suffix}"
+
+def format_indicators(summary: Dict) -> str:
+    """Renders an indicator summary as compact text for the agents' task descriptions."""
+    if not summary:
+        return "Not available."
+    s = summary
+    pct = lambda v: None if v is None else v * 100  # noqa: E731
+    trend = "n/a"
+    if s.get("sma_50") is not None and s.get("sma_200") is not None:
+        trend = "SMA50 above SMA200" if s["sma_50"] > s["sma_200"] else "SMA50 below SMA200"
+    return "; ".join([
+        f"SMA20 {_fmt(s.get('sma_20'), '.2f')}, SMA50 {_fmt(s.get('sma_50'), '.2f')}, SMA200 {_fmt(s.get('sma_200'), '.2f')} ({trend})",
+        f"EMA12 {_fmt(s.get('ema_12'), '.2f')}, EMA26 {_fmt(s.get('ema_26'), '.2f')}",
+        f"RSI14 {_fmt(s.get('rsi_14'), '.1f')}",
+        f"MACD {_fmt(s.get('macd'), '.3f')} (signal {_fmt(s.get('macd_signal'), '.3f')}, histogram {_fmt(s.get('macd_hist'), '.3f')})",
+        f"ATR14 {_fmt(s.get('atr_14'), '.2f')}",
+        f"20-day annualised volatility {_fmt(pct(s.get('volatility_20')), '.1f', '%')}",
+        f"drawdown from peak {_fmt(pct(s.get('drawdown')), '.1f', '%')} (max {_fmt(pct(s.get('max_drawdown')), '.1f', '%')})",
+        f"return over {s.get('bars', 0)} bars {_fmt(pct(s.get('period_return')), '.1f', '%')}",
+        f"volume z-score {_fmt(s.get('volume_z_20'), '.2f')}",
+    ])
+
+def report_metrics(summary: Dict) -> Dict[str, str]:
+    """Picks the headline indicators for the report's key-metrics boxes (`extra_metrics`)."""
+    if not summary:
+        return {}
+    pct = lambda v: None if v is None else v * 100  # noqa: E731
+    return {
+        "RSI (14)": _fmt(summary.get("rsi_14"), ".1f"),
+        "MACD hist": _fmt(summary.get("macd_hist"), ".2f"),
+        "ATR (14)": _fmt(summary.get("atr_14"), ".2f"),
+        "Volatility (20d, ann.)": _fmt(pct(summary.get("volatility_20")), ".1f", "%"),
+        "Max drawdown": _fmt(pct(summary.get("max_drawdown")), ".1f", "%"),
+    }
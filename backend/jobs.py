@@ -0,0 +1,332 @@
+# backend/jobs.py
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Analyses submitted with `submit_job` run in worker processes; status, progress and results
+# live in this SQLite file so any session (or a reopened tab) can poll and reattach.
+JOBS_DB_PATH = Path(os.environ.get("JOBS_DB_PATH", "data/cache/jobs.sqlite3"))
+JOBS_MAX_WORKERS = int(os.environ.get("JOBS_MAX_WORKERS", "2"))
+# Submissions are rejected while this many jobs are already waiting for a worker.
+JOBS_MAX_QUEUED = int(os.environ.get("JOBS_MAX_QUEUED", "20"))
+# Number of crew tasks; used to turn finished tasks into a progress fraction.
+_TASK_COUNT = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    force_refresh INTEGER NOT NULL DEFAULT 0,
+    progress REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner_pid INTEGER,
+    owner_host TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+# Columns added after the first release; databases created before them are migrated on open.
+_ADDED_COLUMNS = {"owner_pid": "INTEGER", "owner_host": "TEXT"}
+_HOST = socket.gethostname()
+
+_initialised = set()
+_executor = None
+_executor_lock = threading.Lock()
+_recovered = False
+
+@contextmanager
+def _session(db_path: Optional[Path] = None):
+    """Yields a connection to the jobs database that commits on success and is always closed."""
+    path = Path(db_path or JOBS_DB_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        if str(path) not in _initialised:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            existing = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    try:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+                    except sqlite3.OperationalError:
+                        pass  # added by another process in the meantime
+            _initialised.add(str(path))
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+# ---------- Worker side ----------
+
+def _worker_init():
+    """Runs once per worker process; mirrors the sqlite3 swap FinoTron.py does for crewai."""
+    try:
+        import sys
+        __import__("pysqlite3")
+        sys.modules["sqlite3"] = sys.modules.pop("pysqlite3")
+    except ImportError:
+        pass
+
+def _run_job(job_id: str, db_path: str) -> None:
+    """Executes one analysis in a worker process and persists its progress and outcome."""
+    with _session(db_path) as conn:
+        row = conn.execute("SELECT payload, force_refresh FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return  # deleted or pruned while it waited; nothing to run or record
+        conn.execute("UPDATE jobs SET status='running', started_at=?, owner_pid=?, owner_host=? WHERE id=?",
+                     (time.time(), os.getpid(), _HOST, job_id))
+    payload = json.loads(row["payload"])
+
+    seq = [0]
+    tasks_done = [0]
+
+    def record(event: Dict) -> None:
+        # Token deltas are only useful live; persisting them would flood the database.
+        if event.get("type") == "overview_delta":
+            return
+        if event.get("type") == "task":
+            tasks_done[0] += 1
+        seq[0] += 1
+        with _session(db_path) as c:
+            c.execute("INSERT INTO job_events (job_id, seq, event, created_at) VALUES (?, ?, ?, ?)",
+                      (job_id, seq[0], json.dumps(event, ensure_ascii=False), time.time()))
+            c.execute("UPDATE jobs SET progress=? WHERE id=?", (min(tasks_done[0] / _TASK_COUNT, 1.0), job_id))
+
+    try:
+        from backend.agent_client import call_agent_api
+        result = call_agent_api(payload, force_refresh=bool(row["force_refresh"]), on_event=record)
+    except Exception as e:
+        with _session(db_path) as conn:
+            conn.execute("UPDATE jobs SET status='failed', error=?, finished_at=? WHERE id=?",
+                         (str(e), time.time(), job_id))
+        return
+    with _session(db_path) as conn:
+        conn.execute("UPDATE jobs SET status='done', progress=1, result=?, finished_at=? WHERE id=?",
+                     (json.dumps(result, ensure_ascii=False), time.time(), job_id))
+
+# ---------- Server side ----------
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Returns the process pool, creating it on first use and again after a worker crash broke it."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=JOBS_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_worker_init,
+            )
+        return _executor
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Drops a broken pool so the next `_get_executor` builds a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+def _alive(pid: Optional[int]) -> bool:
+    """Whether a process of this host is still running; unknown owners (older rows) count as gone."""
+    if not pid:
+        return False
+    if os.name == "nt":
+        return True  # os.kill would terminate the process there; leave such jobs alone
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _recover() -> None:
+    """
+    Fails running jobs and takes over queued ones whose owner process on this host is gone
+    (a restarted or crashed server). Jobs of live processes, or of other hosts, are left alone.
+    """
+    now = time.time()
+    with _session() as conn:
+        rows = conn.execute("SELECT id, status, owner_pid FROM jobs WHERE status IN ('queued', 'running') "
+                            "AND (owner_host=? OR owner_host IS NULL)", (_HOST,)).fetchall()
+        queued = []
+        for r in rows:
+            if _alive(r["owner_pid"]):
+                continue
+            if r["status"] == "running":
+                conn.execute("UPDATE jobs SET status='failed', error='Interrupted by a server restart.', finished_at=? "
+                             "WHERE id=? AND status='running' AND owner_pid IS ?", (now, r["id"], r["owner_pid"]))
+            # Claim the job; another server recovering at the same time gets a rowcount of 0.
+            elif conn.execute("UPDATE jobs SET owner_pid=?, owner_host=? WHERE id=? AND status='queued' "
+                              "AND owner_pid IS ?", (os.getpid(), _HOST, r["id"], r["owner_pid"])).rowcount:
+                queued.append(r["id"])
+    for job_id in queued:
+        try:
+            _dispatch(job_id)
+        except Exception as e:
+            _fail(job_id, f"Could not be requeued: {e}")
+
+def _recover_once() -> None:
+    """Runs `_recover` on this process's first submission, so importing the module never touches the database."""
+    global _recovered
+    with _executor_lock:
+        if _recovered:
+            return
+        _recovered = True
+    try:
+        _recover()
+    except (OSError, sqlite3.Error) as e:
+        print("Recovering background jobs failed:", e)
+
+def _fail(job_id: str, error: str) -> None:
+    with _session() as conn:
+        conn.execute("UPDATE jobs SET status='failed', error=?, finished_at=? "
+                     "WHERE id=? AND status IN ('queued', 'running')", (error, time.time(), job_id))
+
+def _dispatch(job_id: str) -> None:
+    executor = _get_executor()
+    try:
+        future = executor.submit(_run_job, job_id, str(JOBS_DB_PATH))
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        future = _get_executor().submit(_run_job, job_id, str(JOBS_DB_PATH))
+
+    def on_done(fut):
+        # The worker records its own outcome; this only catches crashed worker processes.
+        if fut.cancelled():
+            return
+        exc = fut.exception()
+        if exc is None:
+            return
+        if isinstance(exc, BrokenProcessPool):
+            # A crash takes the whole pool down, including jobs that never started: requeue
+            # those on a fresh pool and fail only the ones that were running.
+            _discard_executor(executor)
+            with _session() as conn:
+                row = conn.execute("SELECT status FROM jobs WHERE id=?", (job_id,)).fetchone()
+            if row is not None and row["status"] == "queued":
+                try:
+                    _dispatch(job_id)
+                    return
+                except Exception as e:
+                    exc = e
+        _fail(job_id, f"Worker crashed: {exc}")
+
+    future.add_done_callback(on_done)
+
+def submit_job(payload: Dict, force_refresh: bool = False) -> str:
+    """
+    Queues an analysis for a background worker process.
+
+    Args:
+        payload (Dict): The analysis request, as passed to `call_agent_api`.
+        force_refresh (bool, optional): Bypass the agent result cache. Defaults to False.
+
+    Raises:
+        RuntimeError: If JOBS_MAX_QUEUED jobs are already waiting.
+
+    Returns:
+        str: The job id to poll with `get_job`.
+    """
+    _recover_once()
+    job_id = uuid.uuid4().hex[:12]
+    with _session() as conn:
+        (waiting,) = conn.execute("SELECT COUNT(*) FROM jobs WHERE status='queued'").fetchone()
+        if waiting >= JOBS_MAX_QUEUED:
+            raise RuntimeError(f"The analysis queue is full ({waiting} jobs waiting); try again shortly.")
+        conn.execute("INSERT INTO jobs (id, status, payload, force_refresh, created_at, owner_pid, owner_host) "
+                     "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                     (job_id, json.dumps(payload, ensure_ascii=False), int(force_refresh), time.time(),
+                      os.getpid(), _HOST))
+    try:
+        _dispatch(job_id)
+    except Exception as e:
+        _fail(job_id, f"Could not be queued: {e}")
+        raise
+    return job_id
+
+def _row_to_job(row: sqlite3.Row) -> Dict:
+    return {
+        "id": row["id"],
+        "status": row["status"],
+        "payload": json.loads(row["payload"]),
+        "progress": row["progress"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+    }
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """
+    Returns a job's status ("queued", "running", "done" or "failed"), progress fraction,
+    payload, result or error, timestamps and the events recorded so far; None if unknown.
+    """
+    with _session() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        events = [json.loads(r["event"]) for r in
+                  conn.execute("SELECT event FROM job_events WHERE job_id=? ORDER BY seq", (job_id,))]
+    job = _row_to_job(row)
+    job["events"] = events
+    return job
+
+def list_jobs(limit: int = 20) -> List[Dict]:
+    """Returns the most recently submitted jobs, newest first, without their events."""
+    with _session() as conn:
+        rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+    return [_row_to_job(r) for r in rows]
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def job_stats(limit: int = 200) -> Dict:
+    """
+    Summarises the queue: job counts per status plus p50/p95 queue wait and run time
+    (seconds) over the last `limit` finished jobs.
+    """
+    with _session() as conn:
+        counts = {r["status"]: r["n"] for r in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+        rows = conn.execute(
+            "SELECT created_at, started_at, finished_at FROM jobs WHERE finished_at IS NOT NULL AND started_at IS NOT NULL "
+            "ORDER BY finished_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+    waits = [r["started_at"] - r["created_at"] for r in rows]
+    runs = [r["finished_at"] - r["started_at"] for r in rows]
+    return {
+        "counts": counts,
+        "workers": JOBS_MAX_WORKERS,
+        "queue_wait_p50": _percentile(waits, 0.5),
+        "queue_wait_p95": _percentile(waits, 0.95),
+        "run_time_p50": _percentile(runs, 0.5),
+        "run_time_p95": _percentile(runs, 0.95),
+    }
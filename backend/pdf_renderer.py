@@ -0,0 +1,162 @@
+# backend/pdf_renderer.py
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from backend import tracing
+
+# Worker processes that render PDFs off the Streamlit threads; 0 renders in-process instead.
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Renders admitted at once (running + waiting); further submissions wait for a free slot.
+PDF_RENDER_MAX_PENDING = int(os.environ.get("PDF_RENDER_MAX_PENDING", "16"))
+# Seconds to wait for a free slot, and for a render to finish.
+PDF_RENDER_TIMEOUT = float(os.environ.get("PDF_RENDER_TIMEOUT", "120"))
+
+class RendererBusy(RuntimeError):
+    """No render slot freed up within PDF_RENDER_TIMEOUT seconds."""
+
+_WARMUP_HTML = "<html><body><h1>Warm-up</h1><p>Loads the engine and fonts.</p></body></html>"
+
+def _worker_init():
+    """Imports the PDF engines and renders a tiny document so fonts and the stylesheet are loaded before the first job."""
+    from backend.report import html_to_pdf_bytes
+    try:
+        html_to_pdf_bytes(_WARMUP_HTML, include_base_css=True)
+    except Exception as e:
+        print("PDF worker warm-up failed:", e)
+
+def _render(html: str, base_url: Optional[str], css_string: Optional[str], include_base_css: bool,
+            submitted_at: float, trace_ctx: Optional[Tuple[str, str]] = None) -> Tuple[bytes, dict]:
+    """Runs in a worker process; returns the PDF and its timing in milliseconds and engine."""
+    from backend.report import html_to_pdf
+    started = time.time()
+    # The worker's spans join the submitting trace in the shared trace log.
+    with tracing.attach(trace_ctx):
+        if trace_ctx is not None:
+            tracing.record("pdf.queue", submitted_at, (started - submitted_at) * 1000)
+        pdf, engine = html_to_pdf(html, base_url=base_url, css_string=css_string, include_base_css=include_base_css)
+    finished = time.time()
+    return pdf, {
+        "queue_ms": round((started - submitted_at) * 1000, 1),
+        "render_ms": round((finished - started) * 1000, 1),
+        "pid": os.getpid(),
+        "engine": engine,
+    }
+
+class PdfRenderer:
+    """
+    A pool of pre-initialised worker processes that turn HTML into PDF bytes with
+    `report.html_to_pdf_bytes`, so renders run in parallel across cores instead of holding
+    the GIL of the Streamlit process.
+
+    Args:
+        workers (int, optional): Number of worker processes. Defaults to PDF_RENDER_WORKERS.
+        max_pending (int, optional): Renders admitted at once. Defaults to PDF_RENDER_MAX_PENDING.
+    """
+
+    def __init__(self, workers: int = PDF_RENDER_WORKERS, max_pending: int = PDF_RENDER_MAX_PENDING):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+        )
+        self._stats_lock = threading.Lock()
+        self._stats = {"renders": 0, "failures": 0, "queue_ms": 0.0, "render_ms": 0.0, "last": None}
+
+    def submit(self, html: str, base_url: Optional[str] = None, css_string: Optional[str] = None,
+               include_base_css: bool = False) -> Future:
+        """
+        Queues a render and returns a Future resolving to (pdf_bytes, timing).
+
+        Raises:
+            RendererBusy: If no slot frees up within PDF_RENDER_TIMEOUT seconds.
+        """
+        if not self._slots.acquire(timeout=PDF_RENDER_TIMEOUT):
+            raise RendererBusy("PDF renderer queue is full; try again shortly.")
+        try:
+            current = tracing.current_span()
+            future = self._executor.submit(_render, html, base_url, css_string, include_base_css, time.time(),
+                                           current.context() if current else None)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future) -> None:
+        self._slots.release()
+        with self._stats_lock:
+            # Cancelled renders (see `shutdown`) have no exception to ask for; it would raise.
+            if future.cancelled() or future.exception() is not None:
+                self._stats["failures"] += 1
+                return
+            timing = future.result()[1]
+            self._stats["renders"] += 1
+            self._stats["queue_ms"] += timing["queue_ms"]
+            self._stats["render_ms"] += timing["render_ms"]
+            self._stats["last"] = timing
+
+    def prewarm(self) -> None:
+        """Starts every worker now, so each runs its warm-up render before the first real one arrives."""
+        # The executor only spawns workers on submission; one trivial task per worker starts them all.
+        for _ in range(self.workers):
+            self._executor.submit(os.getpid)
+
+    def render(self, html: str, base_url: Optional[str] = None, css_string: Optional[str] = None,
+               include_base_css: bool = False) -> Tuple[bytes, str]:
+        """
+        Renders HTML to PDF on the pool, waiting up to PDF_RENDER_TIMEOUT seconds; returns the
+        PDF bytes and the engine that rendered them.
+        """
+        pdf, timing = self.submit(html, base_url=base_url, css_string=css_string,
+                                  include_base_css=include_base_css).result(timeout=PDF_RENDER_TIMEOUT)
+        return pdf, timing["engine"]
+
+    def stats(self) -> dict:
+        """Returns render counts, mean queue/render time in milliseconds and the last render's timing."""
+        with self._stats_lock:
+            s = dict(self._stats)
+        n = s["renders"] or 1
+        return {
+            "workers": self.workers,
+            "renders": s["renders"],
+            "failures": s["failures"],
+            "mean_queue_ms": round(s["queue_ms"] / n, 1),
+            "mean_render_ms": round(s["render_ms"] / n, 1),
+            "last": s["last"],
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+def get_renderer() -> Optional[PdfRenderer]:
+    """Returns the process-wide renderer, or None when PDF_RENDER_WORKERS is 0."""
+    global _renderer
+    if PDF_RENDER_WORKERS <= 0:
+        return None
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PdfRenderer()
+        return _renderer
+
+def discard_renderer(renderer: PdfRenderer) -> None:
+    """Shuts down a renderer whose pool broke, so the next `get_renderer` builds a new one."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is renderer:
+            _renderer = None
+    renderer.shutdown()
+
+def prewarm() -> None:
+    """Creates the process-wide renderer and starts its workers; a no-op when PDF_RENDER_WORKERS is 0."""
+    renderer = get_renderer()
+    if renderer is not None:
+        renderer.prewarm()
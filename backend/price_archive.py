@@ -0,0 +1,252 @@
+# backend/price_archive.py
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers in one process are still serialised by _write_lock
+    fcntl = None
+
+# Column store of every series in the price store: one raw array file per field, memory-mapped
+# read-only by readers, so all sessions and worker processes share the OS page cache.
+PRICE_ARCHIVE_DIR = Path(os.environ.get("PRICE_ARCHIVE_DIR", "data/cache/archive"))
+PRICE_ARCHIVE_ENABLED = os.environ.get("PRICE_ARCHIVE_ENABLED", "1") != "0"
+# Series kept mapped per process; the least recently used are unmapped beyond this.
+PRICE_ARCHIVE_OPEN_MAX = int(os.environ.get("PRICE_ARCHIVE_OPEN_MAX", "256"))
+
+# DataFrame column -> file stem; every field is stored as float64, timestamps as int64 nanoseconds (UTC).
+FIELDS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume",
+    "Dividends": "dividends",
+    "Stock Splits": "splits",
+}
+_VERSION = 1
+
+_open: "OrderedDict[tuple, ArchivedSeries]" = OrderedDict()
+_open_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+class ArchivedSeries:
+    """
+    One (ticker, interval) series as memory-mapped arrays: `ts` (int64 UTC nanoseconds, sorted)
+    and one float64 array per field. Slices are views of the mapping, never copies.
+    """
+    def __init__(self, ticker: str, interval: str, tz: Optional[str], ts: np.ndarray,
+                 columns: Dict[str, np.ndarray], generation: int = 0):
+        self.ticker = ticker
+        self.interval = interval
+        self.tz = tz
+        self.ts = ts
+        self.columns = columns
+        self.generation = generation
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        """Epoch second of the last bar, as `price_cache.series_info` reports it; None when empty."""
+        return int(self.ts[-1] // 1_000_000_000) if len(self.ts) else None
+
+    def slice(self, start: int = 0, end: Optional[int] = None) -> "ArchivedSeries":
+        """Bars from `start` up to (excluding) `end`, in epoch seconds, as views of this series."""
+        lo = int(np.searchsorted(self.ts, start * 1_000_000_000, side="left"))
+        hi = len(self.ts) if end is None else int(np.searchsorted(self.ts, end * 1_000_000_000, side="left"))
+        return ArchivedSeries(self.ticker, self.interval, self.tz, self.ts[lo:hi],
+                              {name: arr[lo:hi] for name, arr in self.columns.items()}, self.generation)
+
+    def to_frame(self, tz: Optional[str] = None) -> pd.DataFrame:
+        """
+        The bars as a DataFrame shaped like `price_cache.load_bars`: Volume is cast back to int64
+        when it has no gaps, as there. The other columns wrap the mapped arrays without copying,
+        so the frame is read-only.
+        """
+        idx = pd.DatetimeIndex(np.asarray(self.ts).view("datetime64[ns]")).tz_localize("UTC")
+        tz = tz or self.tz
+        if tz:
+            idx = idx.tz_convert(tz)
+        idx.name = "Datetime" if self.interval.endswith(("m", "h")) else "Date"
+        columns = {name: self.columns[name] for name in FIELDS}
+        volume = columns["Volume"]
+        if not np.isnan(volume).any():
+            columns["Volume"] = volume.astype(np.int64)
+        return pd.DataFrame(columns, index=idx, copy=False)
+
+def _series_dir(ticker: str, interval: str) -> Path:
+    return PRICE_ARCHIVE_DIR / interval / quote(ticker, safe="")
+
+def _file(directory: Path, generation: int, stem: str) -> Path:
+    return directory / f"g{generation}.{stem}"
+
+def _read_meta(directory: Path) -> Optional[dict]:
+    try:
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == _VERSION else None
+
+def _write_meta(directory: Path, meta: dict) -> None:
+    # The meta file is the commit point: readers only map the rows and generation it names.
+    tmp = directory / f"meta.json.{os.getpid()}.{threading.get_ident()}.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, directory / "meta.json")
+
+def _map(path: Path, dtype, rows: int) -> np.ndarray:
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+
+def open_series(ticker: str, interval: str) -> Optional[ArchivedSeries]:
+    """
+    Returns the archived series mapped read-only, or None if it was never archived.
+    Mappings are reused until the series grows or is rewritten.
+    """
+    directory = _series_dir(ticker, interval)
+    meta = _read_meta(directory)
+    if meta is None:
+        return None
+    key = (ticker, interval)
+    with _open_lock:
+        series = _open.get(key)
+        if series is not None and series.generation == meta["generation"] and len(series) == meta["rows"]:
+            _open.move_to_end(key)
+            return series
+    rows, generation = meta["rows"], meta["generation"]
+    try:
+        series = ArchivedSeries(
+            ticker, interval, meta.get("tz"),
+            _map(_file(directory, generation, "ts"), np.int64, rows),
+            {name: _map(_file(directory, generation, stem), np.float64, rows) for name, stem in FIELDS.items()},
+            generation,
+        )
+    except (OSError, ValueError):
+        return None  # rewritten between reading the meta file and mapping it
+    with _open_lock:
+        _open[key] = series
+        _open.move_to_end(key)
+        while len(_open) > PRICE_ARCHIVE_OPEN_MAX:
+            _open.popitem(last=False)
+    return series
+
+@contextmanager
+def _locked(directory: Path) -> Iterator[None]:
+    """Serialises writers of one series across threads and processes."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with _write_lock, open(directory / ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _frame_arrays(df: pd.DataFrame):
+    """Sorted, de-duplicated UTC nanosecond timestamps and float64 field arrays of a bars frame."""
+    idx = df.index if isinstance(df.index, pd.DatetimeIndex) else pd.to_datetime(df.index)
+    utc = idx.tz_convert("UTC") if idx.tz is not None else idx.tz_localize("UTC")
+    ts = utc.as_unit("ns").asi8
+    cols = {name: (df[name].to_numpy(dtype=np.float64, na_value=np.nan) if name in df.columns
+                   else np.full(len(df), 0.0 if name in ("Dividends", "Stock Splits") else np.nan))
+            for name in FIELDS}
+    # Keep the last row of any repeated timestamp, like an upsert would.
+    order = np.argsort(ts, kind="stable")
+    ts = ts[order]
+    keep = np.append(ts[1:] != ts[:-1], True)
+    return ts[keep], {name: arr[order][keep] for name, arr in cols.items()}
+
+def _rewrite(directory: Path, meta: Optional[dict], ts: np.ndarray, cols: Dict[str, np.ndarray], tz) -> None:
+    """Writes the whole series under a new generation; readers of the old one keep their mapping."""
+    old = meta["generation"] if meta else None
+    generation = (old or 0) + 1
+    ts.astype(np.int64).tofile(_file(directory, generation, "ts"))
+    for name, stem in FIELDS.items():
+        cols[name].astype(np.float64).tofile(_file(directory, generation, stem))
+    _write_meta(directory, {"version": _VERSION, "generation": generation, "rows": len(ts), "tz": tz})
+    if old is not None:
+        for stem in ("ts", *FIELDS.values()):
+            try:
+                _file(directory, old, stem).unlink()  # open mappings keep the data until they are dropped
+            except OSError:
+                pass
+
+def write(ticker: str, interval: str, df: pd.DataFrame, tz: Optional[str] = None) -> int:
+    """
+    Upserts bars into the archive. Bars after the last archived one are appended to the field
+    files past the committed rows. Bars that reach back into the history, including a re-sent
+    partial last bar, make the series get rewritten as a new generation.
+
+    Args:
+        ticker (str): The provider symbol (e.g., "RELIANCE.NS").
+        interval (str): The bar interval (e.g., "1d").
+        df (pd.DataFrame): Bars indexed by timestamp, as returned by the provider or `load_bars`.
+        tz (Optional[str], optional): Timezone the series is presented in. Defaults to the index's.
+
+    Returns:
+        int: The number of bars in `df` that were stored.
+    """
+    if df.empty:
+        return 0
+    ts, cols = _frame_arrays(df)
+    tz = tz or (str(df.index.tz) if getattr(df.index, "tz", None) is not None else None)
+    directory = _series_dir(ticker, interval)
+    with _locked(directory):
+        meta = _read_meta(directory)
+        if meta is None:
+            _rewrite(directory, None, ts, cols, tz)
+            return len(ts)
+        rows, generation = meta["rows"], meta["generation"]
+        old_ts = _map(_file(directory, generation, "ts"), np.int64, rows)
+        overlap = rows - int(np.searchsorted(old_ts, ts[0], side="left"))
+        if overlap:
+            # Re-sent or interleaved bars: merge into a new generation, new values winning. Committed
+            # rows are never written in place, so frames already handed out keep their values.
+            keep = ~np.isin(old_ts, ts)
+            merged_ts = np.concatenate([old_ts[keep], ts])
+            order = np.argsort(merged_ts, kind="stable")
+            merged = {}
+            for name, stem in FIELDS.items():
+                old_col = _map(_file(directory, generation, stem), np.float64, rows)
+                merged[name] = np.concatenate([old_col[keep], cols[name]])[order]
+            del old_ts
+            _rewrite(directory, meta, merged_ts[order], merged, meta.get("tz") or tz)
+            return len(ts)
+        del old_ts
+
+        for stem, arr in (("ts", ts), *((FIELDS[name], cols[name]) for name in FIELDS)):
+            path = _file(directory, generation, stem)
+            itemsize = arr.dtype.itemsize
+            with open(path, "r+b") as f:
+                # Drop bytes past the committed rows (left by an interrupted append) before appending.
+                f.truncate(rows * itemsize)
+                f.seek(rows * itemsize)
+                f.write(arr.tobytes())
+        _write_meta(directory, {**meta, "rows": rows + len(ts), "tz": meta.get("tz") or tz})
+    return len(ts)
+
+def delete(ticker: Optional[str] = None) -> None:
+    """Removes one ticker's archived series (every interval), or the whole archive when none is given."""
+    import shutil
+
+    with _open_lock:
+        for key in [k for k in _open if ticker is None or k[0] == ticker]:
+            del _open[key]
+    if ticker is None:
+        shutil.rmtree(PRICE_ARCHIVE_DIR, ignore_errors=True)
+        return
+    if PRICE_ARCHIVE_DIR.exists():
+        for interval_dir in PRICE_ARCHIVE_DIR.iterdir():
+            shutil.rmtree(interval_dir / quote(ticker, safe=""), ignore_errors=True)
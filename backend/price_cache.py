@@ -0,0 +1,239 @@
+# backend/price_cache.py
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from backend import price_archive
+
+# Local OHLCV store shared by every session (and process) of the app.
+PRICE_CACHE_PATH = Path(os.environ.get("PRICE_CACHE_PATH", "data/cache/prices.sqlite3"))
+# Bars fetched less than this many seconds ago are served without touching the network.
+PRICE_CACHE_MAX_AGE = int(os.environ.get("PRICE_CACHE_MAX_AGE", "900"))
+
+# DataFrame column -> SQLite column
+_COLUMNS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume",
+    "Dividends": "dividends",
+    "Stock Splits": "splits",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL,
+    volume REAL, dividends REAL, splits REAL,
+    PRIMARY KEY (ticker, interval, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    tz TEXT,
+    covered_from INTEGER NOT NULL,
+    last_ts INTEGER,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (ticker, interval)
+);
+"""
+
+_initialised = set()
+
+def _connect(path: Optional[Path] = None) -> sqlite3.Connection:
+    """Opens a connection to the price store, creating the schema on first use."""
+    path = Path(path or PRICE_CACHE_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    if str(path) not in _initialised:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _initialised.add(str(path))
+    return conn
+
+@contextmanager
+def _session():
+    """Yields a connection that commits on success and is always closed."""
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+# ---------- Periods ----------
+
+def period_start(period: str, now: Optional[datetime] = None) -> int:
+    """
+    Converts a Yahoo Finance period string into the epoch second it starts at.
+
+    Args:
+        period (str): A yfinance period ("5d", "6mo", "1y", "ytd", "max", ...).
+        now (Optional[datetime], optional): Reference time (UTC). Defaults to the current time.
+
+    Returns:
+        int: Epoch seconds of the first bar the period covers (0 for "max").
+    """
+    now = now or datetime.now(timezone.utc)
+    p = period.strip().lower()
+    if p == "max":
+        return 0
+    if p == "ytd":
+        return int(datetime(now.year, 1, 1, tzinfo=timezone.utc).timestamp())
+    units = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+    for suffix, days in units.items():
+        if p.endswith(suffix) and p[:-len(suffix)].isdigit():
+            return int((now - timedelta(days=int(p[:-len(suffix)]) * days)).timestamp())
+    raise ValueError(f"Unsupported period: {period!r}")
+
+# ---------- Store ----------
+
+def series_info(ticker: str, interval: str) -> Optional[dict]:
+    """
+    Returns bookkeeping for a cached (ticker, interval) series, or None if it was never stored.
+
+    The dict has keys 'tz', 'covered_from', 'last_ts' and 'fetched_at'.
+    """
+    with _session() as conn:
+        row = conn.execute(
+            "SELECT tz, covered_from, last_ts, fetched_at FROM series WHERE ticker=? AND interval=?",
+            (ticker, interval),
+        ).fetchone()
+    if row is None:
+        return None
+    return {"tz": row[0], "covered_from": row[1], "last_ts": row[2], "fetched_at": row[3]}
+
+def store_bars(ticker: str, interval: str, df: pd.DataFrame, covered_from: int) -> int:
+    """
+    Upserts bars into the store and marks the series as freshly fetched.
+    Rows already present for the same timestamp are replaced, so a partially formed
+    last bar is corrected when it is downloaded again.
+
+    Args:
+        ticker (str): The Yahoo Finance symbol (e.g., "RELIANCE.NS").
+        interval (str): The bar interval (e.g., "1d").
+        df (pd.DataFrame): Bars indexed by timestamp, as returned by yfinance.
+        covered_from (int): Epoch second from which the store now holds complete history.
+
+    Returns:
+        int: The number of bars written.
+    """
+    rows = []
+    tz = None
+    if not df.empty:
+        idx = df.index if isinstance(df.index, pd.DatetimeIndex) else pd.to_datetime(df.index)
+        tz = str(idx.tz) if idx.tz is not None else None
+        utc = idx.tz_convert("UTC") if idx.tz is not None else idx.tz_localize("UTC")
+        stamps = (utc - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+        cols = [df[c].astype(float).tolist() if c in df.columns else [None] * len(df) for c in _COLUMNS]
+        rows = [(ticker, interval, int(ts), *vals) for ts, *vals in zip(stamps, *cols)]
+
+    with _session() as conn:
+        if rows:
+            conn.executemany(
+                "INSERT OR REPLACE INTO bars (ticker, interval, ts, open, high, low, close, volume, dividends, splits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        conn.execute(
+            """
+            INSERT INTO series (ticker, interval, tz, covered_from, last_ts, fetched_at)
+            VALUES (?, ?, ?, ?, (SELECT MAX(ts) FROM bars WHERE ticker=? AND interval=?), ?)
+            ON CONFLICT (ticker, interval) DO UPDATE SET
+                tz=COALESCE(excluded.tz, series.tz),
+                covered_from=MIN(series.covered_from, excluded.covered_from),
+                last_ts=excluded.last_ts,
+                fetched_at=excluded.fetched_at
+            """,
+            (ticker, interval, tz, int(covered_from), ticker, interval, time.time()),
+        )
+    if rows and price_archive.PRICE_ARCHIVE_ENABLED:
+        try:
+            price_archive.write(ticker, interval, df, tz=tz)
+        except Exception as e:
+            # `load_view` notices the archive lagging behind and rebuilds the series from this store.
+            print(f"Archiving {ticker} ({interval}) failed:", e)
+    return len(rows)
+
+def load_bars(ticker: str, interval: str, start: int = 0, tz: Optional[str] = None) -> pd.DataFrame:
+    """
+    Reads cached bars for a series from `start` (epoch seconds) onwards.
+
+    Args:
+        ticker (str): The Yahoo Finance symbol.
+        interval (str): The bar interval.
+        start (int, optional): First epoch second to include. Defaults to 0.
+        tz (Optional[str], optional): Timezone to convert the index to. Defaults to UTC.
+
+    Returns:
+        pd.DataFrame: Bars in the same shape yfinance returns them.
+    """
+    with _session() as conn:
+        rows = conn.execute(
+            "SELECT ts, open, high, low, close, volume, dividends, splits FROM bars "
+            "WHERE ticker=? AND interval=? AND ts>=? ORDER BY ts",
+            (ticker, interval, int(start)),
+        ).fetchall()
+    df = pd.DataFrame(rows, columns=["ts", *_COLUMNS])
+    idx = pd.to_datetime(df.pop("ts"), unit="s", utc=True)
+    df = df.astype(float)
+    df[["Dividends", "Stock Splits"]] = df[["Dividends", "Stock Splits"]].fillna(0.0)
+    if tz:
+        idx = idx.dt.tz_convert(tz)
+    intraday = interval.endswith(("m", "h"))
+    df.index = pd.DatetimeIndex(idx, name="Datetime" if intraday else "Date")
+    if df["Volume"].notna().all():
+        df["Volume"] = df["Volume"].astype("int64")
+    return df
+
+def load_view(ticker: str, interval: str, start: int = 0, tz: Optional[str] = None,
+              last_ts: Optional[int] = None) -> pd.DataFrame:
+    """
+    Like `load_bars`, but serves the bars from the memory-mapped price archive (see
+    `backend.price_archive`): the columns are read-only views of the shared mapping rather
+    than a fresh copy per call (only a gap-free Volume is copied, to int64). A series missing from the archive,
+    or whose last bar differs from `last_ts`, is first re-archived from this store.
+    Falls back to `load_bars` when the archive is disabled or unusable.
+
+    Args:
+        ticker (str): The Yahoo Finance symbol.
+        interval (str): The bar interval.
+        start (int, optional): First epoch second to include. Defaults to 0.
+        tz (Optional[str], optional): Timezone to convert the index to. Defaults to UTC.
+        last_ts (Optional[int], optional): The series' last stored bar, from `series_info`. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Bars in the same shape yfinance returns them.
+    """
+    if not price_archive.PRICE_ARCHIVE_ENABLED:
+        return load_bars(ticker, interval, start=start, tz=tz)
+    try:
+        series = price_archive.open_series(ticker, interval)
+        if series is None or (last_ts is not None and series.last_ts != last_ts):
+            price_archive.write(ticker, interval, load_bars(ticker, interval, tz=tz), tz=tz)
+            series = price_archive.open_series(ticker, interval)
+        if series is not None:
+            return series.slice(start).to_frame(tz=tz or "UTC")
+    except Exception as e:
+        print(f"Price archive read for {ticker} ({interval}) failed, reading the store:", e)
+    return load_bars(ticker, interval, start=start, tz=tz)
+
+def clear(ticker: Optional[str] = None) -> None:
+    """Drops cached bars for one Yahoo symbol, or for every symbol when none is given."""
+    with _session() as conn:
+        if ticker is None:
+            conn.execute("DELETE FROM bars")
+            conn.execute("DELETE FROM series")
+        else:
+            conn.execute("DELETE FROM bars WHERE ticker=?", (ticker,))
+            conn.execute("DELETE FROM series WHERE ticker=?", (ticker,))
+    price_archive.delete(ticker)
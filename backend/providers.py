@@ -0,0 +1,203 @@
+# backend/providers.py
+import abc
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+# Which provider `get_provider()` builds: "yfinance" (default) or "replay".
+MARKET_DATA_PROVIDER = os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+# Settings for the offline file-replay provider.
+MARKET_DATA_REPLAY_DIR = Path(os.environ.get("MARKET_DATA_REPLAY_DIR", "data/replay"))
+MARKET_DATA_REPLAY_LATENCY_MS = float(os.environ.get("MARKET_DATA_REPLAY_LATENCY_MS", "0"))
+
+class MarketDataProvider(abc.ABC):
+    """
+    Interface between `backend.data_fetcher` and a source of OHLCV bars.
+
+    Subclasses implement `history` and may override `history_many` when the source supports
+    bulk requests. Frames are indexed by timestamp with yfinance-style columns
+    ("Open", "High", "Low", "Close", "Volume", ...).
+    """
+    name = "base"
+    # Whether bars from this provider should go through the local price store.
+    cacheable = True
+
+    def symbol(self, symbol: str, exchange: str) -> str:
+        """
+        Formats a stock symbol for the provider based on its exchange.
+        - NSE symbols are appended with '.NS'.
+        - BSE symbols are appended with '.BO'.
+
+        Args:
+            symbol (str): The stock symbol (e.g., "RELIANCE").
+            exchange (str): The stock exchange ("NSE" or "BSE").
+
+        Returns:
+            str: The provider symbol (e.g., "RELIANCE.NS").
+        """
+        if exchange.upper() == "NSE":
+            return f"{symbol}.NS"
+        if exchange.upper() == "BSE":
+            return f"{symbol}.BO"
+        return symbol
+
+    @abc.abstractmethod
+    def history(self, ticker: str, period: Optional[str] = None, interval: str = "1d", start: Optional[int] = None) -> pd.DataFrame:
+        """
+        Returns bars for one provider symbol, either for a whole period or from an epoch second onwards.
+
+        Args:
+            ticker (str): The provider symbol.
+            period (Optional[str], optional): A yfinance period string (e.g., "6mo"). Defaults to None.
+            interval (str, optional): The bar interval. Defaults to "1d".
+            start (Optional[int], optional): First epoch second to return; overrides `period`. Defaults to None.
+
+        Returns:
+            pd.DataFrame: The bars; empty if the symbol is unknown.
+        """
+
+    def history_many(self, tickers: List[str], period: Optional[str] = None, interval: str = "1d", start: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        """Returns bars for several provider symbols; symbols without data are left out."""
+        frames = {}
+        for ticker in tickers:
+            df = self.history(ticker, period=period, interval=interval, start=start)
+            if not df.empty:
+                frames[ticker] = df
+        return frames
+
+class YFinanceProvider(MarketDataProvider):
+    """Serves bars from Yahoo Finance through yfinance."""
+    name = "yfinance"
+
+    def history(self, ticker, period=None, interval="1d", start=None):
+        import yfinance as yf
+        t = yf.Ticker(ticker)
+        if start is not None:
+            return t.history(start=datetime.fromtimestamp(start, tz=timezone.utc), interval=interval)
+        return t.history(period=period, interval=interval)
+
+    def history_many(self, tickers, period=None, interval="1d", start=None):
+        import yfinance as yf
+        kwargs = {"start": datetime.fromtimestamp(start, tz=timezone.utc)} if start is not None else {"period": period}
+        raw = yf.download(
+            tickers, interval=interval, group_by="ticker", auto_adjust=True, actions=True,
+            threads=False, progress=False, **kwargs
+        )
+        frames = {}
+        for ticker in tickers:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if ticker not in raw.columns.get_level_values(0):
+                    continue
+                df = raw[ticker]
+            else:
+                # Older yfinance versions return flat columns for a single ticker.
+                df = raw
+            df = df.dropna(how="all")
+            if not df.empty:
+                frames[ticker] = df
+        return frames
+
+class FileReplayProvider(MarketDataProvider):
+    """
+    Serves bars from a local directory of CSV or Parquet files, for offline and load testing.
+
+    Files are looked up as `<directory>/<ticker>_<interval>.{parquet,csv}` and then
+    `<directory>/<ticker>.{parquet,csv}`, e.g. `data/replay/RELIANCE.NS_1d.csv`. Periods are
+    measured back from the last bar in the file rather than from now, so replays are
+    deterministic. Every request sleeps for `latency_ms` to simulate a network round-trip.
+    """
+    name = "replay"
+    cacheable = False
+
+    def __init__(self, directory: Path = MARKET_DATA_REPLAY_DIR, latency_ms: float = MARKET_DATA_REPLAY_LATENCY_MS):
+        self.directory = Path(directory)
+        self.latency_ms = latency_ms
+        self._frames = {}
+
+    def _path(self, ticker: str, interval: str) -> Optional[Path]:
+        for stem in (f"{ticker}_{interval}", ticker):
+            for ext in (".parquet", ".csv"):
+                p = self.directory / f"{stem}{ext}"
+                if p.exists():
+                    return p
+        return None
+
+    def _load(self, ticker: str, interval: str) -> pd.DataFrame:
+        key = (ticker, interval)
+        if key not in self._frames:
+            p = self._path(ticker, interval)
+            if p is None:
+                df = pd.DataFrame()
+            elif p.suffix == ".parquet":
+                df = pd.read_parquet(p)
+                df.index = pd.DatetimeIndex(df.index)
+                if df.index.tz is None:
+                    # Naive timestamps are taken as UTC, as the CSV branch parses them, so `_slice`
+                    # can compare them with its UTC bounds.
+                    df.index = df.index.tz_localize("UTC")
+            else:
+                df = pd.read_csv(p, index_col=0)
+                df.index = pd.to_datetime(df.index, utc=True)
+            self._frames[key] = df.sort_index()
+        return self._frames[key]
+
+    def _sleep(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+
+    def _slice(self, df: pd.DataFrame, period: Optional[str], start: Optional[int]) -> pd.DataFrame:
+        if df.empty:
+            return df
+        if start is not None:
+            return df[df.index >= pd.Timestamp(start, unit="s", tz="UTC")]
+        from backend.price_cache import period_start
+        end = df.index[-1]
+        first = period_start(period or "max", now=end.to_pydatetime())
+        return df[df.index >= pd.Timestamp(first, unit="s", tz="UTC")] if first else df
+
+    def history(self, ticker, period=None, interval="1d", start=None):
+        self._sleep()
+        return self._slice(self._load(ticker, interval), period, start).copy()
+
+    def history_many(self, tickers, period=None, interval="1d", start=None):
+        self._sleep()
+        frames = {}
+        for ticker in tickers:
+            df = self._slice(self._load(ticker, interval), period, start)
+            if not df.empty:
+                frames[ticker] = df.copy()
+        return frames
+
+    def record(self, ticker: str, df: pd.DataFrame, interval: str = "1d") -> Path:
+        """Writes bars (e.g. from `fetch_history`) into the replay directory and returns the file path."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        p = self.directory / f"{ticker}_{interval}.csv"
+        df.to_csv(p)
+        self._frames.pop((ticker, interval), None)
+        return p
+
+_PROVIDERS = {
+    "yfinance": YFinanceProvider,
+    "replay": FileReplayProvider,
+}
+
+_provider: Optional[MarketDataProvider] = None
+
+def get_provider() -> MarketDataProvider:
+    """Returns the process-wide market-data provider selected by MARKET_DATA_PROVIDER."""
+    global _provider
+    if _provider is None:
+        try:
+            _provider = _PROVIDERS[MARKET_DATA_PROVIDER.lower()]()
+        except KeyError:
+            raise ValueError(f"Unknown MARKET_DATA_PROVIDER {MARKET_DATA_PROVIDER!r}; expected one of {sorted(_PROVIDERS)}")
+    return _provider
+
+def set_provider(provider: MarketDataProvider) -> None:
+    """Replaces the process-wide market-data provider (e.g. a `FileReplayProvider` in benchmarks)."""
+    global _provider
+    _provider = provider
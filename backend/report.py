@@ -1,34 +1,43 @@
 # backend/report.py
 import base64
+import hashlib
+import importlib
 import io
+import json
+import os
+import string
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import Optional, Tuple
 import markdown as md_lib
 from pathlib import Path
+from backend.disk_cache import DiskCache
+from backend.tracing import annotate, span, traced
 
-# Try preferred HTML->PDF engines in order
+# HTML->PDF engines, tried in order. They are probed with find_spec and imported on first
+# render: importing WeasyPrint alone loads Pango and the font stack, which costs seconds.
 # WeasyPrint (pure python but system libs required)
-try:
-    from weasyprint import HTML, CSS
-    _WEASYPRINT_AVAILABLE = True
-except Exception:
-    _WEASYPRINT_AVAILABLE = False
-
+_WEASYPRINT_AVAILABLE = find_spec("weasyprint") is not None
 # pdfkit (wkhtmltopdf) fallback
-try:
-    import pdfkit
-    _PDFKIT_AVAILABLE = True
-except Exception:
-    _PDFKIT_AVAILABLE = False
-
+_PDFKIT_AVAILABLE = find_spec("pdfkit") is not None
 # fallback to simple ReportLab-based pdf (less styled)
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-    _REPORLAB_AVAILABLE = True
-except Exception:
-    _REPORLAB_AVAILABLE = False
+_REPORLAB_AVAILABLE = find_spec("reportlab") is not None
+
+@lru_cache(maxsize=None)
+def _engine(name: str):
+    """Imports a PDF engine once; None if it is installed but fails to load (e.g. missing system libraries)."""
+    try:
+        return importlib.import_module(name)
+    except Exception as e:
+        print(f"{name} unavailable:", e)
+        return None
+
+# Rendered PDFs keyed by a hash of the report inputs, shared by all sessions.
+RENDER_CACHE_PATH = Path(os.environ.get("RENDER_CACHE_PATH", "data/cache/renders.sqlite3"))
+RENDER_CACHE_MAX_BYTES = int(os.environ.get("RENDER_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+render_cache = DiskCache(RENDER_CACHE_PATH, max_bytes=RENDER_CACHE_MAX_BYTES)
 
 # ---------- Utilities ----------
 
@@ -191,6 +200,46 @@ _HTML_TEMPLATE = """
 </html>
 """
 
+class _CompiledTemplate:
+    """
+    A `str.format`-style template parsed once into literal and field segments, so rendering
+    is a single join instead of re-parsing the template string on every report.
+    """
+
+    def __init__(self, template: str):
+        self.segments = []
+        for literal, field, _spec, _conv in string.Formatter().parse(template):
+            if literal:
+                self.segments.append((literal, False))
+            if field is not None:
+                self.segments.append((field, True))
+
+    def render(self, **fields) -> str:
+        return "".join(str(fields[text]) if is_field else text for text, is_field in self.segments)
+
+_REPORT_TEMPLATE = _CompiledTemplate(_HTML_TEMPLATE)
+# Part of every render-cache key, so editing the template or the stylesheet retires earlier renders.
+_TEMPLATE_VERSION = hashlib.sha256((_HTML_TEMPLATE + _BASE_CSS).encode("utf-8")).hexdigest()[:16]
+# Engines whose output is a degraded, unstyled stand-in for the report; never cached.
+_FALLBACK_ENGINES = {"reportlab"}
+
+@lru_cache(maxsize=1)
+def _base_stylesheet():
+    """The parsed WeasyPrint stylesheet for `_BASE_CSS`, built once per process."""
+    return _engine("weasyprint").CSS(string=_BASE_CSS)
+
+@lru_cache(maxsize=32)
+def _parsed_css(css_string: str):
+    """Parsed WeasyPrint stylesheets for per-report overrides, reused across renders."""
+    return _engine("weasyprint").CSS(string=css_string)
+
+def _inject_css(html: str, css: str) -> str:
+    """Adds a <style> block to the document head for engines that cannot take separate stylesheets."""
+    style = f"<style>{css}</style>"
+    if "</head>" in html:
+        return html.replace("</head>", style + "</head>", 1)
+    return style + html
+
 # ---------- Converters ----------
 
 def markdown_to_html(markdown_text: str) -> str:
@@ -257,7 +306,9 @@ def assemble_html_report(
     capital: Optional[int] = None,
     last_close: Optional[float] = None,
     extra_metrics: Optional[dict] = None,
-    risk_summary: Optional[list] = None
+    risk_summary: Optional[list] = None,
+    css_overrides: Optional[str] = None,
+    inline_css: bool = True
 ) -> str:
     """
     Assembles a complete, styled HTML report from various components.
@@ -272,6 +323,10 @@ def assemble_html_report(
         last_close (Optional[float], optional): The last closing price of the stock. Defaults to None.
         extra_metrics (Optional[dict], optional): A dictionary of additional metrics. Defaults to None.
         risk_summary (Optional[list], optional): A list of dictionaries for the risk summary table. Defaults to None.
+        css_overrides (Optional[str], optional): Extra CSS applied after the base stylesheet. Defaults to None.
+        inline_css (bool, optional): Embed the stylesheet in the document. Pass False when the renderer
+                                     applies it instead (see `html_to_pdf_bytes(include_base_css=True)`),
+                                     so it is not parsed twice. Defaults to True.
 
     Returns:
         str: The final, styled HTML report as a string.
@@ -321,8 +376,12 @@ def assemble_html_report(
         # attempt to extract headings like "1. Market Risk" etc and build mini table (naive)
         risk_html = "<div class='card'>See detailed analysis above.</div>"
 
-    html = _HTML_TEMPLATE.format(
-        css=_BASE_CSS,
+    css = ""
+    if inline_css:
+        css = _BASE_CSS + (css_overrides or "")
+
+    html = _REPORT_TEMPLATE.render(
+        css=css,
         logo_html=logo_html,
         report_subtitle=f"{symbol} — Risk Analysis",
         symbol=symbol,
@@ -337,7 +396,8 @@ def assemble_html_report(
     )
     return html
 
-def html_to_pdf_bytes(html: str, base_url: Optional[str] = None, css_string: Optional[str] = None) -> bytes:
+def html_to_pdf_bytes(html: str, base_url: Optional[str] = None, css_string: Optional[str] = None,
+                      include_base_css: bool = False) -> bytes:
     """
     Converts an HTML string to PDF bytes using the best available engine.
     It tries WeasyPrint, then pdfkit (wkhtmltopdf), and finally a simple ReportLab fallback.
@@ -346,6 +406,8 @@ def html_to_pdf_bytes(html: str, base_url: Optional[str] = None, css_string: Opt
         html (str): The HTML content to convert.
         base_url (Optional[str], optional): The base URL for resolving relative paths in the HTML. Defaults to None.
         css_string (Optional[str], optional): An additional CSS string to apply. Defaults to None.
+        include_base_css (bool, optional): Apply the report stylesheet, parsed once per process, for HTML
+                                           assembled with `inline_css=False`. Defaults to False.
 
     Raises:
         RuntimeError: If no suitable HTML-to-PDF conversion engine is found.
@@ -353,19 +415,34 @@ def html_to_pdf_bytes(html: str, base_url: Optional[str] = None, css_string: Opt
     Returns:
         bytes: The generated PDF content as bytes.
     """
+    return html_to_pdf(html, base_url=base_url, css_string=css_string, include_base_css=include_base_css)[0]
+
+@traced("pdf.engine")
+def html_to_pdf(html: str, base_url: Optional[str] = None, css_string: Optional[str] = None,
+                include_base_css: bool = False) -> Tuple[bytes, str]:
+    """Like `html_to_pdf_bytes`, but returns the PDF with the name of the engine that rendered it."""
     # 1) WeasyPrint
-    if _WEASYPRINT_AVAILABLE:
+    weasyprint = _engine("weasyprint") if _WEASYPRINT_AVAILABLE else None
+    if weasyprint is not None:
         try:
-            extra_css = CSS(string=css_string) if css_string else None
-            html_obj = HTML(string=html, base_url=base_url)
-            out = html_obj.write_pdf(stylesheets=[extra_css] if extra_css else None)
-            return out
+            stylesheets = [_base_stylesheet()] if include_base_css else []
+            if css_string:
+                stylesheets.append(_parsed_css(css_string))
+            html_obj = weasyprint.HTML(string=html, base_url=base_url)
+            out = html_obj.write_pdf(stylesheets=stylesheets or None)
+            annotate(engine="weasyprint", bytes=len(out))
+            return out, "weasyprint"
         except Exception as e:
             # try next
             print("WeasyPrint conversion failed:", e)
 
+    # The other engines only read styles embedded in the document.
+    if include_base_css or css_string:
+        html = _inject_css(html, (_BASE_CSS if include_base_css else "") + (css_string or ""))
+
     # 2) pdfkit (wkhtmltopdf)
-    if _PDFKIT_AVAILABLE:
+    pdfkit = _engine("pdfkit") if _PDFKIT_AVAILABLE else None
+    if pdfkit is not None:
         try:
             # default options: enable local file access, reasonable margins
             options = {
@@ -377,7 +454,8 @@ def html_to_pdf_bytes(html: str, base_url: Optional[str] = None, css_string: Opt
                 "encoding": "UTF-8"
             }
             out = pdfkit.from_string(html, False, options=options)  # returns bytes
-            return out
+            annotate(engine="pdfkit", bytes=len(out))
+            return out, "pdfkit"
         except Exception as e:
             print("pdfkit conversion failed:", e)
 
@@ -386,6 +464,9 @@ def html_to_pdf_bytes(html: str, base_url: Optional[str] = None, css_string: Opt
         try:
             # Very naive: strip tags and place paragraphs.
             from bs4 import BeautifulSoup
+            from reportlab.lib.pagesizes import A4
+            from reportlab.lib.styles import getSampleStyleSheet
+            from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
             soup = BeautifulSoup(html, "html.parser")
             text = soup.get_text("\n")
             buffer = io.BytesIO()
@@ -399,7 +480,9 @@ def html_to_pdf_bytes(html: str, base_url: Optional[str] = None, css_string: Opt
                     story.append(Paragraph(line.replace("**",""), styles['BodyText']))
             doc.build(story)
             buffer.seek(0)
-            return buffer.read()
+            out = buffer.read()
+            annotate(engine="reportlab", bytes=len(out))
+            return out, "reportlab"
         except Exception as e:
             print("ReportLab fallback failed:", e)
 
@@ -407,6 +490,30 @@ def html_to_pdf_bytes(html: str, base_url: Optional[str] = None, css_string: Opt
 
 # ---------- convenience wrapper ----------
 
+def render_cache_key(**report_inputs) -> str:
+    """
+    Hashes the inputs of `assemble_html_report` and the template/stylesheet version into a
+    render-cache key. The generation timestamps are not inputs, so byte-identical reports share
+    a key across runs and sessions. Binary inputs are hashed, and the logo is identified by its
+    path, size and mtime.
+    """
+    h = hashlib.sha256(_TEMPLATE_VERSION.encode("utf-8"))
+    for name in sorted(report_inputs):
+        value = report_inputs[name]
+        if name == "logo_path" and value and Path(value).exists():
+            info = Path(value).stat()
+            value = [str(value), info.st_size, info.st_mtime_ns]
+        if isinstance(value, (bytes, bytearray)):
+            value = hashlib.sha256(value).hexdigest()
+        h.update(name.encode("utf-8"))
+        h.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+def render_cache_stats() -> dict:
+    """Returns render-cache hit/miss counters for this process and its current size."""
+    return render_cache.stats()
+
+@traced("pdf.render")
 def markdown_to_pdf_bytes(markdown_text: str,
                           overview_text: str,
                           symbol: str,
@@ -416,10 +523,14 @@ def markdown_to_pdf_bytes(markdown_text: str,
                           capital: Optional[int] = None,
                           last_close: Optional[float] = None,
                           extra_metrics: Optional[dict] = None,
-                          risk_summary: Optional[list] = None) -> bytes:
+                          risk_summary: Optional[list] = None,
+                          css_overrides: Optional[str] = None,
+                          use_cache: bool = True) -> bytes:
     """
     A high-level wrapper to convert a Markdown report directly to a styled PDF.
-    This function assembles the HTML and then converts it to PDF bytes.
+    This function assembles the HTML and then converts it to PDF bytes, on the
+    `backend.pdf_renderer` worker pool unless PDF_RENDER_WORKERS is 0. Reports whose inputs
+    are identical to an earlier render are served from the render cache.
 
     Args:
         markdown_text (str): The main report body in Markdown format.
@@ -431,11 +542,13 @@ def markdown_to_pdf_bytes(markdown_text: str,
         last_close (Optional[float], optional): The last closing price of the stock. Defaults to None.
         extra_metrics (Optional[dict], optional): A dictionary of additional metrics. Defaults to None.
         risk_summary (Optional[list], optional): A list of dictionaries for the risk summary table. Defaults to None.
+        css_overrides (Optional[str], optional): Extra CSS applied after the base stylesheet. Defaults to None.
+        use_cache (bool, optional): Serve identical reports from the render cache. Defaults to True.
 
     Returns:
         bytes: The generated PDF content as bytes.
     """
-    html = assemble_html_report(
+    report_inputs = dict(
         markdown_report=markdown_text,
         overview_report=overview_text,
         symbol=symbol,
@@ -445,7 +558,38 @@ def markdown_to_pdf_bytes(markdown_text: str,
         capital=capital,
         last_close=last_close,
         extra_metrics=extra_metrics,
-        risk_summary=risk_summary
+        risk_summary=risk_summary,
+        css_overrides=css_overrides
     )
-    pdf = html_to_pdf_bytes(html, css_string=_BASE_CSS)
+    cache_key = render_cache_key(**report_inputs)
+    if use_cache:
+        cached = render_cache.get(cache_key)
+        annotate(cache="hit" if cached is not None else "miss")
+        if cached is not None:
+            return cached
+
+    # The stylesheet is applied by the renderer from its per-process parsed copy.
+    with span("pdf.assemble"):
+        html = assemble_html_report(**report_inputs, inline_css=False)
+    # Render on the warm worker pool when it is enabled (see backend.pdf_renderer).
+    from backend.pdf_renderer import RendererBusy, discard_renderer, get_renderer
+    from concurrent.futures import TimeoutError as FutureTimeout
+    from concurrent.futures.process import BrokenProcessPool
+    renderer = get_renderer()
+    pdf = None
+    if renderer is not None:
+        try:
+            pdf, engine = renderer.render(html, css_string=css_overrides, include_base_css=True)
+        except BrokenProcessPool as e:
+            # A dead worker breaks the whole pool; drop it so the next report gets a fresh one.
+            print("PDF render pool broke, rendering in-process:", e)
+            discard_renderer(renderer)
+        except (RendererBusy, FutureTimeout) as e:
+            print("PDF render pool busy, rendering in-process:", e)
+    if pdf is None:
+        pdf, engine = html_to_pdf(html, css_string=css_overrides, include_base_css=True)
+    # A fallback render (e.g. WeasyPrint failed to load in one worker) must not stand in for the
+    # styled report on later hits.
+    if use_cache and engine not in _FALLBACK_ENGINES:
+        render_cache.set(cache_key, pdf)
     return pdf
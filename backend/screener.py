@@ -0,0 +1,342 @@
+# backend/screener.py
+import json
+import os
+import tempfile
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.tracing import traced
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds in one process are still serialised by the thread locks
+    fcntl = None
+
+# Aligned close/volume matrices of the whole universe, one .npz file per exchange.
+SCREENER_DIR = Path(os.environ.get("SCREENER_DIR", "data/cache/screener"))
+# History kept in the matrices; two years covers 12-month momentum and 52-week highs.
+SCREENER_PERIOD = os.environ.get("SCREENER_PERIOD", "2y")
+# A matrix older than this many seconds is rebuilt on the next `get_matrix`.
+SCREENER_MAX_AGE = int(os.environ.get("SCREENER_MAX_AGE", str(12 * 3600)))
+
+TRADING_DAYS = 252
+_FORMAT_VERSION = 1
+
+_build_locks: Dict[str, threading.Lock] = {}
+_build_locks_guard = threading.Lock()
+_builders: Dict[str, threading.Thread] = {}
+# Outcome of the latest background build per exchange in this process (see `build_status`).
+_build_status: Dict[str, Dict] = {}
+_builders_lock = threading.Lock()
+
+# Filter name -> (metric, comparison); thresholds left as None are not applied.
+FILTERS = {
+    "min_price": ("last_close", ">="),
+    "min_turnover": ("turnover_20", ">="),
+    "min_return_1m": ("return_1m", ">="),
+    "min_return_3m": ("return_3m", ">="),
+    "min_momentum": ("momentum_12_1", ">="),
+    "max_volatility": ("volatility_20", "<="),
+    "max_from_high": ("from_high_52w", ">="),
+    "min_volume_ratio": ("volume_ratio", ">="),
+    "max_stale_bars": ("stale_bars", "<="),
+}
+
+class PriceMatrix:
+    """
+    Daily closes and volumes of many symbols on one shared calendar: `close` and `volume`
+    are float32 arrays of shape (len(dates), len(symbols)), NaN where a symbol has no bar.
+    """
+    def __init__(self, exchange: str, symbols: np.ndarray, dates: np.ndarray,
+                 close: np.ndarray, volume: np.ndarray, built_at: float, errors: int = 0):
+        self.exchange = exchange
+        self.symbols = symbols
+        self.dates = dates
+        self.close = close
+        self.volume = volume
+        self.built_at = built_at
+        self.errors = errors
+
+    @property
+    def shape(self):
+        return self.close.shape
+
+    def save(self, path: Path) -> None:
+        """Writes the matrix as an uncompressed .npz (fast to load), atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = json.dumps({"version": _FORMAT_VERSION, "exchange": self.exchange,
+                           "built_at": self.built_at, "errors": self.errors})
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, symbols=self.symbols, dates=self.dates.astype("datetime64[D]").astype(np.int32),
+                     close=self.close, volume=self.volume, meta=np.array(meta))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["PriceMatrix"]:
+        """Reads a matrix written by `save`; None if it is missing or from another format version."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("version") != _FORMAT_VERSION:
+                    return None
+                return cls(meta["exchange"], data["symbols"], data["dates"].astype("datetime64[D]"),
+                           data["close"], data["volume"], meta["built_at"], meta.get("errors", 0))
+        except (OSError, KeyError, ValueError):
+            return None
+
+def matrix_path(exchange: str) -> Path:
+    return SCREENER_DIR / f"{exchange.lower()}.npz"
+
+def universe(exchange: str = "NSE") -> List[str]:
+    """The active symbols of an exchange from the ticker list (see backend.ticker_index)."""
+    from backend.ticker_index import load_index
+    return [symbol for symbol, _, exch in load_index().rows if exch == exchange]
+
+@traced("screener.build")
+def build_matrix(exchange: str = "NSE", symbols: Optional[List[str]] = None, period: str = SCREENER_PERIOD,
+                 save: bool = True) -> PriceMatrix:
+    """
+    Fetches the daily history of every symbol (bulk downloads through the price store, see
+    `fetch_histories`) and aligns the closes and volumes on the union of their trading days.
+
+    Args:
+        exchange (str, optional): "NSE" or "BSE". Defaults to "NSE".
+        symbols (Optional[List[str]], optional): The universe; defaults to every active symbol of the exchange.
+        period (str, optional): The history to keep. Defaults to SCREENER_PERIOD.
+        save (bool, optional): Write the matrix to `matrix_path(exchange)`. Defaults to True.
+
+    Returns:
+        PriceMatrix: The aligned matrices; symbols without any bars are left out.
+    """
+    from backend.data_fetcher import fetch_histories
+
+    symbols = symbols if symbols is not None else universe(exchange)
+    frames, errors = fetch_histories(symbols, exchange, period=period, interval="1d")
+    frames = {s: df for s, df in frames.items() if not df.empty and "Close" in df}
+
+    days = {}
+    for s, df in frames.items():
+        idx = df.index if df.index.tz is None else df.index.tz_localize(None)
+        days[s] = idx.values.astype("datetime64[D]")
+    dates = np.unique(np.concatenate(list(days.values()))) if days else np.array([], dtype="datetime64[D]")
+
+    names = np.array(list(frames), dtype=str)
+    close = np.full((len(dates), len(names)), np.nan, dtype=np.float32)
+    volume = np.full((len(dates), len(names)), np.nan, dtype=np.float32)
+    for j, s in enumerate(names):
+        # The calendar is sorted and contains every day of the symbol, so one searchsorted places all its bars.
+        rows = np.searchsorted(dates, days[s])
+        close[rows, j] = frames[s]["Close"].to_numpy(dtype=np.float32)
+        if "Volume" in frames[s]:
+            volume[rows, j] = frames[s]["Volume"].to_numpy(dtype=np.float32)
+
+    matrix = PriceMatrix(exchange, names, dates, close, volume, time.time(), errors=len(errors))
+    if save:
+        matrix.save(matrix_path(exchange))
+    return matrix
+
+@contextmanager
+def _build_lock(exchange: str, blocking: bool = True) -> Iterator[bool]:
+    """Serialises builds of one exchange's matrix across threads and processes; yields whether it was taken."""
+    with _build_locks_guard:
+        lock = _build_locks.setdefault(exchange, threading.Lock())
+    if not lock.acquire(blocking):
+        yield False
+        return
+    try:
+        path = matrix_path(exchange).with_suffix(".lock")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
+            try:
+                yield True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+    finally:
+        lock.release()
+
+def load_matrix(exchange: str = "NSE") -> Optional[PriceMatrix]:
+    """Returns the stored matrix of an exchange, however old; None if it was never built."""
+    return PriceMatrix.load(matrix_path(exchange))
+
+def is_stale(matrix: PriceMatrix) -> bool:
+    return time.time() - matrix.built_at >= SCREENER_MAX_AGE
+
+def get_matrix(exchange: str = "NSE", refresh: bool = False) -> PriceMatrix:
+    """
+    Returns the stored matrix of an exchange, rebuilding it when missing, stale or `refresh` is set.
+    Only one build per exchange runs at a time: a caller that waited for another one's build
+    gets its result instead of building again.
+    """
+    requested = time.time()
+    if not refresh:
+        matrix = load_matrix(exchange)
+        if matrix is not None and not is_stale(matrix):
+            return matrix
+    with _build_lock(exchange):
+        matrix = load_matrix(exchange)
+        if matrix is not None and matrix.built_at >= requested:
+            return matrix
+        return build_matrix(exchange)
+
+def is_building(exchange: str = "NSE") -> bool:
+    """Whether a build of the exchange's matrix is running in this or another process."""
+    with _build_lock(exchange, blocking=False) as acquired:
+        return not acquired
+
+def build_status(exchange: str = "NSE") -> Optional[Dict]:
+    """
+    The latest background build of an exchange's matrix started in this process: a dict with
+    "state" ("running", "done" or "failed"), "error" and "finished_at"; None if there was none.
+    """
+    status = _build_status.get(exchange)
+    return dict(status) if status else None
+
+def rebuild_in_background(exchange: str = "NSE") -> bool:
+    """
+    Rebuilds an exchange's matrix on a daemon thread, so callers keep serving the stored one
+    meanwhile. Does nothing when a build of that exchange is already running here or elsewhere.
+
+    Returns:
+        bool: True if a build was started.
+    """
+    def run():
+        with _build_lock(exchange, blocking=False) as acquired:
+            if not acquired:
+                # Another process is building it; the page waits for its file.
+                _build_status.pop(exchange, None)
+                return
+            try:
+                build_matrix(exchange)
+            except Exception as e:
+                print(f"Rebuilding the {exchange} price matrix failed:", e)
+                _build_status[exchange] = {"state": "failed", "error": f"{type(e).__name__}: {e}",
+                                           "finished_at": time.time()}
+            else:
+                _build_status[exchange] = {"state": "done", "error": None, "finished_at": time.time()}
+
+    with _builders_lock:
+        thread = _builders.get(exchange)
+        if (thread is not None and thread.is_alive()) or is_building(exchange):
+            return False
+        thread = threading.Thread(target=run, name=f"screener-build-{exchange}", daemon=True)
+        _builders[exchange] = thread
+        _build_status[exchange] = {"state": "running", "error": None, "finished_at": None}
+        thread.start()
+    return True
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """Forward-fills NaNs down each column (a suspended day carries the previous close)."""
+    rows = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return values[rows, np.arange(values.shape[1])]
+
+def _lookback(filled: np.ndarray, bars: int) -> np.ndarray:
+    """Return over the last `bars` rows per column; NaN where the history is shorter."""
+    if len(filled) <= bars:
+        return np.full(filled.shape[1], np.nan)
+    return filled[-1] / filled[-1 - bars] - 1
+
+def compute_metrics(matrix: PriceMatrix) -> pd.DataFrame:
+    """
+    Computes screening metrics for every symbol with whole-matrix NumPy operations.
+
+    Returns:
+        pd.DataFrame: One row per symbol with last_close, return_1d/1w/1m/3m/1y, momentum_12_1
+                      (12-month return skipping the last month), volatility_20 (annualised),
+                      high_52w, from_high_52w, breakout_20 / breakout_55 (close above the prior
+                      20/55-day high), volume_ratio (last volume over the prior 20-day mean),
+                      turnover_20 (mean daily traded value), bars and stale_bars (rows since the
+                      last bar).
+    """
+    n_rows, n_cols = matrix.shape
+    if n_rows == 0 or n_cols == 0:
+        return pd.DataFrame(index=pd.Index(matrix.symbols, name="symbol"))
+    close = matrix.close.astype(np.float64)
+    volume = matrix.volume.astype(np.float64)
+    valid = ~np.isnan(close)
+    filled = _ffill(close)
+    last = filled[-1]
+
+    # Symbols with no bars in a window give NaN metrics; the all-NaN warnings that go with them are expected.
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        log_returns = np.diff(np.log(filled[-21:]), axis=0)
+        prior_20 = np.nanmax(filled[-21:-1], axis=0) if n_rows > 1 else np.full(n_cols, np.nan)
+        prior_55 = np.nanmax(filled[-56:-1], axis=0) if n_rows > 1 else np.full(n_cols, np.nan)
+        high_52w = np.nanmax(filled[-TRADING_DAYS:], axis=0)
+        momentum = (filled[-22] / filled[-1 - TRADING_DAYS] - 1) if n_rows > TRADING_DAYS else np.full(n_cols, np.nan)
+        metrics = {
+            "last_close": last,
+            "return_1d": _lookback(filled, 1),
+            "return_1w": _lookback(filled, 5),
+            "return_1m": _lookback(filled, 21),
+            "return_3m": _lookback(filled, 63),
+            "return_1y": _lookback(filled, TRADING_DAYS),
+            "momentum_12_1": momentum,
+            "volatility_20": np.nanstd(log_returns, axis=0, ddof=1) * np.sqrt(TRADING_DAYS),
+            "high_52w": high_52w,
+            "from_high_52w": last / high_52w - 1,
+            "breakout_20": last > prior_20,
+            "breakout_55": last > prior_55,
+            "volume_ratio": volume[-1] / np.nanmean(volume[-21:-1], axis=0),
+            "turnover_20": np.nanmean(close[-20:] * volume[-20:], axis=0),
+            "bars": valid.sum(axis=0),
+            # Rows since the last real bar: 0 for a symbol that traded on the latest day.
+            "stale_bars": n_rows - 1 - np.where(valid, np.arange(n_rows)[:, None], -1).max(axis=0),
+        }
+    return pd.DataFrame(metrics, index=pd.Index(matrix.symbols, name="symbol"))
+
+@traced("screener.screen")
+def screen(matrix: PriceMatrix, filters: Optional[Dict[str, float]] = None, breakout: Optional[int] = None,
+           sort_by: str = "momentum_12_1", ascending: bool = False, limit: Optional[int] = 100) -> pd.DataFrame:
+    """
+    Filters the universe on its metrics (one boolean mask over all symbols) and ranks the matches.
+
+    Args:
+        matrix (PriceMatrix): The universe, from `get_matrix`.
+        filters (Optional[Dict[str, float]], optional): Thresholds keyed by FILTERS names, e.g.
+            {"min_return_3m": 0.1, "max_volatility": 0.4}. None values are skipped. Defaults to None.
+        breakout (Optional[int], optional): Keep only closes above the prior 20- or 55-day high. Defaults to None.
+        sort_by (str, optional): Metric to rank by. Defaults to "momentum_12_1".
+        ascending (bool, optional): Sort order. Defaults to False.
+        limit (Optional[int], optional): Maximum rows returned. Defaults to 100.
+
+    Returns:
+        pd.DataFrame: The matching symbols' metrics, ranked. `df.attrs["screen"]` records the
+                      universe size, the number of matches and the elapsed milliseconds.
+    """
+    started = time.perf_counter()
+    metrics = compute_metrics(matrix)
+    mask = np.ones(len(metrics), dtype=bool)
+    for name, threshold in (filters or {}).items():
+        if threshold is None:
+            continue
+        if name not in FILTERS:
+            raise ValueError(f"Unknown filter {name!r}; expected one of {', '.join(FILTERS)}")
+        column, op = FILTERS[name]
+        values = metrics[column].to_numpy(dtype=np.float64)
+        # NaN compares False, so symbols without enough history drop out of every filter they face.
+        mask &= values >= threshold if op == ">=" else values <= threshold
+    if breakout:
+        mask &= metrics[f"breakout_{breakout}"].to_numpy()
+    result = metrics[mask].sort_values(sort_by, ascending=ascending, na_position="last")
+    if limit:
+        result = result.head(limit)
+    result.attrs["screen"] = {"universe": len(metrics), "matches": int(mask.sum()),
+                              "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+    return result
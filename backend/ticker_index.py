@@ -0,0 +1,172 @@
+# backend/ticker_index.py
+import json
+import os
+import pickle
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DATA = Path("data")
+TICKERS_FILE = DATA / "tickers.json"
+DEFAULT_TICKERS = DATA / "tickers_sample.json"
+# Prebuilt search index; rebuilt automatically whenever the tickers file changes.
+TICKER_INDEX_PATH = Path(os.environ.get("TICKER_INDEX_PATH", "data/cache/tickers.idx"))
+
+_INDEX_VERSION = 1
+EXCHANGES = ["NSE", "BSE"]
+# Ranked results kept per index, by normalised query.
+_RANKED_CACHE_SIZE = 256
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TickerIndex:
+    """
+    A compact search index over the symbols and company names of the ticker universe.
+
+    Every symbol, full name and name word is stored lower-cased in one sorted key list
+    with a parallel array of row ids, so prefix lookups are a binary search. A trigram
+    posting list over "symbol name" backs fuzzy matching for typos and mid-word queries.
+    """
+
+    def __init__(self, rows: List[Tuple[str, str, str]]):
+        self.rows = rows
+        pairs = set()
+        postings: Dict[str, array] = {}
+        for i, (symbol, name, _exch) in enumerate(rows):
+            terms = {symbol.lower(), name.lower()} | set(name.lower().split())
+            pairs.update((t, i) for t in terms if t)
+            for gram in _trigrams(f"{symbol} {name}".lower()):
+                postings.setdefault(gram, array("I")).append(i)
+        ordered = sorted(pairs)
+        self.keys = [k for k, _ in ordered]
+        self.key_rows = array("I", (i for _, i in ordered))
+        self.postings = postings
+        self._init_cache()
+
+    def _init_cache(self) -> None:
+        # Per instance, so a replaced index is freed together with its cached results.
+        self._ranked_cache: "OrderedDict[str, Tuple[int, ...]]" = OrderedDict()
+        self._ranked_lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # The pickled index file holds the index only, not this process's query cache.
+        state = dict(self.__dict__)
+        state.pop("_ranked_cache", None)
+        state.pop("_ranked_lock", None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._init_cache()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _prefix(self, q: str) -> List[int]:
+        hits = []
+        pos = bisect_left(self.keys, q)
+        while pos < len(self.keys) and self.keys[pos].startswith(q):
+            hits.append(self.key_rows[pos])
+            pos += 1
+        # Exact symbol matches first, then symbol prefixes, then name matches; shorter symbols first.
+        def rank(i):
+            symbol = self.rows[i][0].lower()
+            return (symbol != q, not symbol.startswith(q), len(symbol), symbol)
+        return sorted(set(hits), key=rank)
+
+    def _fuzzy(self, q: str, limit: int) -> List[int]:
+        grams = _trigrams(q)
+        scores = Counter()
+        for gram in grams:
+            for i in self.postings.get(gram, ()):
+                scores[i] += 1
+        threshold = max(1, len(grams) // 2)
+        return [i for i, score in scores.most_common(limit) if score >= threshold]
+
+    def _ranked(self, q: str) -> Tuple[int, ...]:
+        with self._ranked_lock:
+            if q in self._ranked_cache:
+                self._ranked_cache.move_to_end(q)
+                return self._ranked_cache[q]
+        if not q:
+            ranked = tuple(range(len(self.rows)))
+        else:
+            hits = self._prefix(q)
+            if len(hits) < 20:
+                seen = set(hits)
+                hits += [i for i in self._fuzzy(q, 50) if i not in seen]
+            ranked = tuple(hits)
+        with self._ranked_lock:
+            self._ranked_cache[q] = ranked
+            while len(self._ranked_cache) > _RANKED_CACHE_SIZE:
+                self._ranked_cache.popitem(last=False)
+        return ranked
+
+    def search(self, query: str = "", page: int = 0, page_size: int = 50) -> Tuple[List[Dict], int]:
+        """
+        Finds tickers by symbol or company-name prefix, falling back to fuzzy matches.
+
+        Args:
+            query (str, optional): The search text; empty lists the whole universe. Defaults to "".
+            page (int, optional): Zero-based page number. Defaults to 0.
+            page_size (int, optional): Results per page. Defaults to 50.
+
+        Returns:
+            Tuple[List[Dict], int]: The page of results (dicts with 'symbol', 'name', 'exchange'
+                                    and 'label') and the total number of matches.
+        """
+        ranked = self._ranked(" ".join(query.lower().split()))
+        start = max(0, page) * page_size
+        results = []
+        for i in ranked[start:start + page_size]:
+            symbol, name, exch = self.rows[i]
+            results.append({"symbol": symbol, "name": name, "exchange": exch,
+                            "label": f"{symbol} — {name} ({exch})" if name else f"{symbol} ({exch})"})
+        return results, len(ranked)
+
+def _read_tickers(path: Path) -> List[Tuple[str, str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    rows = []
+    for exch in EXCHANGES:
+        for item in data.get(exch, []):
+            # Symbols marked inactive by scripts/fetch_tickers.py are kept on file but not offered.
+            if item.get("symbol") and item.get("active", True):
+                rows.append((item["symbol"], item.get("name", "") or "", exch))
+    return rows
+
+def _signature(path: Path) -> Tuple[str, int, int]:
+    stat = path.stat()
+    return (str(path), stat.st_size, stat.st_mtime_ns)
+
+def build_index(tickers_file: Optional[Path] = None, index_path: Path = TICKER_INDEX_PATH) -> TickerIndex:
+    """Builds the index from the tickers file and writes it to `index_path` atomically."""
+    source = Path(tickers_file) if tickers_file else (TICKERS_FILE if TICKERS_FILE.exists() else DEFAULT_TICKERS)
+    index = TickerIndex(_read_tickers(source))
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=index_path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump((_INDEX_VERSION, _signature(source), index), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, index_path)
+    return index
+
+def load_index(tickers_file: Optional[Path] = None, index_path: Path = TICKER_INDEX_PATH) -> TickerIndex:
+    """
+    Returns the prebuilt index, rebuilding it when it is missing, from an older version,
+    or stale relative to the tickers file.
+    """
+    source = Path(tickers_file) if tickers_file else (TICKERS_FILE if TICKERS_FILE.exists() else DEFAULT_TICKERS)
+    try:
+        with open(index_path, "rb") as f:
+            version, signature, index = pickle.load(f)
+        if version == _INDEX_VERSION and signature == _signature(source):
+            return index
+    except Exception:
+        pass
+    return build_index(source, index_path)
@@ -0,0 +1,313 @@
+# backend/tracing.py
+import atexit
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Finished spans are appended here as JSON lines (one object per span); "" disables the log.
+TRACE_LOG_PATH = os.environ.get("TRACE_LOG_PATH", "data/cache/traces.jsonl")
+# The log is rotated to `<path>.1` once it grows past this size.
+TRACE_LOG_MAX_BYTES = int(os.environ.get("TRACE_LOG_MAX_BYTES", str(16 * 1024 * 1024)))
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "1") != "0"
+# Finished spans are buffered and appended in batches: at the latest after this many seconds,
+# when a trace's root span finishes, or once TRACE_FLUSH_MAX_SPANS are waiting.
+TRACE_FLUSH_SECONDS = float(os.environ.get("TRACE_FLUSH_SECONDS", "1"))
+TRACE_FLUSH_MAX_SPANS = int(os.environ.get("TRACE_FLUSH_MAX_SPANS", "1000"))
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_current: contextvars.ContextVar = contextvars.ContextVar("trace_span", default=None)
+_lock = threading.Lock()
+_log_thread_lock = threading.Lock()
+_pending: List[str] = []
+_pending_lock = threading.Lock()
+_flush_wanted = threading.Event()
+_flusher: Optional[threading.Thread] = None
+_counts: Dict[Tuple[str, str], int] = defaultdict(int)
+_histograms: Dict[str, List[float]] = {}
+
+class Span:
+    """
+    One timed step of a run. Spans nest through a context variable: a span opened while
+    another is current becomes its child, and a span opened with no current span starts a
+    new trace. Use `span()` rather than constructing these directly.
+    """
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attrs", "start", "_t0", "status")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, trace_id: Optional[str] = None,
+                 parent_id: Optional[str] = None, **attrs):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else (trace_id or uuid.uuid4().hex[:16])
+        self.parent_id = parent.span_id if parent else parent_id
+        self.span_id = uuid.uuid4().hex[:8]
+        self.attrs = attrs
+        self.status = "ok"
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs) -> None:
+        """Adds attributes (e.g. cache hit, engine, sizes) to the span."""
+        self.attrs.update(attrs)
+
+    def context(self) -> Tuple[str, str]:
+        """The (trace_id, span_id) pair to continue this trace in another process; see `attach`."""
+        return self.trace_id, self.span_id
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    """
+    Times the enclosed block as a span named `name` (e.g. "price.fetch", "tool.search").
+    Exceptions are recorded as status "error" and re-raised. Work handed to other threads
+    stays in the trace when it runs in a copy of the context (`contextvars.copy_context().run`).
+    """
+    s = Span(name, parent=_current.get(), **attrs)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.status = "error"
+        s.attrs.setdefault("error", f"{type(e).__name__}: {e}"[:300])
+        raise
+    finally:
+        _current.reset(token)
+        _finish(s, (time.perf_counter() - s._t0) * 1000)
+        if s.parent_id is None:
+            _flush_wanted.set()  # a whole trace is done; write it out now
+
+def traced(name: str):
+    """Decorator form of `span`: times every call of the function as a span named `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record(name: str, start: float, duration_ms: float, status: str = "ok", parent: Optional[Span] = None,
+           **attrs) -> None:
+    """Records an already finished step (e.g. timed elsewhere, or reported by a callback) under the current span."""
+    s = Span(name, parent=parent or _current.get(), **attrs)
+    s.start = start
+    s.status = status
+    _finish(s, duration_ms)
+
+def annotate(**attrs) -> None:
+    """Adds attributes to the current span, if any."""
+    current = _current.get()
+    if current is not None:
+        current.set(**attrs)
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+@contextmanager
+def attach(ctx: Optional[Tuple[str, str]]) -> Iterator[None]:
+    """Continues a trace from `Span.context()` of another process (e.g. a PDF render worker)."""
+    if not ctx:
+        yield
+        return
+    remote = Span("remote", trace_id=ctx[0])
+    remote.span_id = ctx[1]
+    token = _current.set(remote)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+        # This process's part of the trace is done; worker processes may exit before the next flush.
+        flush()
+
+def _finish(s: Span, duration_ms: float) -> None:
+    if not TRACING_ENABLED:
+        return
+    with _lock:
+        _counts[(s.name, s.status)] += 1
+        hist = _histograms.setdefault(s.name, [0.0] * (len(BUCKETS) + 2))  # buckets, sum, count
+        seconds = duration_ms / 1000
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+    if TRACE_LOG_PATH:
+        _write({
+            "trace_id": s.trace_id, "span_id": s.span_id, "parent_id": s.parent_id, "name": s.name,
+            "start": round(s.start, 6), "duration_ms": round(duration_ms, 3), "status": s.status,
+            "pid": os.getpid(), "thread": threading.current_thread().name,
+            "attrs": {k: v if isinstance(v, (str, int, float, bool, type(None))) else str(v) for k, v in s.attrs.items()},
+        })
+
+@contextmanager
+def _log_lock(path: Path) -> Iterator[None]:
+    """
+    Serialises rotation and appends to the trace log across threads and processes (the PDF
+    render workers append to the same file). Without fcntl (Windows) only this process is covered.
+    """
+    with open(path.with_name(path.name + ".lock"), "a") as lock:
+        if fcntl is None:
+            with _log_thread_lock:
+                yield
+            return
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _write(entry: Dict) -> None:
+    """Buffers a finished span for the background flusher."""
+    global _flusher
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _pending_lock:
+        _pending.append(line)
+        full = len(_pending) >= TRACE_FLUSH_MAX_SPANS
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="trace-flush", daemon=True)
+            _flusher.start()
+    if full:
+        _flush_wanted.set()
+
+def _flush_loop() -> None:
+    while True:
+        _flush_wanted.wait(TRACE_FLUSH_SECONDS)
+        _flush_wanted.clear()
+        flush()
+
+def flush() -> None:
+    """Appends every buffered span to the trace log, taking the log lock once for the whole batch."""
+    with _pending_lock:
+        if not _pending:
+            return
+        lines = _pending[:]
+        _pending.clear()
+    path = Path(TRACE_LOG_PATH)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _log_lock(path):
+            if path.exists() and path.stat().st_size > TRACE_LOG_MAX_BYTES:
+                os.replace(path, path.with_name(path.name + ".1"))
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+    except OSError as e:
+        print(f"Trace log write failed ({len(lines)} spans dropped):", e)
+
+atexit.register(flush)
+
+def prometheus_text(prefix: str = "finotron") -> str:
+    """
+    Returns this process's span metrics in the Prometheus text exposition format: a counter
+    of spans per name and status, and a duration histogram per span name.
+    """
+    with _lock:
+        counts = dict(_counts)
+        histograms = {name: list(h) for name, h in _histograms.items()}
+    lines = [f"# HELP {prefix}_spans_total Finished spans by name and status.",
+             f"# TYPE {prefix}_spans_total counter"]
+    for (name, status), n in sorted(counts.items()):
+        lines.append(f'{prefix}_spans_total{{name="{name}",status="{status}"}} {n}')
+    lines += [f"# HELP {prefix}_span_duration_seconds Span durations.",
+              f"# TYPE {prefix}_span_duration_seconds histogram"]
+    for name, hist in sorted(histograms.items()):
+        for bound, n in zip(BUCKETS, hist):
+            lines.append(f'{prefix}_span_duration_seconds_bucket{{name="{name}",le="{bound}"}} {int(n)}')
+        lines.append(f'{prefix}_span_duration_seconds_bucket{{name="{name}",le="+Inf"}} {int(hist[-1])}')
+        lines.append(f'{prefix}_span_duration_seconds_sum{{name="{name}"}} {hist[-2]:.6f}')
+        lines.append(f'{prefix}_span_duration_seconds_count{{name="{name}"}} {int(hist[-1])}')
+    return "\n".join(lines) + "\n"
+
+def recent_traces(limit: int = 20, max_bytes: int = 4 * 1024 * 1024) -> List[Dict]:
+    """
+    Reads the tail of the trace log and groups spans into traces, newest first.
+
+    Returns:
+        List[Dict]: Traces with 'trace_id', 'name' (the root span), 'start', 'duration_ms',
+                    'status' and 'spans' (sorted by start time, each with its 'depth').
+    """
+    path = Path(TRACE_LOG_PATH)
+    if not TRACE_LOG_PATH or not path.exists():
+        return []
+    with open(path, "rb") as f:
+        f.seek(max(0, path.stat().st_size - max_bytes))
+        raw = f.read().decode("utf-8", errors="replace").splitlines()
+    by_trace: Dict[str, List[Dict]] = defaultdict(list)
+    for line in raw:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue  # first line of the tail window may be partial
+        by_trace[entry["trace_id"]].append(entry)
+
+    traces = []
+    for trace_id, spans in by_trace.items():
+        ids = {s["span_id"] for s in spans}
+        roots = [s for s in spans if s["parent_id"] not in ids]
+        root = max(roots, key=lambda s: s["duration_ms"])
+        children = defaultdict(list)
+        for s in spans:
+            children[s["parent_id"]].append(s)
+        ordered = []
+
+        def walk(s, depth):
+            ordered.append({**s, "depth": depth})
+            for child in sorted(children.get(s["span_id"], []), key=lambda c: c["start"]):
+                walk(child, depth + 1)
+        for r in sorted(roots, key=lambda s: s["start"]):
+            walk(r, 0)
+        start = min(s["start"] for s in spans)
+        end = max(s["start"] + s["duration_ms"] / 1000 for s in spans)
+        traces.append({"trace_id": trace_id, "name": root["name"], "start": start,
+                       "duration_ms": round((end - start) * 1000, 1),
+                       "status": "error" if any(s["status"] == "error" for s in spans) else "ok",
+                       "spans": ordered})
+    traces.sort(key=lambda t: t["start"], reverse=True)
+    return traces[:limit]
+
+def langchain_callbacks(role: str) -> list:
+    """
+    LangChain callback handlers that record every chat-model call as an "llm.<role>" span
+    under the span current when the call started. Empty when langchain is unavailable.
+    """
+    try:
+        from langchain_core.callbacks import BaseCallbackHandler
+    except Exception:
+        return []
+
+    class _SpanHandler(BaseCallbackHandler):
+        def __init__(self):
+            self._started = {}
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._started[run_id] = (time.time(), time.perf_counter(), _current.get())
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._started[run_id] = (time.time(), time.perf_counter(), _current.get())
+
+        def _end(self, run_id, status, **attrs):
+            started = self._started.pop(run_id, None)
+            if started:
+                wall, t0, parent = started
+                record(f"llm.{role}", wall, (time.perf_counter() - t0) * 1000, status=status, parent=parent, **attrs)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+            self._end(run_id, "ok", prompt_tokens=usage.get("prompt_tokens"),
+                      completion_tokens=usage.get("completion_tokens"))
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._end(run_id, "error", error=str(error)[:300])
+
+    return [_SpanHandler()]
@@ -1,43 +1,31 @@
 import streamlit as st
-import json
+import time
 import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime
-from pathlib import Path
 from backend.data_fetcher import fetch_history, plot_history_to_bytes
-from backend.agent_client import call_agent_api
+from backend.downsample import downsample
+from backend.indicators import indicator_summary, report_metrics
+from backend.agent_client import call_agent_api, crew_mode_stats, prewarm_in_background, stream_agent_api
+from backend.jobs import get_job, submit_job
 from backend.report import markdown_to_pdf_bytes
+from backend.ticker_index import TICKERS_FILE, load_index
 from components.buttons import styled_button, styled_download_button
 
 # ---------------------------------------------------------------------
 # Helper utilities (copied from app.py for modularity)
 # ---------------------------------------------------------------------
-DATA = Path("data")
-DEFAULT_TICKERS = DATA / "tickers_sample.json"
-TICKERS_FILE = DATA / "tickers.json"
-
-def load_tickers():
-    try:
-        if TICKERS_FILE.exists():
-            with open(TICKERS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        else:
-            with open(DEFAULT_TICKERS, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except Exception:
-        return {"NSE": [], "BSE": []}
-
-def build_options_and_map(tickers_data, cap=3000):
-    options = []
-    mapping = {}
-    for exch in ["NSE", "BSE"]:
-        for item in tickers_data.get(exch, [])[:cap]:
-            label = f"{item['symbol']} — {item.get('name','')}"
-            options.append(label)
-            mapping[label] = {"symbol": item["symbol"], "exchange": exch}
-    return options, mapping
+JOB_POLL_SECONDS = 2
+SEARCH_PAGE_SIZE = 50
+
+@st.cache_resource
+def get_ticker_index(source_mtime):
+    # Loaded once per server process and tickers-file version; the on-disk index is rebuilt only when the file changes.
+    return load_index()
 
 def create_price_figure(df, symbol):
+    # Long or intraday histories are reduced to CHART_MAX_POINTS shape-preserving points.
+    df = downsample(df)
+    import plotly.graph_objects as go  # deferred until there is a chart to draw
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=df.index, y=df["Close"], mode="lines", name="Close"))
     fig.update_layout(
@@ -50,26 +38,168 @@ def create_price_figure(df, symbol):
     fig.update_yaxes(rangemode="tozero", showgrid=True)
     return fig
 
+def render_agent_stream(payload, force_refresh=False):
+    """Renders agent output section by section as it streams in and returns the final response."""
+    st.markdown("##### Live agent output")
+    overview_box = st.empty()
+    tasks_box = st.container()
+    overview_text = ""
+    last_paint = 0.0
+    resp = {}
+    for event in stream_agent_api(payload, force_refresh=force_refresh):
+        if event["type"] == "overview_delta":
+            overview_text += event["text"]
+            # Repaint at most a few times per second; every delta would flood the websocket.
+            if time.monotonic() - last_paint > 0.2:
+                overview_box.info(overview_text)
+                last_paint = time.monotonic()
+        elif event["type"] == "task":
+            with tasks_box.expander(event["agent"] or "Task output", expanded=False):
+                st.markdown(event["output"], unsafe_allow_html=True)
+        elif event["type"] == "result":
+            resp = event["result"]
+    if overview_text:
+        overview_box.info(overview_text)
+    return resp
+
+def unpack_response(resp):
+    """Extracts the report and overview from an agent response, surfacing per-branch failures."""
+    if resp.get("cached"):
+        st.caption("Served from the analysis cache. Tick **Force refresh** to run the agents again.")
+    md = resp.get("markdown_report", "")
+    ov = resp.get("stock_overview", "")
+    tool_cache = resp.get("tool_cache")
+    if tool_cache:
+        st.caption("Tool cache: " + ", ".join(
+            f"{tool} {c['hits']} hits / {c['misses']} misses" for tool, c in tool_cache.items() if isinstance(c, dict)))
+    timings = resp.get("timings")
+    if timings and "crew_s" in timings:
+        st.caption(f"Crew ({resp.get('crew_mode', 'hierarchical')}) took {timings['crew_s']:.1f} s; "
+                   f"total {timings.get('total_s', 0):.1f} s")
+        mode_stats = [f"{mode}: median {s['median_s']:.1f} s over {s['runs']} runs"
+                      for mode, s in crew_mode_stats().items() if s["runs"]]
+        if mode_stats:
+            st.caption("Crew wall-clock by mode (this server): " + "; ".join(mode_stats))
+    context_tokens = resp.get("context_tokens")
+    if context_tokens and context_tokens.get("tokens_in"):
+        st.caption(f"Tool output compacted from {context_tokens['tokens_in']:,} to {context_tokens['tokens_out']:,} tokens "
+                   f"({context_tokens['saved']:.0%} saved)")
+    for branch, err in resp.get("errors", {}).items():
+        st.warning(f"Agent {branch} step failed: {err}")
+    if not md:
+        md = "## No report returned from Agent.\n"
+    return md, ov
+
+def render_report(md, ov, symbol, exchange, capital, last_close, chart_bytes, indicators=None):
+    """Shows the finished report and its Markdown/PDF downloads."""
+    # Store markdown in session and show expandable report
+    st.session_state["last_md"] = md
+    st.session_state["last_ov"] = ov
+    st.subheader("AI Report")
+    st.markdown("The AI-generated report is shown below. Use the download buttons to export MD or PDF.")
+    with st.expander("View full report (Markdown)", expanded=False):
+        st.markdown(md, unsafe_allow_html=True)
+
+    # Downloads
+    md_bytes = md.encode("utf-8")
+    now_stamp = datetime.utcnow().strftime("%Y%m%d_%H%M")
+    md_filename = f"{symbol}_{now_stamp}.md"
+    pdf_filename = f"{symbol}_{now_stamp}.pdf"
+
+    col_dl1, col_dl2, _ = st.columns([1, 1, 3])
+    with col_dl1:
+        styled_download_button("Download .md", data=md_bytes, file_name=md_filename, mime="text/markdown")
+    with col_dl2:
+        try:
+            pdf_bytes = markdown_to_pdf_bytes(md, ov, symbol=symbol,
+                                              exchange=exchange,
+                                              chart_bytes=chart_bytes,
+                                              capital=capital,
+                                              last_close=last_close,
+                                              extra_metrics=report_metrics(indicators or {}))
+            st.session_state["last_pdf"] = pdf_bytes
+            styled_download_button("Download .pdf", data=pdf_bytes, file_name=pdf_filename, mime="application/pdf")
+        except Exception as e:
+            st.warning("PDF generation failed (server may lack HTML engine). You can still download the .md file.")
+            st.write(f"Debug: {e}")
+
+    # Small post-run tips
+    st.info("Tip: Review the chart and the risk sections carefully before trading. Use downloads to archive.")
+
+def dismiss_job():
+    st.session_state.pop("job_id", None)
+    st.query_params.pop("job", None)
+
+def render_job(job_id):
+    """Shows a background analysis; polls while it runs and renders the report once it is done."""
+    job = get_job(job_id)
+    if job is None:
+        st.warning(f"Analysis job {job_id} was not found.")
+        dismiss_job()
+        return
+
+    payload = job["payload"]
+    symbol, exchange = payload["stock_symbol"], payload.get("exchange", "NSE")
+    st.markdown(f"#### Background analysis: {symbol} ({job['status']})")
+    st.progress(job["progress"], text=f"{len(job['events'])} sections received")
+    for event in job["events"]:
+        if event["type"] == "task":
+            with st.expander(event["agent"] or "Task output", expanded=False):
+                st.markdown(event["output"], unsafe_allow_html=True)
+    st.button("Dismiss", on_click=dismiss_job, key="dismiss_job")
+
+    if job["status"] in ("queued", "running"):
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+    elif job["status"] == "failed":
+        st.error(f"Analysis failed: {job['error']}")
+    else:
+        md, ov = unpack_response(job["result"])
+        chart_bytes = st.session_state.get("last_chart_bytes")
+        if chart_bytes is None:
+            # Reattached from a new session: rebuild the chart from the (cached) price history.
+            try:
+                chart_bytes = plot_history_to_bytes(fetch_history(symbol, exchange, period="1y"),
+                                                    title=f"{symbol} price (1y)").getvalue()
+            except Exception:
+                chart_bytes = None
+        price_summary = payload.get("price_summary", {})
+        render_report(md, ov, symbol, exchange, payload.get("capital"),
+                      price_summary.get("last_close"), chart_bytes, price_summary.get("indicators"))
+
 # ---------------------------------------------------------------------
 # Analysis Page UI
 # ---------------------------------------------------------------------
 st.markdown("<div class='card'><div class='h-title' style='font-size: 2.5rem; font-weight: 800;'>Stock Analysis Dashboard</div>"
             "<div class='h-sub' style='font-size: 1.2rem; font-style: italic;'>Select a stock, set your constraints and run the Agentic AI to receive a detailed Markdown report.</div></div>", unsafe_allow_html=True)
 
-tickers_data = load_tickers()
-options, mapping = build_options_and_map(tickers_data)
+ticker_index = get_ticker_index(TICKERS_FILE.stat().st_mtime_ns if TICKERS_FILE.exists() else 0)
 
 # ---------------------------------------------------------------------
 # Input Section
 # ---------------------------------------------------------------------
 def reset_analysis():
-    for key in ["last_md", "last_pdf", "last_chart_bytes", "stock_label", "capital", "strategy", "risk", "news_impact"]:
+    for key in ["last_md", "last_pdf", "last_chart_bytes", "stock_query", "stock_page", "stock_label", "capital", "strategy", "risk", "news_impact", "force_refresh", "stream_output", "crew_mode", "background"]:
         if key in st.session_state:
             del st.session_state[key]
 
 with st.container():
     st.markdown("#### 1. Select Inputs")
-    stock_label = st.selectbox("Select stock", options, index=0, help="Symbol — Company name", key="stock_label")
+    # A new query starts again from its first page of results.
+    query = st.text_input("Search stocks", key="stock_query", placeholder="Symbol or company name, e.g. RELIANCE or tata motors",
+                          on_change=lambda: st.session_state.pop("stock_page", None))
+    _, total = ticker_index.search(query, page_size=SEARCH_PAGE_SIZE)
+    pages = max(1, -(-total // SEARCH_PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Results page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key="stock_page")
+    results, _ = ticker_index.search(query, page=int(page) - 1, page_size=SEARCH_PAGE_SIZE)
+    if not results:
+        st.warning("No stocks match your search.")
+        st.stop()
+    mapping = {r["label"]: r for r in results}
+    st.caption(f"{total:,} matching stocks")
+    stock_label = st.selectbox("Select stock", list(mapping), index=0, help="Symbol — Company name (Exchange)", key="stock_label")
     capital = st.number_input("Capital (INR)", min_value=1000, step=1000, value=10000, format="%d", key="capital")
     strategy = st.selectbox(
         "Trading strategy",
@@ -84,12 +214,22 @@ with st.container():
     )
     risk = st.selectbox("Risk tolerance", ["Medium", "High", "Low"], key="risk")
     news_impact = st.checkbox("Consider News Impact", value=True, key="news_impact")
+    force_refresh = st.checkbox("Force refresh", value=False, key="force_refresh",
+                                help="Run the agents again even if this analysis was cached earlier today.")
+    stream_output = st.checkbox("Stream agent output", value=True, key="stream_output",
+                                help="Show each agent's section and the overview as soon as they are produced.")
+    crew_mode = st.radio("Crew execution", ["hierarchical", "dag"], horizontal=True, key="crew_mode",
+                         format_func={"hierarchical": "Hierarchical (manager-led)", "dag": "DAG (parallel research)"}.get,
+                         help="Hierarchical: a manager agent delegates every task. DAG: company research and data analysis "
+                              "run in parallel and later tasks read their outputs directly, without manager round-trips.")
+    background = st.checkbox("Run in background", value=False, key="background",
+                             help="Queue the analysis on a worker process. You can leave the page and come back to it later.")
 
     # Real-time display of inputs
     st.markdown("---")
     st.markdown("#### 2. Review Selections (Real-time)")
-    symbol = mapping[st.session_state.stock_label]["symbol"]
-    exchange = mapping[st.session_state.stock_label]["exchange"]
+    symbol = mapping[stock_label]["symbol"]
+    exchange = mapping[stock_label]["exchange"]
     
     # Display selections in a table
     selection_data = {
@@ -117,6 +257,7 @@ if run:
 # Results area
 if run:
     # Clear previous results in session
+    dismiss_job()
     st.session_state.pop("last_md", None)
     st.session_state.pop("last_pdf", None)
     st.session_state.pop("last_chart_bytes", None)
@@ -132,6 +273,10 @@ if run:
     if df.empty:
         st.error("No price history available for this symbol.")
     else:
+        fetch_info = df.attrs.get("fetch")
+        if fetch_info:
+            st.caption(f"Price history: {len(df)} bars from {fetch_info['source']} in {fetch_info['elapsed_ms']:.0f} ms")
+
         # Interactive chart
         fig = create_price_figure(df, symbol)
         st.plotly_chart(fig, use_container_width=True)
@@ -154,56 +299,46 @@ if run:
         "risk_tolerance": risk,
         "strategy": strategy,
         "news_impact": bool(news_impact),
+        "crew_mode": crew_mode,
         "price_summary": {
             "last_close": float(df["Close"].iloc[-1]) if not df.empty else None,
-            "mean_30d": float(df["Close"].tail(30).mean()) if len(df) >= 30 else None
+            "mean_30d": float(df["Close"].tail(30).mean()) if len(df) >= 30 else None,
+            # SMA/EMA, RSI, MACD, ATR, volatility, drawdown and volume z-score, computed locally.
+            "indicators": indicator_summary(df) if not df.empty else {}
         }
     }
 
-    # Call Agentic API
-    with st.spinner("Calling Agentic AI..."):
-        try:
-            resp = call_agent_api(payload)
-            md = resp.get("markdown_report", "")
-            ov = resp.get("stock_overview", "")
-            if not md:
-                md = "## No report returned from Agent.\n"
-        except Exception as e:
-            md = f"# Error\nAgent API call failed: {e}"
-            ov = f"# Error\nAgent API call failed: {e}"
-            st.error("Agent API call failed: see report for details.")
-
-    # Store markdown in session and show expandable report
-    st.session_state["last_md"] = md
-    st.session_state["last_ov"] = ov
-    st.subheader("AI Report")
-    st.markdown("The AI-generated report is shown below. Use the download buttons to export MD or PDF.")
-    with st.expander("View full report (Markdown)", expanded=False):
-        st.markdown(md, unsafe_allow_html=True)
-
-    # Downloads
-    md_bytes = md.encode("utf-8")
-    now_stamp = datetime.utcnow().strftime("%Y%m%d_%H%M")
-    md_filename = f"{symbol}_{now_stamp}.md"
-    pdf_filename = f"{symbol}_{now_stamp}.pdf"
-
-    col_dl1, col_dl2, _ = st.columns([1, 1, 3])
-    with col_dl1:
-        styled_download_button("Download .md", data=md_bytes, file_name=md_filename, mime="text/markdown")
-    with col_dl2:
+    if background:
+        # Hand the analysis to a worker process; the page polls it below and can reattach later.
         try:
-            pdf_bytes = markdown_to_pdf_bytes(md, ov, symbol=symbol,
-                                              chart_bytes=st.session_state.get("last_chart_bytes"),
-                                              capital=int(st.session_state.capital),
-                                              last_close=payload["price_summary"].get("last_close"))
-            st.session_state["last_pdf"] = pdf_bytes
-            styled_download_button("Download .pdf", data=pdf_bytes, file_name=pdf_filename, mime="application/pdf")
+            job_id = submit_job(payload, force_refresh=force_refresh)
+            st.session_state["job_id"] = job_id
+            st.query_params["job"] = job_id
         except Exception as e:
-            st.warning("PDF generation failed (server may lack HTML engine). You can still download the .md file.")
-            st.write(f"Debug: {e}")
+            st.error(f"Could not queue the analysis: {e}")
+    else:
+        # Call Agentic API
+        with st.spinner("Calling Agentic AI..."):
+            try:
+                if stream_output:
+                    resp = render_agent_stream(payload, force_refresh=force_refresh)
+                else:
+                    resp = call_agent_api(payload, force_refresh=force_refresh)
+                md, ov = unpack_response(resp)
+            except Exception as e:
+                md = f"# Error\nAgent API call failed: {e}"
+                ov = f"# Error\nAgent API call failed: {e}"
+                st.error("Agent API call failed: see report for details.")
 
-    # Small post-run tips
-    st.info("Tip: Review the chart and the risk sections carefully before trading. Use downloads to archive.")
+        render_report(md, ov, symbol, exchange, int(st.session_state.capital),
+                      payload["price_summary"].get("last_close"), st.session_state.get("last_chart_bytes"),
+                      payload["price_summary"]["indicators"])
 
-else:
+job_id = st.session_state.get("job_id") or st.query_params.get("job")
+if job_id and not (run and not background):
+    render_job(job_id)
+elif not run:
     st.markdown("<div class='card'><b>Ready to analyze</b> — choose a stock and press **Run analysis**.</div>", unsafe_allow_html=True)
+
+# The page is interactive by now; load the agent stack off the script thread for the first run.
+prewarm_in_background()
@@ -0,0 +1,77 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+from backend import tracing
+
+st.set_page_config(layout="wide")
+
+TRACE_LIMIT = 50
+
+def create_waterfall(trace):
+    # One bar per span, offset from the start of the trace; nesting is shown by indenting the labels.
+    import plotly.graph_objects as go  # deferred until there is a trace to draw
+    t0 = trace["start"]
+    spans = trace["spans"]
+    labels = [f"{i:>3}. " + " " * s["depth"] + s["name"] for i, s in enumerate(spans, 1)]
+    fig = go.Figure(go.Bar(
+        y=labels,
+        x=[s["duration_ms"] for s in spans],
+        base=[(s["start"] - t0) * 1000 for s in spans],
+        orientation="h",
+        marker_color=["#e5534b" if s["status"] == "error" else "#4c8bf5" for s in spans],
+        hovertext=[", ".join(f"{k}={v}" for k, v in s["attrs"].items()) for s in spans],
+    ))
+    fig.update_layout(
+        template="plotly_dark" if st.session_state.get("theme", "dark") == "dark" else "plotly_white",
+        xaxis_title="ms since start of trace",
+        yaxis=dict(autorange="reversed"),
+        height=max(240, 26 * len(spans) + 80),
+        margin=dict(l=10, r=10, t=20, b=40),
+        showlegend=False,
+    )
+    return fig
+
+st.markdown("<div class='card'><div class='h-title' style='font-size: 2.5rem; font-weight: 800;'>Diagnostics</div>"
+            "<div class='h-sub' style='font-size: 1.2rem; font-style: italic;'>Per-step timings of recent analyses and exported metrics.</div></div>", unsafe_allow_html=True)
+
+st.markdown("---")
+
+st.subheader("Recent traces")
+traces = tracing.recent_traces(limit=TRACE_LIMIT)
+if not tracing.TRACE_LOG_PATH:
+    st.info("The trace log is disabled (TRACE_LOG_PATH is empty).")
+elif not traces:
+    st.info("No traces yet. Run an analysis from the **Analysis** page.")
+else:
+    def describe(t):
+        when = datetime.fromtimestamp(t["start"]).strftime("%Y-%m-%d %H:%M:%S")
+        symbol = t["spans"][0]["attrs"].get("symbol") or ""
+        return f"{when} • {t['name']} {symbol} • {t['duration_ms'] / 1000:.2f}s • {t['status']}"
+
+    index = st.selectbox("Trace", range(len(traces)), format_func=lambda i: describe(traces[i]))
+    trace = traces[index]
+    st.plotly_chart(create_waterfall(trace), use_container_width=True)
+
+    rows = [{
+        "span": "  " * s["depth"] + s["name"],
+        "offset_ms": round((s["start"] - trace["start"]) * 1000, 1),
+        "duration_ms": s["duration_ms"],
+        "status": s["status"],
+        "process": s["pid"],
+        "thread": s["thread"],
+        "attributes": ", ".join(f"{k}={v}" for k, v in s["attrs"].items()),
+    } for s in trace["spans"]]
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    st.caption(f"Trace {trace['trace_id']} • {len(trace['spans'])} spans • log: {tracing.TRACE_LOG_PATH}")
+
+st.markdown("---")
+
+st.subheader("Metrics")
+st.caption("Span counts and duration histograms of this server process, in the Prometheus text format. "
+           "Spans recorded in PDF worker processes appear in the traces above but not here.")
+metrics = tracing.prometheus_text()
+st.code(metrics, language="text")
+st.download_button("Download metrics", metrics, file_name="metrics.prom", mime="text/plain")
+
+st.markdown("---")
+st.caption("© Financial Analyst • Agentic AI integration demo")
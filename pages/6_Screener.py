@@ -0,0 +1,150 @@
+import streamlit as st
+import time
+from datetime import datetime
+from backend.screener import (build_status, is_building, is_stale, load_matrix, matrix_path, rebuild_in_background,
+                              screen)
+
+st.set_page_config(layout="wide")
+
+SORT_OPTIONS = {
+    "momentum_12_1": "12-1 month momentum",
+    "return_3m": "3-month return",
+    "return_1m": "1-month return",
+    "return_1w": "1-week return",
+    "from_high_52w": "Distance from 52-week high",
+    "volume_ratio": "Volume vs 20-day average",
+    "volatility_20": "20-day volatility",
+    "turnover_20": "Average traded value",
+}
+# Seconds between reruns while an exchange's first matrix is being built.
+BUILD_POLL_SECONDS = 5
+PERCENT_COLUMNS = ["return_1d", "return_1w", "return_1m", "return_3m", "return_1y", "momentum_12_1",
+                   "volatility_20", "from_high_52w"]
+
+@st.cache_resource(max_entries=8)
+def cached_matrix(exchange, source_mtime):
+    # One copy per server process and matrix file version; a rebuilt file gets a new key, so the
+    # other exchanges keep theirs. The screen itself runs on every rerun.
+    return load_matrix(exchange)
+
+def matrix_mtime(exchange):
+    path = matrix_path(exchange)
+    return path.stat().st_mtime_ns if path.exists() else 0
+
+st.markdown("<div class='card'><div class='h-title' style='font-size: 2.5rem; font-weight: 800;'>Stock Screener</div>"
+            "<div class='h-sub' style='font-size: 1.2rem; font-style: italic;'>Screen the whole exchange on returns, volatility, momentum and breakouts to pick stocks worth a full analysis.</div></div>", unsafe_allow_html=True)
+
+st.markdown("---")
+
+col_ex, col_refresh, _ = st.columns([1, 1, 3])
+with col_ex:
+    exchange = st.selectbox("Exchange", ["NSE", "BSE"], key="screen_exchange")
+with col_refresh:
+    st.write("")
+    rebuild = st.button("Rebuild price matrix", use_container_width=True,
+                        help="Download the latest bars for every symbol in the background; the current matrix stays in use meanwhile.")
+
+if rebuild and not rebuild_in_background(exchange):
+    st.info(f"The {exchange} price matrix is already being rebuilt.")
+
+with st.spinner("Loading price matrix..."):
+    matrix = cached_matrix(exchange, matrix_mtime(exchange))
+if matrix is None:
+    status = build_status(exchange)
+    if status is not None and status["state"] != "running" and not is_building(exchange):
+        # The build finished without writing a matrix; say why rather than polling forever.
+        st.error(f"Building the {exchange} price matrix failed: {status['error'] or 'no matrix was written'}. "
+                 "Use **Rebuild price matrix** to try again.")
+        st.stop()
+    rebuild_in_background(exchange)
+    st.info(f"Fetching price history for every {exchange} symbol. The first build of an exchange takes a few "
+            "minutes; this page refreshes once it is ready.")
+    time.sleep(BUILD_POLL_SECONDS)
+    st.rerun()
+if is_stale(matrix):
+    # Keep screening the stored matrix while a fresh one is built; the next rerun after it is saved picks it up.
+    rebuild_in_background(exchange)
+
+if matrix.shape[1] == 0:
+    st.warning("No price history is available for this exchange.")
+    st.stop()
+st.caption(f"{matrix.shape[1]:,} symbols × {matrix.shape[0]:,} trading days "
+           f"({matrix.dates[0]} to {matrix.dates[-1]}) • built {datetime.fromtimestamp(matrix.built_at):%Y-%m-%d %H:%M}"
+           + (f" • {matrix.errors} symbols without data" if matrix.errors else "")
+           + (" • rebuilding in the background" if is_building(exchange) else ""))
+
+with st.container():
+    st.markdown("#### Filters")
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        min_return_1m = st.number_input("Min 1-month return (%)", value=None, step=1.0, key="screen_ret_1m")
+        min_return_3m = st.number_input("Min 3-month return (%)", value=None, step=1.0, key="screen_ret_3m")
+        min_momentum = st.number_input("Min 12-1 month momentum (%)", value=None, step=5.0, key="screen_momentum")
+    with c2:
+        max_volatility = st.number_input("Max 20-day volatility (%, annualised)", value=None, min_value=0.0, step=5.0, key="screen_vol")
+        max_from_high = st.number_input("Within % of 52-week high", value=None, min_value=0.0, max_value=100.0, step=1.0,
+                                        key="screen_from_high")
+        breakout = st.selectbox("Breakout", [None, 20, 55], key="screen_breakout",
+                                format_func=lambda b: "Any" if b is None else f"Close above prior {b}-day high")
+    with c3:
+        min_price = st.number_input("Min price (INR)", value=10.0, min_value=0.0, step=10.0, key="screen_price")
+        min_turnover = st.number_input("Min avg traded value (₹ crore/day)", value=1.0, min_value=0.0, step=0.5, key="screen_turnover")
+        min_volume_ratio = st.number_input("Min volume vs 20-day average (×)", value=None, min_value=0.0, step=0.5, key="screen_volume")
+
+    c4, c5, _ = st.columns([2, 1, 2])
+    with c4:
+        sort_by = st.selectbox("Rank by", list(SORT_OPTIONS), format_func=SORT_OPTIONS.get, key="screen_sort")
+    with c5:
+        limit = st.number_input("Show top", min_value=10, max_value=1000, value=100, step=10, key="screen_limit")
+
+def pct(value):
+    return None if value is None else value / 100
+
+filters = {
+    "min_price": min_price,
+    "min_turnover": None if min_turnover is None else min_turnover * 1e7,
+    "min_return_1m": pct(min_return_1m),
+    "min_return_3m": pct(min_return_3m),
+    "min_momentum": pct(min_momentum),
+    "max_volatility": pct(max_volatility),
+    "max_from_high": None if max_from_high is None else -max_from_high / 100,
+    "min_volume_ratio": min_volume_ratio,
+    # Leave out symbols that stopped trading (suspended or delisted) more than a week ago.
+    "max_stale_bars": 5,
+}
+# Lower is better for these; everything else ranks highest first.
+ascending = sort_by in ("volatility_20",)
+result = screen(matrix, filters, breakout=breakout, sort_by=sort_by, ascending=ascending, limit=int(limit))
+info = result.attrs["screen"]
+st.markdown("---")
+st.markdown(f"#### Results: {info['matches']:,} of {info['universe']:,} symbols")
+st.caption(f"Screened in {info['elapsed_ms']:.0f} ms")
+
+table = result.drop(columns=["high_52w", "bars", "stale_bars"]).copy()
+table[PERCENT_COLUMNS] = table[PERCENT_COLUMNS] * 100
+table["turnover_20"] = table["turnover_20"] / 1e7
+st.dataframe(
+    table,
+    use_container_width=True,
+    column_config={
+        "last_close": st.column_config.NumberColumn("Last close", format="%.2f"),
+        "return_1d": st.column_config.NumberColumn("1D %", format="%.1f"),
+        "return_1w": st.column_config.NumberColumn("1W %", format="%.1f"),
+        "return_1m": st.column_config.NumberColumn("1M %", format="%.1f"),
+        "return_3m": st.column_config.NumberColumn("3M %", format="%.1f"),
+        "return_1y": st.column_config.NumberColumn("1Y %", format="%.1f"),
+        "momentum_12_1": st.column_config.NumberColumn("12-1M %", format="%.1f"),
+        "volatility_20": st.column_config.NumberColumn("Vol 20D %", format="%.1f"),
+        "from_high_52w": st.column_config.NumberColumn("From 52W high %", format="%.1f"),
+        "breakout_20": st.column_config.CheckboxColumn("20D breakout"),
+        "breakout_55": st.column_config.CheckboxColumn("55D breakout"),
+        "volume_ratio": st.column_config.NumberColumn("Volume ×", format="%.2f"),
+        "turnover_20": st.column_config.NumberColumn("Traded value (₹ cr)", format="%.2f"),
+    },
+)
+st.download_button("Download results (.csv)", table.to_csv().encode("utf-8"),
+                   file_name=f"screen_{exchange}_{datetime.now():%Y%m%d_%H%M}.csv", mime="text/csv")
+st.info("Pick a candidate and open the **Analysis** page from the sidebar to run the full agent analysis on it.")
+
+st.markdown("---")
+st.caption("© Financial Analyst • Agentic AI integration demo")
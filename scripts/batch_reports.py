@@ -0,0 +1,355 @@
+"""
+Generates analysis reports for a whole watchlist without the UI. For every symbol this
+runs the same steps as the Analysis page:
+
+    fetch  -> data_fetcher.fetch_history + indicator_summary
+    chart  -> data_fetcher.plot_history_to_bytes
+    agent  -> agent_client.call_agent_api
+    pdf    -> report.markdown_to_pdf_bytes
+
+Symbols are processed concurrently. Each step has its own concurrency limit, because
+price fetches, LLM calls and PDF renders hit different bottlenecks. New analyses are also
+started at most --llm-rate per minute. Rate-limit errors (HTTP 429) pause every LLM slot
+for the backoff interval. Other transient failures retry with exponential backoff. A symbol
+with no price history at all (delisted or misspelled) fails at once, without retries.
+
+Progress is kept in <out>/manifest.json, written after every step. A rerun with the same
+output directory skips finished symbols. It also reuses the Markdown of symbols whose
+analysis finished but whose PDF did not. Output files per symbol are <SYMBOL>.md,
+<SYMBOL>.overview.md and <SYMBOL>.pdf, plus a summary in <out>/index.md.
+
+The watchlist is a text file with one symbol per line, optionally followed by the exchange
+("RELIANCE", "TCS,NSE", "500325 BSE"); blank lines and "#" comments are ignored.
+
+Usage (from the repository root):
+
+    python scripts/batch_reports.py watchlist.txt --out reports/2025-06-30
+    python scripts/batch_reports.py watchlist.txt --out reports/today --llm-concurrency 2 --llm-rate 6
+    python scripts/batch_reports.py watchlist.txt --out reports/today --restart   # ignore the manifest
+"""
+try:
+    # Mirrors the sqlite3 swap FinoTron.py does for crewai.
+    __import__("pysqlite3")
+    import sys
+    sys.modules["sqlite3"] = sys.modules.pop("pysqlite3")
+except ImportError:
+    pass
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+MANIFEST = "manifest.json"
+INDEX = "index.md"
+EXCHANGES = ("NSE", "BSE")
+
+_RATE_LIMITED = re.compile(r"\b429\b|rate.?limit|too many requests", re.IGNORECASE)
+
+def read_watchlist(path: Path, default_exchange: str = "NSE") -> List[Tuple[str, str]]:
+    """Parses the watchlist into unique (symbol, exchange) pairs, in file order."""
+    entries = []
+    for n, raw in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        line = raw.split("#", 1)[0].strip()
+        if not line:
+            continue
+        parts = [p for p in re.split(r"[\s,;]+", line) if p]
+        symbol = parts[0].upper()
+        exchange = parts[1].upper() if len(parts) > 1 else default_exchange
+        if exchange not in EXCHANGES:
+            raise ValueError(f"{path}:{n}: unknown exchange {exchange!r} (expected one of {', '.join(EXCHANGES)})")
+        entries.append((symbol, exchange))
+    return list(dict.fromkeys(entries))
+
+def _file_stem(symbol: str, exchange: str) -> str:
+    # BSE scrip codes and NSE symbols can collide with each other's names only across exchanges.
+    return symbol if exchange == "NSE" else f"{symbol}.{exchange}"
+
+class RateLimiter:
+    """
+    Spaces out call starts to at most `per_minute` a minute. `pause` holds back every
+    caller for a while, e.g. after the API answered with a rate-limit error.
+    """
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+class Manifest:
+    """Per-symbol progress, persisted atomically after every change so a crashed run can resume."""
+    def __init__(self, out_dir: Path, restart: bool = False):
+        self.path = out_dir / MANIFEST
+        self._lock = threading.Lock()
+        self.data = {"symbols": {}}
+        if self.path.exists() and not restart:
+            self.data = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def get(self, key: str) -> Dict:
+        with self._lock:
+            return dict(self.data["symbols"].get(key, {}))
+
+    def update(self, key: str, **fields) -> None:
+        with self._lock:
+            entry = self.data["symbols"].setdefault(key, {})
+            entry.update(fields, updated_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+            self._save()
+
+    def add_run(self, **fields) -> None:
+        with self._lock:
+            self.data.setdefault("runs", []).append(fields)
+            self._save()
+
+    def _save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.data, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+class PermanentError(Exception):
+    """A step failure that retrying cannot fix; `Scheduler.run` raises it at once."""
+
+class Scheduler:
+    """
+    Runs one symbol's steps under separate concurrency limits per step kind, with retries.
+
+    Args:
+        fetch (int): Concurrent price fetches (and chart renders).
+        llm (int): Concurrent agent analyses.
+        pdf (int): Concurrent PDF renders.
+        llm_rate (float): Analyses started per minute; 0 for no limit.
+        retries (int): Retries per step after the first attempt.
+        backoff (float): Base backoff in seconds; doubled on every retry, with jitter.
+    """
+    def __init__(self, fetch: int, llm: int, pdf: int, llm_rate: float, retries: int, backoff: float):
+        self.slots = {"fetch": threading.BoundedSemaphore(fetch),
+                      "llm": threading.BoundedSemaphore(llm),
+                      "pdf": threading.BoundedSemaphore(pdf)}
+        self.llm_rate = RateLimiter(llm_rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, kind: str):
+        with self.slots[kind]:
+            if kind == "llm":
+                self.llm_rate.acquire()
+            yield
+
+    def run(self, kind: str, fn, *args, **kwargs):
+        """Calls `fn` in a `kind` slot, retrying failures; a slot is released while backing off."""
+        for attempt in range(self.retries + 1):
+            try:
+                with self.slot(kind):
+                    return fn(*args, **kwargs)
+            except PermanentError:
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt * random.uniform(0.8, 1.2)
+                if kind == "llm" and _RATE_LIMITED.search(f"{type(e).__name__}: {e}"):
+                    # The limit is per API key: hold back every analysis, not only this one.
+                    with self._lock:
+                        self.rate_limited += 1
+                    self.llm_rate.pause(delay)
+                print(f"    {kind} failed ({type(e).__name__}: {str(e)[:120]}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+def _analyse(payload: Dict, force_refresh: bool) -> Dict:
+    from backend.agent_client import call_agent_api
+    resp = call_agent_api(payload, force_refresh=force_refresh)
+    # A failed crew leaves no report worth keeping; a failed overview only loses the summary.
+    if "crew" in resp.get("errors", {}):
+        raise RuntimeError(resp["errors"]["crew"])
+    return resp
+
+def _fetch(symbol: str, exchange: str, period: str):
+    from backend.data_fetcher import fetch_history
+    df = fetch_history(symbol, exchange, period=period)
+    # Download errors raise and are retried; an empty history means the symbol has no data
+    # (delisted or misspelled), which no retry would change.
+    if df.empty:
+        raise PermanentError("no price history")
+    return df
+
+def process_symbol(symbol: str, exchange: str, args, scheduler: Scheduler, manifest: Manifest) -> None:
+    from backend import tracing
+    from backend.data_fetcher import plot_history_to_bytes
+    from backend.indicators import indicator_summary, report_metrics
+    from backend.report import markdown_to_pdf_bytes
+
+    key = f"{exchange}:{symbol}"
+    stem = _file_stem(symbol, exchange)
+    md_path, ov_path, pdf_path = (args.out / f"{stem}.md", args.out / f"{stem}.overview.md", args.out / f"{stem}.pdf")
+    state = manifest.get(key)
+    if state.get("status") == "done" and md_path.exists() and pdf_path.exists():
+        print(f"{key}: done earlier, skipped")
+        return
+    attempts = state.get("attempts", 0) + 1
+    manifest.update(key, symbol=symbol, exchange=exchange, status="running", attempts=attempts, error=None)
+    timings = {}
+
+    def step(name, kind, fn, *a, **kw):
+        started = time.perf_counter()
+        try:
+            return scheduler.run(kind, fn, *a, **kw)
+        finally:
+            timings[name] = round(time.perf_counter() - started, 2)
+
+    try:
+        with tracing.span("batch.report", symbol=symbol, exchange=exchange):
+            df = step("fetch", "fetch", _fetch, symbol, exchange, args.period)
+            indicators = indicator_summary(df)
+            last_close = float(df["Close"].iloc[-1])
+            chart = step("chart", "fetch", lambda: plot_history_to_bytes(df, title=f"{symbol} price ({args.period})").getvalue())
+
+            if state.get("analysed") and md_path.exists():
+                # The analysis finished in an earlier run; only the PDF is missing.
+                md = md_path.read_text(encoding="utf-8")
+                ov = ov_path.read_text(encoding="utf-8") if ov_path.exists() else ""
+            else:
+                payload = {
+                    "stock_symbol": symbol,
+                    "exchange": exchange,
+                    "capital": args.capital,
+                    "risk_tolerance": args.risk,
+                    "strategy": args.strategy,
+                    "news_impact": not args.no_news,
+                    "crew_mode": args.crew_mode,
+                    "price_summary": {
+                        "last_close": last_close,
+                        "mean_30d": float(df["Close"].tail(30).mean()) if len(df) >= 30 else None,
+                        "indicators": indicators,
+                    },
+                }
+                resp = step("agent", "llm", _analyse, payload, args.force_refresh)
+                md, ov = resp["markdown_report"], resp["stock_overview"] or ""
+                md_path.write_text(md, encoding="utf-8")
+                ov_path.write_text(ov, encoding="utf-8")
+                manifest.update(key, analysed=True, cached=resp.get("cached", False),
+                                overview_error=resp.get("errors", {}).get("overview"))
+
+            pdf = step("pdf", "pdf", markdown_to_pdf_bytes, md, ov, symbol=symbol, exchange=exchange,
+                       chart_bytes=chart, capital=args.capital, last_close=last_close,
+                       extra_metrics=report_metrics(indicators))
+            pdf_path.write_bytes(pdf)
+    except Exception as e:
+        manifest.update(key, status="failed", error=f"{type(e).__name__}: {e}"[:500], timings=timings)
+        print(f"{key}: failed ({type(e).__name__}: {e})")
+        return
+    manifest.update(key, status="done", last_close=last_close, rsi_14=indicators.get("rsi_14"),
+                    period_return=indicators.get("period_return"), timings=timings,
+                    files={"md": md_path.name, "overview": ov_path.name, "pdf": pdf_path.name})
+    print(f"{key}: done in {sum(timings.values()):.1f}s " + " ".join(f"{k}={v}s" for k, v in timings.items()))
+
+def write_index(out_dir: Path, manifest: Manifest, watchlist: List[Tuple[str, str]]) -> Path:
+    """Writes index.md: one row per watchlist symbol with its status, headline numbers and files."""
+    def pct(v):
+        return "" if v is None else f"{v * 100:.1f}%"
+
+    rows = ["| Symbol | Exchange | Status | Last close | RSI (14) | Period return | Report | PDF | Error |",
+            "|---|---|---|---:|---:|---:|---|---|---|"]
+    counts: Dict[str, int] = {}
+    for symbol, exchange in watchlist:
+        e = manifest.get(f"{exchange}:{symbol}")
+        status = e.get("status", "pending")
+        counts[status] = counts.get(status, 0) + 1
+        files = e.get("files") or {}
+        rows.append("| {} | {} | {} | {} | {} | {} | {} | {} | {} |".format(
+            symbol, exchange, status,
+            f"{e['last_close']:,.2f}" if e.get("last_close") is not None else "",
+            f"{e['rsi_14']:.1f}" if e.get("rsi_14") is not None else "",
+            pct(e.get("period_return")),
+            f"[md]({files['md']})" if files.get("md") else "",
+            f"[pdf]({files['pdf']})" if files.get("pdf") else "",
+            (e.get("error") or "").replace("|", "/").replace("\n", " ")[:120],
+        ))
+    summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+    path = out_dir / INDEX
+    path.write_text(f"# Watchlist reports\n\nGenerated {time.strftime('%Y-%m-%d %H:%M')} • {summary}\n\n"
+                    + "\n".join(rows) + "\n", encoding="utf-8")
+    return path
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate Markdown and PDF analysis reports for a watchlist.")
+    parser.add_argument("watchlist", type=Path, help="Text file with one symbol (and optionally its exchange) per line.")
+    parser.add_argument("--out", type=Path, required=True, help="Output directory for reports, the manifest and the index.")
+    parser.add_argument("--exchange", default="NSE", choices=EXCHANGES, help="Exchange for lines without one. Defaults to NSE.")
+    parser.add_argument("--capital", type=int, default=10000)
+    parser.add_argument("--risk", default="Medium", choices=("Low", "Medium", "High"))
+    parser.add_argument("--strategy", default="Swing", choices=("Swing", "Intraday", "Positional", "Delivery"))
+    parser.add_argument("--no-news", action="store_true", help="Do not weigh news impact.")
+    parser.add_argument("--crew-mode", default=os.environ.get("AGENT_CREW_MODE", "hierarchical"), choices=("hierarchical", "dag"))
+    parser.add_argument("--period", default="1y", help="Price history period. Defaults to 1y.")
+    parser.add_argument("--fetch-concurrency", type=int, default=8, help="Concurrent price fetches and charts. Defaults to 8.")
+    parser.add_argument("--llm-concurrency", type=int, default=2, help="Concurrent agent analyses. Defaults to 2.")
+    parser.add_argument("--pdf-concurrency", type=int, default=2, help="Concurrent PDF renders. Defaults to 2.")
+    parser.add_argument("--llm-rate", type=float, default=0, help="Analyses started per minute; 0 for no limit.")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per step. Defaults to 3.")
+    parser.add_argument("--backoff", type=float, default=5.0, help="Base retry backoff in seconds. Defaults to 5.")
+    parser.add_argument("--force-refresh", action="store_true", help="Bypass the agent result cache.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the existing manifest and redo every symbol.")
+    args = parser.parse_args(argv)
+
+    watchlist = read_watchlist(args.watchlist, args.exchange)
+    if not watchlist:
+        print(f"{args.watchlist} lists no symbols")
+        return 1
+    args.out.mkdir(parents=True, exist_ok=True)
+    # Size the crew pool and the PDF worker pool to the step limits (before the backend is imported).
+    os.environ.setdefault("AGENT_CREW_POOL_SIZE", str(args.llm_concurrency))
+    os.environ.setdefault("PDF_RENDER_WORKERS", str(args.pdf_concurrency))
+
+    manifest = Manifest(args.out, restart=args.restart)
+    scheduler = Scheduler(args.fetch_concurrency, args.llm_concurrency, args.pdf_concurrency,
+                          args.llm_rate, args.retries, args.backoff)
+    started = time.time()
+    print(f"{len(watchlist)} symbols -> {args.out} (fetch {args.fetch_concurrency}, llm {args.llm_concurrency}, "
+          f"pdf {args.pdf_concurrency}{f', {args.llm_rate:g}/min' if args.llm_rate else ''})")
+
+    # Enough threads that every step kind can use all of its slots at once.
+    workers = args.fetch_concurrency + args.llm_concurrency + args.pdf_concurrency
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+            for future in [pool.submit(process_symbol, s, e, args, scheduler, manifest) for s, e in watchlist]:
+                future.result()
+    finally:
+        pdf_renderer = sys.modules.get("backend.pdf_renderer")
+        if pdf_renderer is not None and pdf_renderer._renderer is not None:
+            pdf_renderer._renderer.shutdown()
+        index = write_index(args.out, manifest, watchlist)
+
+    statuses = [manifest.get(f"{e}:{s}").get("status") for s, e in watchlist]
+    failed = statuses.count("failed")
+    manifest.add_run(started_at=time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+                     elapsed_s=round(time.time() - started, 1), symbols=len(watchlist),
+                     done=statuses.count("done"), failed=failed, rate_limited=scheduler.rate_limited)
+    print(f"{statuses.count('done')}/{len(watchlist)} done, {failed} failed in {time.time() - started:.0f}s; "
+          f"index at {index}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Measures the per-request overhead of the agent stack outside the model itself. It compares
+two paths, each running a real `kickoff` against a local stub LLM that answers instantly
+(see scripts/bench_stubs.py):
+
+- building the clients, agents, tasks and crew from scratch, as every call_agent_api did before;
+- checking a pre-built crew out of the pool, with the shared clients, and returning it
+  (reset) to the pool.
+
+Search and scrape tools are stubbed too, so nothing leaves the machine. Usage (from the
+repository root):
+
+    python scripts/bench_agent_setup.py --runs 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_stubs import StubLLMServer, install_tool_stubs  # noqa: E402
+
+INPUTS = {
+    "stock_selection": "RELIANCE",
+    "initial_capital": 10000,
+    "risk_tolerance": "Medium",
+    "trading_strategy_preference": "Swing",
+    "news_impact_consideration": True,
+    "technical_indicators": "Not available.",
+}
+
+def _time(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+def _fresh():
+    # Mirrors the old per-call path: new clients, agents, tasks and crew every time.
+    from crewai import Crew, Process
+    from langchain_openai import ChatOpenAI
+    from openai import OpenAI
+    from backend import agent_client
+
+    OpenAI(api_key=agent_client.OPENAI_API_KEY, base_url=agent_client.OPENAI_BASE_URL)
+    llm = ChatOpenAI(api_key=agent_client.OPENAI_API_KEY, model=agent_client.OPENAI_MODEL_NAME,
+                     base_url=agent_client.OPENAI_BASE_URL)
+    agents = agent_client.create_agents(llm=llm)
+    tasks = agent_client.create_tasks(*agents)
+    crew = Crew(
+        agents=list(agents),
+        tasks=list(tasks),
+        manager_llm=ChatOpenAI(api_key=agent_client.OPENAI_API_KEY, model=agent_client.OPENAI_MODEL_NAME,
+                               base_url=agent_client.OPENAI_BASE_URL, temperature=0),
+        process=Process.hierarchical,
+    )
+    crew.kickoff(inputs=INPUTS)
+
+def _pooled():
+    from backend import agent_client
+
+    agent_client.get_openai_client()
+    with agent_client.get_crew_pool("hierarchical").acquire() as crew:
+        crew.kickoff(inputs=INPUTS)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    server = StubLLMServer(ttft_ms=0, answer_words=20).start()
+    os.environ.update({
+        "OPENAI_BASE_URL": server.base_url,
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_MODEL_NAME": os.environ.get("OPENAI_MODEL_NAME", "gpt-4o-mini"),
+        "SERPER_API_KEY": "bench",
+        "AGENT_PREWARM": "0",
+    })
+    install_tool_stubs(latency_ms=0, result_words=100)
+    from backend import agent_client
+
+    try:
+        # Warm-up outside the measurements: imports and the first pooled crew.
+        agent_client.get_crew_pool("hierarchical").prewarm(1)
+        _fresh()
+        _pooled()
+        for name, fn in (("fresh construction", _fresh), ("pooled reuse", _pooled)):
+            before = server.requests
+            samples = _time(fn, args.runs)
+            print(f"{name:>20}: median {statistics.median(samples):8.2f} ms, max {max(samples):8.2f} ms over "
+                  f"{args.runs} runs ({(server.requests - before) / args.runs:.1f} LLM calls per run)")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Measures the cold-start import cost of each Streamlit page: the time a fresh interpreter
+spends executing the page's top-level imports, which Streamlit pays before it can render
+anything. Each run uses a new process (`python -X importtime`), so nothing is cached in
+memory; the OS file cache is warm after the first run.
+
+Also lists the heaviest top-level packages and whether any of the deferred libraries
+(crewai, langchain_openai, openai, yfinance, matplotlib, plotly, weasyprint, ...) were loaded.
+Usage (from the repository root):
+
+    python scripts/bench_import_time.py --runs 5
+    python scripts/bench_import_time.py pages/2_Analysis.py
+"""
+import argparse
+import ast
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFERRED = ["crewai", "crewai_tools", "langchain_openai", "openai", "yfinance",
+            "matplotlib", "plotly", "weasyprint", "pdfkit", "reportlab"]
+
+def _imports_of(page: Path) -> str:
+    """The page's top-level import statements as a script (Streamlit calls are not executed)."""
+    tree = ast.parse(page.read_text(encoding="utf-8"))
+    nodes = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(n) for n in nodes)
+
+def _run(code: str):
+    """Runs `code` in a fresh interpreter; returns (total_ms, {top-level package: cumulative ms}, loaded deferred)."""
+    probe = code + f"\nimport sys\nprint(','.join(m for m in {DEFERRED!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    packages = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level entries are indented by a single space; their cumulative time includes all children.
+        if not name.startswith("  "):
+            packages[name.strip()] = int(cumulative) / 1000
+    lines = proc.stdout.strip().splitlines()
+    loaded = [m for m in lines[-1].split(",") if m] if lines else []
+    return sum(packages.values()), packages, loaded
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="Page files to measure. Defaults to FinoTron.py and pages/*.py.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages to list per page.")
+    args = parser.parse_args()
+
+    pages = [Path(p) for p in args.pages] or [ROOT / "FinoTron.py", *sorted((ROOT / "pages").glob("*.py"))]
+    for page in pages:
+        code = _imports_of(page)
+        try:
+            samples = [_run(code) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{page.name:>16}: import failed ({e})")
+            continue
+        totals = [total for total, _, _ in samples]
+        _, packages, loaded = samples[-1]
+        heaviest = sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:args.top]
+        print(f"{page.name:>16}: median {statistics.median(totals):8.1f} ms, min {min(totals):8.1f} ms "
+              f"over {args.runs} runs")
+        print(" " * 18 + "heaviest: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in heaviest))
+        print(" " * 18 + "deferred libraries loaded: " + (", ".join(loaded) or "none"))
+
+if __name__ == "__main__":
+    main()
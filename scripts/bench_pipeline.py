@@ -0,0 +1,278 @@
+"""
+Offline load benchmark of the analysis pipeline. Each simulated request runs the
+stages of one analysis in order:
+
+    fetch  -> data_fetcher.fetch_history (FileReplayProvider, synthetic bars)
+    chart  -> data_fetcher.plot_history_to_bytes
+    agent  -> agent_client.call_agent_api (stub LLM server + stubbed search/scrape tools)
+    pdf    -> report.markdown_to_pdf_bytes
+
+Requests run at each concurrency level in turn. For every level the script reports
+p50/p95/p99 latency per stage and end to end, throughput, errors and the peak RSS sampled
+during that level (of this process and of its worker processes). The results
+can be written as JSON to track regressions. Nothing leaves the machine: every cache
+and the replay data live in a temporary directory, and the agent result cache is bypassed.
+
+Usage (from the repository root):
+
+    python scripts/bench_pipeline.py --concurrency 1,2,4,8 --requests 16 --output bench.json
+    python scripts/bench_pipeline.py --stages fetch,chart,pdf          # without the agent stack
+    python scripts/bench_pipeline.py --llm-url http://127.0.0.1:8765/v1  # stub running elsewhere
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_stubs import StubLLMServer, install_tool_stubs, write_replay_prices  # noqa: E402
+
+STAGES = ("fetch", "chart", "agent", "pdf")
+
+def _configure_env(workdir: Path, args, llm_url: str) -> None:
+    """Points every backend setting at the stubs and the temporary directory; must run before backend imports."""
+    os.environ.update({
+        "OPENAI_BASE_URL": llm_url,
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_MODEL_NAME": os.environ.get("OPENAI_MODEL_NAME", "gpt-4o-mini"),
+        "SERPER_API_KEY": "bench",
+        "MARKET_DATA_PROVIDER": "replay",
+        "MARKET_DATA_REPLAY_DIR": str(workdir / "replay"),
+        "MARKET_DATA_REPLAY_LATENCY_MS": str(args.fetch_latency_ms),
+        "PRICE_CACHE_PATH": str(workdir / "prices.sqlite3"),
+        "AGENT_CACHE_PATH": str(workdir / "agent_results.sqlite3"),
+        "TOOL_CACHE_PATH": str(workdir / "tools.sqlite3"),
+        "RENDER_CACHE_PATH": str(workdir / "renders.sqlite3"),
+        "PRICE_ARCHIVE_DIR": str(workdir / "archive"),
+        "JOBS_DB_PATH": str(workdir / "jobs.sqlite3"),
+        # Keeps the bench's spans out of the real trace log and the Diagnostics page.
+        "TRACE_LOG_PATH": str(workdir / "traces.jsonl"),
+        "AGENT_CREW_MODE": args.crew_mode,
+        "AGENT_PREWARM": "0",
+    })
+
+def _percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return round(ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo), 1)
+
+def _summary(samples):
+    return {"n": len(samples), "p50_ms": _percentile(samples, 0.50), "p95_ms": _percentile(samples, 0.95),
+            "p99_ms": _percentile(samples, 0.99), "max_ms": round(max(samples), 1) if samples else None}
+
+def _lifetime_peak_rss_mb():
+    """Peak resident set size since start-up of this process and of its largest finished child, in MB."""
+    divisor = 1024 * 1024 if platform.system() == "Darwin" else 1024  # ru_maxrss is bytes on macOS, KB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor
+    return round(own, 1), round(children, 1)
+
+def _rss_mb(pid="self"):
+    """Current resident set size of a process in MB, from /proc; None where that is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+class RssSampler:
+    """
+    Samples the RSS of this process, and the summed RSS of its live worker processes, on a
+    thread while the block runs, and keeps the peaks. ru_maxrss cannot do this: it only ever
+    grows, so every level after the heaviest one would report that one's peak.
+    """
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.own = self.children = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _sample(self):
+        own = _rss_mb()
+        if own is None:
+            return False
+        children = sum(_rss_mb(p.pid) or 0 for p in multiprocessing.active_children())
+        self.own = max(self.own or 0, own)
+        self.children = max(self.children or 0, children)
+        return True
+
+    def _run(self):
+        while self._sample() and not self._stop.wait(self.interval):
+            pass
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+def _one_request(i, symbols, stages, args, record):
+    from backend import data_fetcher
+
+    symbol = symbols[i % len(symbols)]
+    timings = {}
+
+    def timed(stage, fn):
+        started = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            timings[stage] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    df = timed("fetch", lambda: data_fetcher.fetch_history(symbol, "NSE", period=args.period, use_cache=False))
+    chart = timed("chart", lambda: data_fetcher.plot_history_to_bytes(df).getvalue()) if "chart" in stages else None
+    md, overview = f"# {symbol}\n\nStub report.", "Stub overview."
+    if "agent" in stages:
+        from backend import agent_client
+        payload = {"stock_symbol": symbol, "exchange": "NSE", "capital": 10000, "risk_tolerance": "Medium",
+                   "strategy": "Swing", "news_impact": True, "crew_mode": args.crew_mode,
+                   "price_summary": {"last_close": float(df["Close"].iloc[-1])}}
+        resp = timed("agent", lambda: agent_client.call_agent_api(payload, force_refresh=True))
+        md, overview = resp["markdown_report"] or md, resp["stock_overview"] or overview
+    if "pdf" in stages:
+        from backend import report
+        timed("pdf", lambda: report.markdown_to_pdf_bytes(md, overview, symbol=symbol, chart_bytes=chart,
+                                                          capital=10000, last_close=float(df["Close"].iloc[-1]),
+                                                          use_cache=False))
+    timings["total"] = (time.perf_counter() - started) * 1000
+    record(timings)
+
+def run_level(concurrency, n_requests, symbols, stages, args):
+    """Runs `n_requests` requests `concurrency` at a time and summarises them."""
+    samples = {stage: [] for stage in (*stages, "total")}
+    errors = []
+    lock = threading.Lock()
+
+    def record(timings):
+        with lock:
+            for stage, ms in timings.items():
+                samples[stage].append(ms)
+
+    def guarded(i):
+        try:
+            _one_request(i, symbols, stages, args, record)
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    started = time.perf_counter()
+    with RssSampler() as rss, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(guarded, range(n_requests)))
+    wall = time.perf_counter() - started
+    if rss.own is not None:
+        own_rss, children_rss, rss_scope = round(rss.own, 1), round(rss.children, 1), "level"
+    else:
+        # No /proc (e.g. macOS): only the cumulative peaks are available.
+        own_rss, children_rss = _lifetime_peak_rss_mb()
+        rss_scope = "lifetime"
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "completed": len(samples["total"]),
+        "errors": len(errors),
+        "first_errors": errors[:3],
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(samples["total"]) / wall, 3) if wall else None,
+        "stages": {stage: _summary(s) for stage, s in samples.items()},
+        "peak_rss_mb": own_rss,
+        "peak_rss_children_mb": children_rss,
+        # "level": sampled while this level ran; "lifetime": the process's peak so far.
+        "peak_rss_scope": rss_scope,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", default="1,2,4", help="Comma-separated concurrency levels. Defaults to 1,2,4.")
+    parser.add_argument("--requests", type=int, default=8, help="Requests per concurrency level. Defaults to 8.")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Stages to run, from {','.join(STAGES)}.")
+    parser.add_argument("--symbols", type=int, default=20, help="Distinct synthetic symbols. Defaults to 20.")
+    parser.add_argument("--bars", type=int, default=750, help="Daily bars per symbol. Defaults to 750.")
+    parser.add_argument("--period", default="1y")
+    parser.add_argument("--fetch-latency-ms", type=float, default=50)
+    parser.add_argument("--llm-url", help="Use an already running stub/compatible server instead of starting one.")
+    parser.add_argument("--llm-ttft-ms", type=float, default=200, help="Stub delay before every answer.")
+    parser.add_argument("--llm-token-delay-ms", type=float, default=2, help="Stub delay per generated word.")
+    parser.add_argument("--llm-answer-words", type=int, default=300, help="Stub answer length.")
+    parser.add_argument("--tool-latency-ms", type=float, default=300, help="Stub search/scrape latency.")
+    parser.add_argument("--tool-result-words", type=int, default=1500, help="Stub scraped page length.")
+    parser.add_argument("--crew-mode", default="hierarchical", choices=("hierarchical", "dag"))
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s in STAGES]
+    if "fetch" not in stages:
+        stages.insert(0, "fetch")  # every other stage works on the fetched history
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    server = None
+    if "agent" in stages and not args.llm_url:
+        server = StubLLMServer(ttft_ms=args.llm_ttft_ms, token_delay_ms=args.llm_token_delay_ms,
+                               answer_words=args.llm_answer_words).start()
+    with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as tmp:
+        workdir = Path(tmp)
+        _configure_env(workdir, args, args.llm_url or (server.base_url if server else "http://127.0.0.1:9/v1"))
+        symbols = [f"BENCH{i:03d}" for i in range(args.symbols)]
+        write_replay_prices(workdir / "replay", symbols, bars=args.bars)
+        if "agent" in stages:
+            install_tool_stubs(args.tool_latency_ms, args.tool_result_words)
+
+        # Warm-up outside the measurements: imports, fonts, the first crew and the render pool.
+        run_level(1, 1, symbols, stages, args)
+
+        results = []
+        for level in levels:
+            result = run_level(level, args.requests, symbols, stages, args)
+            results.append(result)
+            print(f"concurrency {level:>3}: {result['completed']}/{result['requests']} ok, "
+                  f"{result['throughput_rps']} req/s, peak RSS {result['peak_rss_mb']} MB "
+                  f"(+{result['peak_rss_children_mb']} MB children"
+                  + (", process lifetime" if result["peak_rss_scope"] == "lifetime" else "") + ")")
+            for stage, s in result["stages"].items():
+                if s["n"]:
+                    print(f"    {stage:>6}: p50 {s['p50_ms']:9.1f} ms  p95 {s['p95_ms']:9.1f} ms  p99 {s['p99_ms']:9.1f} ms")
+            for err in result["first_errors"]:
+                print(f"    error: {err}")
+
+        if "pdf" in stages:
+            from backend.pdf_renderer import get_renderer
+            renderer = get_renderer()
+            if renderer is not None:
+                renderer.shutdown()
+    if server is not None:
+        server.stop()
+
+    if args.output:
+        doc = {
+            "benchmark": "pipeline",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+            "stages": stages,
+            "results": results,
+        }
+        args.output.write_text(json.dumps(doc, indent=2), encoding="utf-8")
+        print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
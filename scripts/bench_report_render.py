@@ -0,0 +1,59 @@
+"""
+Measures per-render CPU time of the PDF report path in-process, before and after the
+single-parse stylesheet change:
+
+- "inline + css_string": the stylesheet is inlined in the HTML and passed again as
+  css_string, so WeasyPrint parses and cascades it twice (the previous behaviour).
+- "pre-parsed base css": the HTML carries no stylesheet and the renderer applies the
+  once-per-process parsed copy.
+
+The render pool and render cache are bypassed. Usage (from the repository root):
+
+    python scripts/bench_report_render.py --runs 10
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend import report  # noqa: E402
+
+_MARKDOWN = "\n\n".join(
+    f"## Section {i}\n\n" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20
+    + "\n\n| Area | Risk |\n|---|---|\n| Market | Medium |\n| Liquidity | Low |"
+    for i in range(8)
+)
+_OVERVIEW = "A large-cap company with diversified operations. " * 10
+
+def _before():
+    html = report.assemble_html_report(_MARKDOWN, _OVERVIEW, symbol="BENCH", capital=10000, last_close=123.45)
+    # css_string now goes through the parsed-stylesheet cache; clear it so the stylesheet is
+    # re-parsed on every render, as it was before the change.
+    report._parsed_css.cache_clear()
+    report.html_to_pdf_bytes(html, css_string=report._BASE_CSS)
+
+def _after():
+    html = report.assemble_html_report(_MARKDOWN, _OVERVIEW, symbol="BENCH", capital=10000, last_close=123.45,
+                                       inline_css=False)
+    report.html_to_pdf_bytes(html, include_base_css=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    for name, fn in (("inline + css_string", _before), ("pre-parsed base css", _after)):
+        fn()  # warm-up: engine imports, fonts, first parse
+        samples = []
+        for _ in range(args.runs):
+            started = time.process_time()
+            fn()
+            samples.append((time.process_time() - started) * 1000)
+        print(f"{name:>20}: median CPU {statistics.median(samples):8.1f} ms, "
+              f"min {min(samples):8.1f} ms over {args.runs} runs")
+
+if __name__ == "__main__":
+    main()
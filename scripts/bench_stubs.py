@@ -0,0 +1,256 @@
+"""
+Offline stand-ins for the analysis pipeline's network backends, used by
+scripts/bench_pipeline.py:
+
+- `StubLLMServer`: a local OpenAI-compatible HTTP server answering
+  `POST /v1/chat/completions` and `POST /v1/responses` (both plain JSON and
+  `stream: true` server-sent events) with synthetic text. Time to first token,
+  per-token delay and response length are configurable. Chat answers use the
+  "Final Answer:" form crew agents stop on.
+- `install_tool_stubs`: replaces the network fetch of the cached search and scrape
+  tools (`_fetch`, see backend.cached_tools) with synthetic results of a given
+  size after a given delay. The disk cache and compaction still run.
+- `write_replay_prices`: writes deterministic synthetic daily bars for the
+  `FileReplayProvider` (MARKET_DATA_PROVIDER=replay).
+
+The LLM stub can also run on its own, e.g. to keep it out of the measured process:
+
+    python scripts/bench_stubs.py --port 8765 --ttft-ms 300 --tokens 400
+    python scripts/bench_pipeline.py --llm-url http://127.0.0.1:8765/v1
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+_WORDS = ("revenue margin growth sector demand outlook capacity guidance valuation earnings order book "
+          "momentum support resistance volatility liquidity exposure hedge position entry exit risk "
+          "dividend quarter segment pricing competition regulation capital allocation cash flow").split()
+
+def synthetic_text(n_words: int, seed: int = 0) -> str:
+    """Deterministic filler text of about `n_words` words, with figures sprinkled in."""
+    rng = random.Random(seed)
+    words = []
+    for i in range(n_words):
+        words.append(f"{rng.uniform(1, 99):.1f}%" if i % 17 == 16 else rng.choice(_WORDS))
+        if i % 12 == 11:
+            words[-1] += "."
+    return " ".join(words)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StubLLMServer"
+
+    def log_message(self, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_sse(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+    def _sse(self, data, event=None) -> None:
+        prefix = f"event: {event}\n" if event else ""
+        payload = data if isinstance(data, str) else json.dumps(data)
+        self.wfile.write(f"{prefix}data: {payload}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _chunks(self, text: str):
+        """Yields the answer a few words at a time, pacing tokens like a real model."""
+        words = text.split(" ")
+        for i in range(0, len(words), 4):
+            if i and self.server.token_delay_ms:
+                time.sleep(self.server.token_delay_ms * 4 / 1000)
+            yield ("" if i == 0 else " ") + " ".join(words[i:i + 4])
+
+    def do_POST(self):
+        body = self._read_json()
+        self.server.count_request()
+        time.sleep(self.server.ttft_ms / 1000)
+        stream = bool(body.get("stream"))
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            self._chat(body, stream)
+        elif self.path.rstrip("/").endswith("/responses"):
+            self._responses(body, stream)
+        else:
+            self.send_error(404)
+
+    def _chat(self, body: dict, stream: bool):
+        text = "Thought: I now know the final answer\nFinal Answer: " + self.server.answer()
+        model = body.get("model", "stub")
+        rid, created = f"chatcmpl-{uuid.uuid4().hex[:12]}", int(time.time())
+        usage = {"prompt_tokens": sum(len(str(m.get("content", ""))) // 4 for m in body.get("messages", [])),
+                 "completion_tokens": len(text) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if not stream:
+            if self.server.token_delay_ms:
+                time.sleep(self.server.token_delay_ms * len(text.split()) / 1000)
+            self._send_json({
+                "id": rid, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+        self._start_sse()
+        for piece in self._chunks(text):
+            self._sse({"id": rid, "object": "chat.completion.chunk", "created": created, "model": model,
+                       "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+        self._sse({"id": rid, "object": "chat.completion.chunk", "created": created, "model": model,
+                   "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        self._sse("[DONE]")
+
+    def _responses(self, body: dict, stream: bool):
+        text = self.server.answer()
+        rid, mid = f"resp_{uuid.uuid4().hex[:12]}", f"msg_{uuid.uuid4().hex[:12]}"
+        response = {
+            "id": rid, "object": "response", "created_at": int(time.time()), "model": body.get("model", "stub"),
+            "status": "completed", "output": [{
+                "type": "message", "id": mid, "status": "completed", "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "usage": {"input_tokens": len(str(body.get("input", ""))) // 4, "output_tokens": len(text) // 4,
+                      "total_tokens": (len(str(body.get("input", ""))) + len(text)) // 4},
+            "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+        }
+        if not stream:
+            if self.server.token_delay_ms:
+                time.sleep(self.server.token_delay_ms * len(text.split()) / 1000)
+            self._send_json(response)
+            return
+        self._start_sse()
+        seq = 0
+        self._sse({"type": "response.created", "sequence_number": seq,
+                   "response": {**response, "status": "in_progress", "output": []}}, "response.created")
+        for piece in self._chunks(text):
+            seq += 1
+            self._sse({"type": "response.output_text.delta", "sequence_number": seq, "item_id": mid,
+                       "output_index": 0, "content_index": 0, "delta": piece}, "response.output_text.delta")
+        seq += 1
+        self._sse({"type": "response.completed", "sequence_number": seq, "response": response}, "response.completed")
+
+class StubLLMServer(ThreadingHTTPServer):
+    """
+    An OpenAI-compatible stub on 127.0.0.1. Use `base_url` as OPENAI_BASE_URL.
+
+    Args:
+        port (int, optional): Port to bind; 0 picks a free one. Defaults to 0.
+        ttft_ms (float, optional): Delay before the first byte of every answer. Defaults to 200.
+        token_delay_ms (float, optional): Delay per generated word. Defaults to 0.
+        answer_words (int, optional): Length of every answer in words. Defaults to 300.
+    """
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, ttft_ms: float = 200, token_delay_ms: float = 0, answer_words: int = 300):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.ttft_ms = ttft_ms
+        self.token_delay_ms = token_delay_ms
+        self.answer_words = answer_words
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def answer(self) -> str:
+        with self._lock:
+            seed = self.requests
+        return synthetic_text(self.answer_words, seed)
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+def install_tool_stubs(latency_ms: float = 300, result_words: int = 1500) -> None:
+    """
+    Makes the cached search and scrape tools return synthetic results after `latency_ms`
+    instead of calling Serper or fetching pages. Call after the environment is configured.
+    """
+    from backend import cached_tools
+
+    def fake_search(self, **kwargs):
+        time.sleep(latency_ms / 1000)
+        query = kwargs.get("search_query") or kwargs.get("query") or ""
+        blocks = [f"Title: {query} result {i}\nLink: https://example.com/{i}\nSnippet: {synthetic_text(40, i)}"
+                  for i in range(10)]
+        return "\n---\n".join(blocks)
+
+    def fake_scrape(self, **kwargs):
+        time.sleep(latency_ms / 1000)
+        url = kwargs.get("website_url") or getattr(self, "website_url", "") or ""
+        nav = "Home\nMarkets\nSign in\nSubscribe to our newsletter\n"
+        paragraphs = [synthetic_text(60, zlib.crc32(url.encode()) + i) for i in range(max(1, result_words // 60))]
+        return nav + "\n".join(paragraphs) + "\n© 2025 All rights reserved"
+
+    cached_tools.CachedSerperDevTool._fetch = fake_search
+    cached_tools.CachedScrapeWebsiteTool._fetch = fake_scrape
+
+def write_replay_prices(directory: Path, symbols, bars: int = 750, exchange_suffix: str = ".NS") -> None:
+    """Writes `bars` synthetic daily OHLCV rows per symbol as `<SYMBOL>.NS_1d.csv` replay files."""
+    import numpy as np
+    import pandas as pd
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    index = pd.bdate_range(end="2025-06-30", periods=bars, tz="UTC")
+    for n, symbol in enumerate(symbols):
+        rng = np.random.default_rng(n)
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, bars)))
+        spread = close * rng.uniform(0.002, 0.02, bars)
+        df = pd.DataFrame({
+            "Open": close * (1 + rng.normal(0, 0.003, bars)),
+            "High": close + spread,
+            "Low": close - spread,
+            "Close": close,
+            "Volume": rng.integers(100_000, 5_000_000, bars).astype(float),
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        }, index=index)
+        df.to_csv(directory / f"{symbol}{exchange_suffix}_1d.csv")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the OpenAI-compatible stub server in the foreground.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft-ms", type=float, default=200)
+    parser.add_argument("--token-delay-ms", type=float, default=0)
+    parser.add_argument("--tokens", type=int, default=300, help="Answer length in words.")
+    args = parser.parse_args()
+    server = StubLLMServer(args.port, args.ttft_ms, args.token_delay_ms, args.tokens)
+    print(f"Stub LLM listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
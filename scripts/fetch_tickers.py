@@ -1,81 +1,279 @@
+import argparse
 import csv
 import json
+import os
+import tempfile
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 OUT = Path("data")
-OUT.mkdir(parents=True, exist_ok=True)
 TICKERS_FILE = OUT / "tickers.json"
 
-# Load existing tickers (if any)
-if TICKERS_FILE.exists():
-    with open(TICKERS_FILE, "r", encoding="utf-8") as f:
-        tickers = json.load(f)
-else:
-    tickers = {"NSE": [], "BSE": []}
+def meta_file(tickers_file):
+    """
+    The ETag / Last-Modified validators of the last successful download into `tickers_file`,
+    per source URL, kept next to it (data/tickers_meta.json for the default file).
+    """
+    tickers_file = Path(tickers_file)
+    return tickers_file.with_name(f"{tickers_file.stem}_meta.json")
 
-# Ensure structure
-tickers.setdefault("NSE", [])
-tickers.setdefault("BSE", [])
+NSE_API_URL = "https://www.nseindia.com/api/equity-stockIndices?index=SECURITIES%20IN%20F%26O"
+NSE_CSV_URL = os.environ.get("NSE_LIST_URL", "https://archives.nseindia.com/content/equities/EQUITY_L.csv")
+BSE_CSV_URL = os.environ.get(
+    "BSE_LIST_URL",
+    "https://api.bseindia.com/BseIndiaAPI/api/LitsOfScripCSVDownload/w"
+    "?segment=Equity&status=Active&industry=&Group=&Scripcode=",
+)
 
-# Helper to check if symbol exists in a given list
-def symbol_exists(exchange_list, symbol):
-    return any(t["symbol"] == symbol for t in exchange_list)
-
-# Single session for cookies & headers
-session = requests.Session()
-session.headers.update({
+_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                   "AppleWebKit/537.36 (KHTML, like Gecko) "
                   "Chrome/114.0.0.0 Safari/537.36",
     "Accept-Language": "en-US,en;q=0.9",
-    "Accept-Encoding": "gzip, deflate, br",
-})
+    "Accept-Encoding": "gzip, deflate",
+}
+
+# One session (cookies & headers) per thread, since the exchanges are fetched concurrently.
+_local = threading.local()
+
+def get_session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+        _local.session.headers.update(_HEADERS)
+    return _local.session
+
+def load_json(path, default):
+    """Reads a JSON file, returning `default` if it does not exist."""
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return default
+
+def save_json_atomic(path, data):
+    """Writes JSON to a temp file in the same directory and renames it over `path`,
+    so readers (the running app) never see a half-written file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def conditional_get(url, meta, timeout=30, headers=None, stream=False):
+    """
+    GETs `url` with the validators stored in `meta` from the previous download.
+    Returns None when the server answers 304 Not Modified, otherwise the response;
+    the new validators are recorded in `meta`.
+    """
+    headers = dict(headers or {})
+    cached = meta.get(url, {})
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    r = get_session().get(url, headers=headers, timeout=timeout, stream=stream)
+    if r.status_code == 304:
+        r.close()
+        return None
+    r.raise_for_status()
+    meta[url] = {k: v for k, v in (("etag", r.headers.get("ETag")),
+                                   ("last_modified", r.headers.get("Last-Modified"))) if v}
+    return r
+
+def iter_lines(source, meta, headers=None):
+    """
+    Returns an iterator over the text lines of a list, read incrementally from a local file
+    or a streamed HTTP response, so memory stays bounded by line length rather than file size.
+    Returns None when `source` is a URL whose content is unchanged since the last run.
+    """
+    if not str(source).startswith(("http://", "https://")):
+        def file_lines():
+            with open(source, "r", encoding="utf-8-sig", newline="") as f:
+                yield from f
+        return file_lines()
+
+    r = conditional_get(source, meta, headers=headers, stream=True)
+    if r is None:
+        return None
+
+    def http_lines():
+        with r:
+            for i, raw in enumerate(r.iter_lines()):
+                line = raw.decode("utf-8", errors="replace")
+                yield line.lstrip("\ufeff") if i == 0 else line
+    return http_lines()
+
+def parse_nse_csv(lines):
+    """Parses NSE's EQUITY_L.csv (SYMBOL, NAME OF COMPANY, ...) one row at a time."""
+    reader = csv.reader(lines)
+    next(reader, [])  # header
+    for row in reader:
+        if len(row) >= 2:
+            yield {"symbol": row[0].strip(), "name": row[1].strip()}
+
+def parse_bse_csv(lines):
+    """Parses BSE's list of scrips (Security Id, Security Name, Status, ...) one row at a time, keeping active equities."""
+    for row in csv.DictReader(lines):
+        row = {(k or "").strip(): (v or "").strip() for k, v in row.items() if isinstance(v, str) or v is None}
+        if row.get("Status") and row["Status"] != "Active":
+            continue
+        if row.get("Instrument") and row["Instrument"] != "Equity":
+            continue
+        if row.get("Security Id"):
+            yield {"symbol": row["Security Id"], "name": row.get("Security Name") or row.get("Issuer Name", "")}
+
+def fetch_nse(meta, source=None):
+    """
+    Fetch NSE securities from the full equity list, falling back to the F&O securities API.
 
-def fetch_nse():
-    """Fetch NSE F&O securities list via API."""
+    Returns (rows, complete): rows is an iterator of {"symbol", "name"} dicts, or None when
+    the source is unchanged since the last run; complete is True only for the full equity
+    list, whose missing symbols can be marked removed.
+    """
     try:
-        url = "https://www.nseindia.com/api/equity-stockIndices?index=SECURITIES%20IN%20F%26O"
-        session.get("https://www.nseindia.com", timeout=10)  # set cookies
-        r = session.get(url, timeout=30)
-        r.raise_for_status()
-        data = r.json()
-        return [
-            {"symbol": item.get("symbol", "").strip(),
-             "name": item.get("identifier", "").strip()}
-            for item in data.get("data", [])
-            if "symbol" in item
-        ]
+        lines = iter_lines(source or NSE_CSV_URL, meta)
+        return (None if lines is None else parse_nse_csv(lines)), True
     except Exception:
+        if source:
+            raise
         # Alternate source (backup API)
         try:
-            alt_url = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
-            r = session.get(alt_url, timeout=30)
-            r.raise_for_status()
-            reader = csv.reader(r.text.splitlines())
-            header = next(reader, [])
-            return [{"symbol": row[0].strip(), "name": row[1].strip()}
-                    for row in reader if len(row) >= 2]
+            get_session().get("https://www.nseindia.com", timeout=10)  # set cookies
+            r = conditional_get(NSE_API_URL, meta)
+            if r is None:
+                return None, False
+            data = r.json()
+            return [
+                {"symbol": item.get("symbol", "").strip(),
+                 "name": item.get("identifier", "").strip()}
+                for item in data.get("data", [])
+                if "symbol" in item
+            ], False
         except Exception as e:
             print("NSE fetch failed from all sources:", e)
-            return []
-        
-def main():
-    try:
-        print("Fetching NSE...")
-        nse_data = fetch_nse()
-        added = 0
-        for item in nse_data:
-            if not symbol_exists(tickers["NSE"], item["symbol"]):
-                tickers["NSE"].append(item)
-                added += 1
-        print(f"Added {added} new NSE entries (total: {len(tickers['NSE'])}).")
-    except Exception as e:
-        print("NSE fetch failed:", e)
-
-    with open(TICKERS_FILE, "w", encoding="utf-8") as f:
-        json.dump(tickers, f, indent=2, ensure_ascii=False)
-    print(f"Saved {TICKERS_FILE}")
+            raise
+
+def fetch_bse(meta, source=None):
+    """Fetch the BSE list of active equity scrips; returns (rows, complete) like `fetch_nse`."""
+    lines = iter_lines(source or BSE_CSV_URL, meta, headers={"Referer": "https://www.bseindia.com/"})
+    return (None if lines is None else parse_bse_csv(lines)), True
+
+FETCHERS = {"NSE": fetch_nse, "BSE": fetch_bse}
+SOURCE_URLS = {"NSE": (NSE_CSV_URL, NSE_API_URL), "BSE": (BSE_CSV_URL,)}
+
+def merge(existing, incoming, complete):
+    """
+    Merges incoming rows into an exchange list in place, in linear time.
+
+    New symbols are appended. When `incoming` is the complete (authoritative) list, changed
+    names are updated and symbols missing from it are marked {"active": false} rather than
+    deleted. Returns counts of added, updated, removed and reactivated symbols.
+    """
+    index = {item["symbol"]: item for item in existing}
+    stats = {"added": 0, "updated": 0, "removed": 0, "reactivated": 0}
+    seen = set()
+    for row in incoming:
+        symbol = row["symbol"]
+        if not symbol or symbol in seen:
+            continue
+        seen.add(symbol)
+        item = index.get(symbol)
+        if item is None:
+            item = {"symbol": symbol, "name": row.get("name", "")}
+            existing.append(item)
+            index[symbol] = item
+            stats["added"] += 1
+            continue
+        if complete and row.get("name") and item.get("name") != row["name"]:
+            item["name"] = row["name"]
+            stats["updated"] += 1
+        if item.pop("active", True) is False:
+            stats["reactivated"] += 1
+    if complete:
+        for symbol, item in index.items():
+            if symbol not in seen and item.get("active", True):
+                item["active"] = False
+                stats["removed"] += 1
+    return stats
+
+def ingest(exchange, tickers, meta, source=None):
+    """
+    Streams one exchange's list into `tickers[exchange]`. Rows are merged as they are parsed,
+    so the download, parse and merge overlap. Returns the merge stats, or None if unchanged.
+
+    `meta` is only written for this exchange's URLs, so exchanges can be ingested concurrently.
+    """
+    rows, complete = FETCHERS[exchange](meta, source)
+    if rows is None:
+        print(f"{exchange} list unchanged since the last run; skipped.")
+        return None
+    # Merge into a copy so a download that breaks off midway leaves the list untouched.
+    merged = [dict(item) for item in tickers[exchange]]
+    stats = merge(merged, rows, complete)
+    tickers[exchange] = merged
+    print(f"{exchange}: {stats['added']} added, {stats['updated']} renamed, {stats['removed']} marked removed, "
+          f"{stats['reactivated']} reactivated (total: {len(merged)}).")
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh data/tickers.json from the NSE and BSE security lists.")
+    parser.add_argument("--exchanges", default="NSE,BSE", help="Comma-separated exchanges to ingest. Defaults to NSE,BSE.")
+    parser.add_argument("--nse-source", default=os.environ.get("NSE_LIST_SOURCE"),
+                        help="URL or local CSV file to read NSE's equity list from (e.g. a saved EQUITY_L.csv).")
+    parser.add_argument("--bse-source", default=os.environ.get("BSE_LIST_SOURCE"),
+                        help="URL or local CSV file to read BSE's list of scrips from.")
+    parser.add_argument("--tickers-file", type=Path, default=TICKERS_FILE)
+    args = parser.parse_args(argv)
+
+    tickers = load_json(args.tickers_file, {"NSE": [], "BSE": []})
+    # Ensure structure
+    tickers.setdefault("NSE", [])
+    tickers.setdefault("BSE", [])
+    meta_path = meta_file(args.tickers_file)
+    meta = load_json(meta_path, {})
+    for exchange, urls in SOURCE_URLS.items():
+        if not tickers[exchange]:
+            # Nothing on file to fall back to (e.g. the tickers file was deleted): a 304 would
+            # leave this exchange empty, so download its list unconditionally.
+            for url in urls:
+                meta.pop(url, None)
+
+    exchanges = [e.strip().upper() for e in args.exchanges.split(",") if e.strip().upper() in FETCHERS]
+    sources = {"NSE": args.nse_source, "BSE": args.bse_source}
+    print(f"Fetching {', '.join(exchanges)}...")
+
+    # All exchanges download in one parallel round; each thread only touches its own list and URLs.
+    previous = dict(meta)
+    changed = False
+    with ThreadPoolExecutor(max_workers=max(1, len(exchanges))) as pool:
+        futures = {e: pool.submit(ingest, e, tickers, meta, sources[e]) for e in exchanges}
+        for exchange, future in futures.items():
+            try:
+                stats = future.result()
+                changed = changed or bool(stats and any(stats.values()))
+            except Exception as e:
+                print(f"{exchange} fetch failed:", e)
+                # Keep the old validators, or the next run would skip content that was never merged.
+                for url in SOURCE_URLS[exchange]:
+                    if url in previous:
+                        meta[url] = previous[url]
+                    else:
+                        meta.pop(url, None)
+
+    if changed:
+        save_json_atomic(args.tickers_file, tickers)
+        print(f"Saved {args.tickers_file}")
+    else:
+        print(f"No changes; {args.tickers_file} left untouched.")
+    save_json_atomic(meta_path, meta)
 
 if __name__ == "__main__":
     main()